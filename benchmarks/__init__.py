@@ -0,0 +1,11 @@
+''' Performance benchmarks for tec_util
+
+Run from the repository root:
+
+    python -m benchmarks                            # all operations, small size
+    python -m benchmarks -s small medium -o new.json
+    python -m benchmarks -b baseline.json           # flag regressions
+
+Synthetic input files are generated once per size in the work directory
+(see benchmarks.synthetic).
+'''
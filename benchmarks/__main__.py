@@ -0,0 +1,111 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+from . import suite
+from .synthetic import KINDS
+
+def format_bytes(num):
+    return '-' if num is None else '{:.0f}M'.format(num / 2**20)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog = 'python -m benchmarks',
+        description = 'Time tec_util operations on synthetic datasets',
+    )
+    parser.add_argument(
+        '-s', '--sizes',
+        nargs = '+',
+        choices = list(suite.SIZES),
+        default = ['small'],
+        help = 'dataset size presets to run (def: small)',
+    )
+    parser.add_argument(
+        '-p', '--ops',
+        nargs = '+',
+        choices = list(suite.OPERATIONS),
+        default = list(suite.OPERATIONS),
+        help = 'operations to run (def: all)',
+    )
+    parser.add_argument(
+        '-k', '--kind',
+        choices = [k for k in KINDS if k != 'axi'],
+        default = 'ordered',
+        help = 'zone type of the input datasets (def: ordered)',
+    )
+    parser.add_argument(
+        '-r', '--repeats',
+        type = int,
+        default = 3,
+        help = 'repeats per case; the fastest is reported (def: 3)',
+    )
+    parser.add_argument(
+        '-w', '--workdir',
+        help = 'directory where input files are generated and kept (def: temporary)',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help = 'write results to this JSON file',
+    )
+    parser.add_argument(
+        '-b', '--baseline',
+        help = 'JSON results to compare against; exit status 1 on regressions',
+    )
+    parser.add_argument(
+        '-t', '--tolerance',
+        type = float,
+        default = 0.2,
+        help = 'allowed relative slowdown/memory growth vs. baseline (def: 0.2)',
+    )
+    parser.add_argument(
+        '--engine',
+        action = 'store_true',
+        help = 'benchmark the Tecplot engine code paths',
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as temp:
+        workdir = args.workdir or temp
+        os.makedirs(workdir, exist_ok=True)
+        results = []
+        print('{:10s} {:8s} {:>10s} {:>10s} {:>10s}'.format('Operation', 'Size', 'Wall', 'CPU', 'Peak RSS'))
+        for size in args.sizes:
+            for op in args.ops:
+                result = suite.run_case(
+                    op, size, args.kind, workdir,
+                    repeats = args.repeats,
+                    native  = not args.engine,
+                )
+                results.append(result)
+                print('{:10s} {:8s} {:9.3f}s {:9.3f}s {:>10s}'.format(
+                    op, size, result['wall'], result['cpu'], format_bytes(result['peak_rss']),
+                ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': suite.environment(), 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        report = suite.compare(
+            results, baseline,
+            time_tolerance   = args.tolerance,
+            memory_tolerance = args.tolerance,
+        )
+        print()
+        print('{:10s} {:8s} {:>10s} {:>10s}  {}'.format('Operation', 'Size', 'Baseline', 'Current', 'Status'))
+        for result, base, regressions in report:
+            print('{:10s} {:8s} {:9.3f}s {:9.3f}s  {}'.format(
+                result['op'], result['size'], base['wall'], result['wall'],
+                'REGRESSION ({})'.format(', '.join(regressions)) if regressions else 'ok',
+            ))
+        if any(regressions for _, _, regressions in report):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+''' Benchmark cases and measurement
+
+Each case runs one tec_util operation on synthetic input files in a fresh
+process, so the peak resident set size reported by the operating system
+belongs to that case alone. Wall time is the best of several repeats;
+CPU time (all threads) is taken from the same repeat.
+'''
+import logging
+import os
+import platform
+import time
+import numpy as np
+import tec_util
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from tec_util.timing import peak_rss
+from . import synthetic
+
+LOG = logging.getLogger(__name__)
+
+# (num_zones, points per zone, num_vars) of each size preset
+SIZES = {
+    'small':  (4,   10000, 5),
+    'medium': (16, 250000, 8),
+    'large':  (64, 1000000, 8),
+}
+
+# Wall time differences below this (seconds) are never flagged as regressions
+TIME_RESOLUTION = 0.01
+
+SLICES = '''slices = [
+    ('s%d' % n, (0.37 + 0.5*n, 0.0, 0.0), (1.0, 0.2, 0.0), 'all') for n in range(16)
+]
+'''
+
+#-----------------------------------------------------------------------
+# Input files
+#-----------------------------------------------------------------------
+def input_files(workdir, size, kind='ordered'):
+    ''' Create (once) the synthetic input files for a size preset
+
+        Returns:
+            dict of file role -> path
+    '''
+    num_zones, num_points, num_vars = SIZES[size]
+    prefix = os.path.join(workdir, f'{size}_{kind}')
+    files = {
+        'data':   prefix + '.plt',
+        'other':  prefix + '_other.plt',
+        'merge':  prefix + '_merge.plt',
+        'target': prefix + '_target.plt',
+        'axi':    os.path.join(workdir, f'{size}_axi.plt'),
+        'slices': os.path.join(workdir, 'slices.py'),
+    }
+    specs = {
+        'data':   (kind, num_zones, num_points, num_vars, dict(seed=0)),
+        'other':  (kind, num_zones, num_points, num_vars, dict(seed=1)),
+        'merge':  (kind, num_zones, num_points, num_vars, dict(seed=2, prefix='m')),
+        'target': ('ordered', num_zones, max(100, num_points // 64), 3, {}),
+        'axi':    ('axi', num_zones, num_points // 16, num_vars - 1, {}),
+    }
+    for role, (kind, *args, kwargs) in specs.items():
+        if not os.path.exists(files[role]):
+            LOG.info('Generate %s', files[role])
+            synthetic.write_synthetic(files[role], kind, *args, **kwargs)
+    if not os.path.exists(files['slices']):
+        with open(files['slices'], 'w') as f:
+            f.write(SLICES)
+    return files
+
+#-----------------------------------------------------------------------
+# Operations
+#-----------------------------------------------------------------------
+def op_stats(files, out, native):
+    tec_util.compute_statistics(files['data'], native=native)
+
+def op_diff(files, out, native):
+    tec_util.difference_datasets(files['data'], files['other'], out, native=native)
+
+def op_extract(files, out, native):
+    tec_util.extract(files['data'], out, select_vars=['x', 'y', 'z', 'q1'],
+                     select_zones=['zone[02468]'], native=native)
+
+def op_merge(files, out, native):
+    tec_util.merge_datafiles([files['data'], files['merge']], out, native=native)
+
+def op_revolve(files, out, native):
+    tec_util.revolve_dataset(files['axi'], out, planes=17, native=native)
+
+def op_slice(files, out, native):
+    tec_util.slice_surfaces(files['slices'], files['data'], out, native=native)
+
+def op_interp(files, out, native):
+    tec_util.interpolate_dataset(files['data'], files['target'], out, native=native)
+
+OPERATIONS = {
+    'stats':   op_stats,
+    'diff':    op_diff,
+    'extract': op_extract,
+    'merge':   op_merge,
+    'revolve': op_revolve,
+    'slice':   op_slice,
+    'interp':  op_interp,
+}
+
+#-----------------------------------------------------------------------
+# Measurement
+#-----------------------------------------------------------------------
+def _run_case(op, files, out, native, repeats):
+    ''' Run one operation repeatedly (in a worker process) '''
+    logging.disable(logging.WARNING)
+    baseline_rss = peak_rss()
+    wall, cpu = [], []
+    for n in range(repeats):
+        t0, c0 = time.perf_counter(), time.process_time()
+        OPERATIONS[op](files, out, native)
+        wall.append(time.perf_counter() - t0)
+        cpu.append(time.process_time() - c0)
+    best = int(np.argmin(wall))
+    rss = peak_rss()
+    return {
+        'wall':         wall[best],
+        'wall_all':     wall,
+        'cpu':          cpu[best],
+        'peak_rss':     rss,
+        'startup_rss':  baseline_rss,
+    }
+
+def run_case(op, size, kind, workdir, *, repeats=3, native=True):
+    ''' Measure an operation in a fresh process; returns a result dict '''
+    files = input_files(workdir, size, kind)
+    out = os.path.join(workdir, f'out_{op}.plt')
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        result = pool.submit(_run_case, op, files, out, native, repeats).result()
+    if os.path.exists(out):
+        os.remove(out)
+    return {'op': op, 'size': size, 'kind': kind, 'native': native, **result}
+
+def environment():
+    ''' Description of the machine/software the results were measured on '''
+    return {
+        'python':   platform.python_version(),
+        'numpy':    np.__version__,
+        'platform': platform.platform(),
+        'machine':  platform.machine(),
+        'cpus':     os.cpu_count(),
+    }
+
+#-----------------------------------------------------------------------
+# Baseline comparison
+#-----------------------------------------------------------------------
+def case_key(result):
+    return (result['op'], result['size'], result['kind'], result['native'])
+
+def compare(results, baseline, *, time_tolerance=0.2, memory_tolerance=0.2):
+    ''' Compare results against baseline results
+
+        Arguments:
+            results, baseline   Lists of result dicts (see run_case)
+            time_tolerance      Allowed relative increase of wall time
+            memory_tolerance    Allowed relative increase of peak RSS
+
+        Returns:
+            List of (result, baseline_result, [regression descriptions])
+            for every case found in both lists
+    '''
+    reference = {case_key(r): r for r in baseline}
+    report = []
+    for result in results:
+        base = reference.get(case_key(result))
+        if base is None:
+            continue
+        regressions = []
+        if result['wall'] > base['wall'] * (1 + time_tolerance) + TIME_RESOLUTION:
+            regressions.append('time +{:.0%}'.format(result['wall'] / base['wall'] - 1))
+        if result['peak_rss'] and base['peak_rss'] and \
+           result['peak_rss'] > base['peak_rss'] * (1 + memory_tolerance):
+            regressions.append('memory +{:.0%}'.format(result['peak_rss'] / base['peak_rss'] - 1))
+        report.append((result, base, regressions))
+    return report
@@ -0,0 +1,103 @@
+''' Synthetic datasets for benchmarking
+
+Every zone is a structured patch of a wavy surface, so the same data can
+be used for slicing, interpolation and the variable-wise operations:
+
+    ordered     (I,J) ordered zones with x, y, z coordinates
+    fe          The same patches as FEQuad zones
+    axi         (I,J) ordered zones in the x-y plane (no z), for revolve
+
+Variables past the coordinates are smooth functions of the coordinates
+(plus a seeded phase), so differencing two datasets with different seeds
+gives non-trivial results. All values are float32.
+'''
+import argparse
+import math
+import numpy as np
+import tec_util
+from tec_util.dataset import Dataset, ZoneType
+
+KINDS = ('ordered', 'fe', 'axi')
+
+def patch_dims(num_points):
+    ''' (I,J) of a near-square patch with about num_points points '''
+    ni = max(2, int(math.sqrt(num_points)))
+    nj = max(2, num_points // ni)
+    return ni, nj
+
+def quad_connectivity(ni, nj):
+    ''' (num_cells, 4) zero-based connectivity of an (I,J) patch '''
+    nodes = np.arange(ni * nj, dtype=np.int32).reshape(nj, ni)
+    return np.stack([
+        nodes[:-1, :-1], nodes[:-1, 1:], nodes[1:, 1:], nodes[1:, :-1],
+    ], axis=-1).reshape(-1, 4)
+
+def make_dataset(kind='ordered', num_zones=4, num_points=10000, num_vars=5, *,
+                 seed=0, prefix='q'):
+    ''' Create a synthetic Dataset
+
+        Arguments:
+            kind        One of KINDS
+            num_zones   Number of zones
+            num_points  Approximate number of points per zone
+            num_vars    Total number of variables, including coordinates
+            seed        Phase of the solution variables
+            prefix      Name prefix of the solution variables
+
+        Returns:
+            Dataset with zones tiled along the x axis
+    '''
+    if kind not in KINDS:
+        raise ValueError(f'Unknown dataset kind "{kind}"')
+    coords = ['x', 'y'] if kind == 'axi' else ['x', 'y', 'z']
+    num_vars = max(num_vars, len(coords))
+    names = coords + [f'{prefix}{n}' for n in range(1, num_vars - len(coords) + 1)]
+    dataset = Dataset(f'synthetic {kind}', names)
+
+    ni, nj = patch_dims(num_points)
+    v, u = np.meshgrid(np.linspace(0, 1, nj), np.linspace(0, 1, ni), indexing='ij')
+    u, v = u.ravel(), v.ravel()
+    rng = np.random.default_rng(seed)
+    phases = rng.random(num_vars) * 2 * np.pi
+    for n in range(num_zones):
+        x = u + n
+        if kind == 'axi':
+            y = 1.0 + v
+            values = [x, y]
+        else:
+            y = v
+            z = 0.1 * np.sin(2 * np.pi * x) * np.cos(2 * np.pi * y)
+            values = [x, y, z]
+        for k in range(len(coords), num_vars):
+            values.append(np.sin((k + 1) * x + phases[k]) * np.cos(k * y))
+        values = [np.asarray(a, dtype=np.float32) for a in values]
+        if kind == 'fe':
+            conn = quad_connectivity(ni, nj)
+            zone = dataset.add_fe_zone(
+                ZoneType.FEQuad, f'zone{n}', ni * nj, len(conn), connectivity=conn,
+            )
+        else:
+            zone = dataset.add_ordered_zone(f'zone{n}', (ni, nj))
+        for k, a in enumerate(values):
+            zone.set_values(k, a)
+    return dataset
+
+def write_synthetic(filename, kind='ordered', num_zones=4, num_points=10000, num_vars=5, **kwargs):
+    ''' Write a synthetic dataset (see make_dataset) with write_dataset '''
+    tec_util.write_dataset(
+        filename, make_dataset(kind, num_zones, num_points, num_vars, **kwargs),
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic Tecplot datafile')
+    parser.add_argument('datafile_out', help='output file (.dat for ASCII, else PLT)')
+    parser.add_argument('-k', '--kind', choices=KINDS, default='ordered')
+    parser.add_argument('-z', '--zones', type=int, default=4, help='number of zones (def: 4)')
+    parser.add_argument('-p', '--points', type=int, default=10000, help='points per zone (def: 10000)')
+    parser.add_argument('-n', '--vars', type=int, default=5, help='number of variables (def: 5)')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='solution phase seed (def: 0)')
+    args = parser.parse_args(argv)
+    write_synthetic(args.datafile_out, args.kind, args.zones, args.points, args.vars, seed=args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,8 @@ setup(
     author = 'Jeffrey Hill',
     author_email = 'jeff.p.hill@gmail.com',
     packages = ['tec_util'],
-    python_requires = '>=3.4',
-    install_requires = ['pytecplot>=0.8'],
+    python_requires = '>=3.8',
+    install_requires = ['pytecplot>=0.8', 'scipy'],
     entry_points= {
         'console_scripts': [
             'tec_util=tec_util.__main__:main',
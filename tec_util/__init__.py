@@ -1,2 +1,9 @@
+import importlib
 from .core import *
-from . import generators
+from .timing import profiling
+
+def __getattr__(name):
+    # Load the layout generators (and tecplot) only when first used
+    if name == 'generators':
+        return importlib.import_module('.generators', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,23 @@
 import argparse
+import glob
 import logging
 import os
 import sys
 import tec_util
+import tec_util.batch
+import tec_util.server
 logging.basicConfig(
     stream=sys.stdout,
     format="%(asctime)s | %(name)s | %(levelname)s | %(message)s",
 )
 
+# Subcommands that can be chained by pipe, and the token separating them
+PIPE_COMMANDS = {
+    'diff', 'extract', 'info', 'interp', 'lines', 'merge', 'probe', 'rename_vars',
+    'rename_zones', 'revolve', 'slice', 'stats',
+}
+PIPE_SEPARATOR = '+'
+
 
 #-------------------------------------------------------------------------------
 # Helpers
@@ -40,6 +50,14 @@ def vector_spec(arg):
                'a comma separated pair of strings'
         return { name_in : names_out }
 
+def memory_spec(arg):
+    ''' Parse memory size, e.g. 512M or 4G (bytes if no suffix) '''
+    units = {'K': 1<<10, 'M': 1<<20, 'G': 1<<30, 'T': 1<<40}
+    arg = dequote(arg).upper().rstrip('B')
+    if arg and arg[-1] in units:
+        return int(float(arg[:-1]) * units[arg[-1]])
+    return int(arg)
+
 def glob_spec(arg):
     ''' Parse list of glob patterns used to select variables and zones '''
     if arg:
@@ -51,25 +69,72 @@ def glob_spec(arg):
 #-------------------------------------------------------------------------------
 # Subcommmands
 #-------------------------------------------------------------------------------
+def batch(args):
+    ''' Run a subcommand over many datafiles using a pool of processes '''
+
+    # Expand inputs and build one command line per file
+    inputs = sorted(set(f for pattern in args.inputs for f in glob.glob(pattern)))
+    if not inputs:
+        raise SystemExit('ERROR: No files match --inputs {}'.format(' '.join(args.inputs)))
+    if not args.command or args.command[0] == 'batch':
+        raise SystemExit('ERROR: batch requires a subcommand (other than batch) to run')
+    template = args.command
+    if not any('{path}' in a for a in template):
+        template = [template[0], '{path}', *template[1:]]
+    options = tec_util.batch.loglevel_options(logging.getLogger('tec_util').level)
+    if args.engine:
+        options.append('--engine')
+    commands = [options + tec_util.batch.expand_template(template, f, i) for i, f in enumerate(inputs)]
+
+    # Refuse to have several inputs write the same output file
+    parser = build_parser()
+    outputs = {}
+    for f, argv in zip(inputs, commands):
+        cmd_args = parser.parse_args(argv)
+        out = getattr(cmd_args, 'datafile_out', None) or getattr(cmd_args, 'layout_file', None)
+        if out in outputs:
+            raise SystemExit(
+                'ERROR: {} and {} would both write {}; use a template '
+                'like -o {{stem}}_out.plt'.format(outputs[out], f, out)
+            )
+        if out is not None:
+            outputs[out] = f
+
+    # Run commands; workers live for the whole batch so the engine is reused
+    jobs = min(args.jobs or os.cpu_count(), len(commands))
+    failures = []
+    results = tec_util.batch.run_commands(commands, jobs)
+    for f, (ok, elapsed, output) in zip(inputs, results):
+        sys.stdout.write(output)
+        print('{:4s} {:8.2f}s  {}'.format('OK' if ok else 'FAIL', elapsed, f), flush=True)
+        if not ok:
+            failures.append(f)
+
+    # Summary
+    print('\nBatch Summary: {} succeeded, {} failed'.format(
+        len(inputs) - len(failures), len(failures)
+    ))
+    for f in failures:
+        print(' FAIL', f)
+    return 1 if failures else 0
+
 def diff(args):
     ''' Compute delta between two solution files '''
-    tec_util.difference_datasets(
+    return tec_util.difference_datasets(
         args.datafile_new,
         args.datafile_old,
         args.datafile_out,
         select_zones = args.zones,
         select_vars = args.variables,
         nskip = args.nskip,
+        native = not args.engine,
+        max_memory = args.max_memory,
     )
 
 def export(args):
     ''' Export all pages in a layout to [prefix]<page.name>.png '''
-    import tecplot as tp
-    if args.layout_file.endswith('.yml'):
-        tec_util.configure_layout(args.layout_file)
-    else:
-        tp.layout.load_layout(args.layout_file)
-    tec_util.export_pages(
+    tec_util.export_layout(
+        args.layout_file,
         args.output_dir,
         args.prefix,
         args.width,
@@ -78,15 +143,17 @@ def export(args):
         args.cvar,
         args.rescale,
         args.num_contour,
+        jobs = args.jobs,
     )
 
 def extract(args):
     ''' Copy specified zones/variables into a new datafile '''
-    tec_util.extract(
+    return tec_util.extract(
         args.datafile_in,
         args.datafile_out,
         select_zones = args.zones,
         select_vars = args.variables,
+        native = not args.engine,
     )
 
 def generate(args):
@@ -96,10 +163,27 @@ def generate(args):
     tp.save_layout(args.layout_file, use_relative_paths=True)
 
 def info(args):
-    ''' Print summary information about a dataset '''
-    import tecplot as tp
-    from tecplot.constant import ZoneType as zt
-    dataset = tp.data.load_tecplot(args.datafile_in)
+    ''' Print summary information about one or more datasets '''
+    for datafile in args.datafile_in:
+        if args.index:
+            stats_index = tec_util.load_dataset_index(datafile, native=not args.engine)
+            print_info(datafile, tec_util.statindex.index_dataset(stats_index), stored_ranges=True)
+            continue
+        header = tec_util.read_header(datafile) if args.fast and not args.engine else None
+        if header is not None:
+            print_info(datafile, header, stored_ranges=True)
+            continue
+        with tec_util.open_dataset(datafile, native=not args.engine) as dataset:
+            print_info(datafile, dataset, stored_ranges=args.fast)
+
+def print_info(datafile, dataset, *, stored_ranges=False):
+    ''' Print zone/variable/timepoint summary of a loaded dataset
+
+        If stored_ranges is set, variable ranges are taken from the zone
+        headers when the file stores them (PLT files), so no data is read.
+        Ranges that are neither stored nor loaded (e.g. a header-only
+        dataset of an ASCII file) are printed as n/a.
+    '''
     has_times = hasattr(dataset, 'num_solution_times') # Missing in early versions of pytecplot
 
     # Determine width for pretty printed data
@@ -115,7 +199,7 @@ def info(args):
         " {4:{0}s} {ds.num_variables}"
         ).format(
             col_width, 'Filename:', 'Title:', 'Num. Zones:', 'Num. Variables:',
-            df=args.datafile_in, ds=dataset
+            df=datafile, ds=dataset
     ))
     if has_times:
         print(" {1:{0}s} {ds.num_solution_times}".format(col_width, 'Num. Timepoints:', ds=dataset))
@@ -123,7 +207,7 @@ def info(args):
     print("\nZone Info:")
     for zone in dataset.zones():
         leader = "[{z.index:^3d}] {z.name}".format(z=zone)
-        if zone.zone_type == zt.Ordered:
+        if zone.zone_type.name == 'Ordered':
             line = " {1:{0}s} {z.zone_type.name} Zone, Strand={z.strand}, Dimensions={z.dimensions}"
         else:
             line = " {1:{0}s} {z.zone_type.name} Zone, Strand={z.strand}, NElements={z.num_elements}, NFaces={z.num_faces}"
@@ -132,11 +216,26 @@ def info(args):
     print("\nVariable Info:")
     for var in dataset.variables():
         vmin,vmax = float('inf'), -float('inf')
+        known = True
         for i in range(var.num_zones):
-            vmin = min(vmin, var.values(i).min())
-            vmax = max(vmax, var.values(i).max())
+            ranges = getattr(dataset.zone(i), 'ranges', None) if stored_ranges else None
+            if ranges is None:
+                values = var.values(i)
+                if values is None:
+                    known = False   # Header only, no stored ranges
+                    break
+                vrange = (values.min(), values.max())
+            elif ranges[var.index] is None:
+                continue    # Passive variable
+            else:
+                vrange = ranges[var.index]
+            vmin = min(vmin, vrange[0])
+            vmax = max(vmax, vrange[1])
         leader = "[{v.index:^3d}] {v.name}".format(v=var)
-        print(" {1:{0}s} Min= {2:+12.5e}, Max= {3:+12.5e}".format(col_width, leader, vmin, vmax))
+        if known:
+            print(" {1:{0}s} Min= {2:+12.5e}, Max= {3:+12.5e}".format(col_width, leader, vmin, vmax))
+        else:
+            print(" {1:{0}s} Min= {2:>12s}, Max= {2:>12s}".format(col_width, leader, 'n/a'))
 
     print("\nTimepoint Info:")
     if has_times and dataset.num_solution_times > 0:
@@ -148,37 +247,122 @@ def info(args):
 
 def interp(args):
     ''' Inverse-distance interpolation of dataset onto a new grid. '''
-    tec_util.interpolate_dataset(
+    return tec_util.interpolate_dataset(
         args.datafile_src,
         args.datafile_tgt,
         args.datafile_out,
+        k         = args.num_points,
+        exponent  = args.exponent,
+        radius    = args.radius,
+        jobs      = args.jobs,
+        native    = not args.engine,
+        cache_dir = args.cache_dir,
+        cache     = args.cache,
+    )
+
+def lines(args):
+    ''' Extract lines (rakes) sampled from a volume or surface dataset '''
+    return tec_util.extract_lines(
+        args.line_file,
+        args.datafile_in,
+        args.datafile_out,
+        mode         = args.mode,
+        select_zones = args.zones,
+        select_vars  = args.variables,
+        k            = args.num_cells,
+        jobs         = args.jobs,
+        cache        = args.cache,
+        native       = not args.engine,
     )
 
 def merge(args):
-    ''' Combine variables from two point-matched datasets. '''
-    tec_util.merge_datasets(
-        args.datafile1,
-        args.datafile2,
+    ''' Combine variables from point-matched datasets. '''
+    return tec_util.merge_datafiles(
+        args.datafiles,
         args.datafile_out,
         warn_duplicates = args.warn_duplicates,
+        native = not args.engine,
+    )
+
+def pipe(args):
+    ''' Chain subcommands in one process, passing datasets in memory '''
+    steps = [[]]
+    for arg in args.steps:
+        if arg == PIPE_SEPARATOR:
+            steps.append([])
+        else:
+            steps[-1].append(arg)
+    parser = build_parser()
+    dataset = None
+    inputs = set()
+    for n, step in enumerate(steps, 1):
+        if not step or step[0] not in PIPE_COMMANDS:
+            raise SystemExit('ERROR: pipe step {} must be one of: {}'.format(
+                n, ', '.join(sorted(PIPE_COMMANDS)),
+            ))
+
+        # The previous result replaces "-" (def: the first positional argument)
+        if n > 1 and '-' not in step:
+            step = [step[0], '-', *step[1:]]
+        step_args = parser.parse_args(step)
+        step_args.engine = args.engine
+        for name, value in vars(step_args).items():
+            if isinstance(value, list) and '-' in value:
+                value = [dataset if v == '-' else v for v in value]
+            elif value != '-':
+                continue
+            if dataset is None:
+                raise SystemExit(f'ERROR: pipe step {n} ({step[0]}) has no input dataset')
+            setattr(step_args, name, dataset if value == '-' else value)
+
+        # Intermediate results stay in memory (often as views of the input
+        # files, which must not be overwritten); the last step writes its output
+        out = getattr(step_args, 'datafile_out', None)
+        for value in vars(step_args).values():
+            for v in value if isinstance(value, list) else [value]:
+                if isinstance(v, str) and v != out and os.path.isfile(v):
+                    inputs.add(os.path.realpath(v))
+        if n < len(steps):
+            step_args.datafile_out = None
+        elif out and os.path.realpath(out) in inputs:
+            raise SystemExit(f'ERROR: pipe output {out} is also an input; write a new file')
+        result = step_args.func(step_args)
+        if result is not None:
+            dataset = result
+
+def probe(args):
+    ''' Sample dataset values at probe points '''
+    tec_util.probe_points(
+        args.datafile_in,
+        args.points_file,
+        args.datafile_out,
+        mode         = args.mode,
+        select_zones = args.zones,
+        select_vars  = args.variables,
+        k            = args.num_cells,
+        jobs         = args.jobs,
+        cache        = args.cache,
+        native       = not args.engine,
     )
 
 def rename_vars(args):
     ''' Rename variables within the dataset. '''
     name_map = dict([np.split('=') for np in args.name_pairs])
-    tec_util.rename_variables(
+    return tec_util.rename_variables(
         args.datafile_in,
         args.datafile_out,
-        name_map
+        name_map,
+        native = not args.engine,
     )
 
 def rename_zones(args):
-    ''' Rename variables within the dataset. '''
+    ''' Rename zones within the dataset. '''
     name_map = dict([np.split('=') for np in args.name_pairs])
-    tec_util.rename_zones(
+    return tec_util.rename_zones(
         args.datafile_in,
         args.datafile_out,
-        name_map
+        name_map,
+        native = not args.engine,
     )
 
 def revolve(args):
@@ -191,32 +375,44 @@ def revolve(args):
             vectors.update(v)
 
     # Dispacth to library
-    tec_util.revolve_dataset(
+    return tec_util.revolve_dataset(
         args.datafile_in,
         args.datafile_out,
         radial_coord = args.radial_coord,
         planes       = args.num_planes,
         angle        = args.angle,
         vector_vars  = vectors,
+        native       = not args.engine,
+        jobs         = args.jobs,
     )
 
+def serve(args):
+    ''' Serve commands from a pool of warm Tecplot engines '''
+    path = args.socket or tec_util.server.socket_path()
+    print('Serving tec_util commands on {} (Ctrl-C to stop)'.format(path), flush=True)
+    tec_util.server.serve(path, workers=args.workers)
+
 def slice(args):
     ''' Extract slices from dataset of surfaces zones. '''
-    tec_util.slice_surfaces(
+    return tec_util.slice_surfaces(
         args.slice_file,
         args.datafile_in,
-        args.datafile_out
+        args.datafile_out,
+        native = not args.engine,
+        cache  = args.cache,
     )
 
 def stats(args):
-    ''' Extract zone max/min/averages for each variable. '''
+    ''' Extract zone max/min/mean/std for each variable. '''
     stats = tec_util.compute_statistics(
         args.datafile_in,
-        select_zones = arg.zones,
+        select_zones = args.zones,
         select_vars = args.variables,
+        native = not args.engine,
+        index = args.index,
     )
 
-    columns = ['Variable,', 'ZoneID', 'Zone,', 'Min', 'Max', 'Mean']
+    columns = ['Variable,', 'ZoneID', 'Zone,', 'Min', 'Max', 'Mean', 'Std', 'NaN', 'Inf']
     var_width  = len(columns[0])
     zone_width = len(columns[2])
     for var_name, var_stats in stats.items():
@@ -224,15 +420,16 @@ def stats(args):
         for zone in var_stats:
             zone_width = max(zone_width, len(zone.name)+1)
     print(
-        '{:{var_width}s} {:4s}, {:{zone_width}s} {:>15s}, {:>15s}, {:>15s}'
+        '{:{var_width}s} {:4s}, {:{zone_width}s} {:>15s}, {:>15s}, {:>15s}, {:>15s}, {:>8s}, {:>8s}'
         .format(*columns, var_width=var_width, zone_width=zone_width),
     )
     for var_name, var_stats in stats.items():
         for i, zone in enumerate(var_stats):
             print(
-                '{:{var_width}s} {:7s} {:{zone_width}s} {:15.6e}, {:15.6e}, {:15.6e}'
+                '{:{var_width}s} {:7s} {:{zone_width}s} {:15.6e}, {:15.6e}, {:15.6e}, {:15.6e}, {:8d}, {:8d}'
                 .format(
-                    var_name+',', str(i)+',', zone.name+',', zone.min, zone.max, zone.mean,
+                    var_name+',', str(i)+',', zone.name+',',
+                    zone.min, zone.max, zone.mean, zone.std, zone.num_nan, zone.num_inf,
                     var_width=var_width, zone_width=zone_width,
                 )
             )
@@ -254,6 +451,29 @@ def to_plt(args):
 #-------------------------------------------------------------------------------
 # Subcommand Parser Configurators
 #-------------------------------------------------------------------------------
+def configure_batch_parser(parser):
+    parser.add_argument(
+        '-i', '--inputs',
+        help = "glob pattern of datafiles to process (may be repeated)",
+        action = 'append',
+        required = True,
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help = "number of worker processes (def: number of CPUs)",
+        type = int,
+        default = None,
+    )
+    parser.add_argument(
+        'command',
+        help = (
+            "subcommand and its arguments; {path}, {dir}, {name}, {stem}, {ext} "
+            "and {index} are replaced for each input. If {path} is not used, the "
+            "input is passed as the first argument of the subcommand."
+        ),
+        nargs = argparse.REMAINDER,
+    )
+
 def configure_diff_parser(parser):
     parser.add_argument(
         'datafile_new',
@@ -289,6 +509,12 @@ def configure_diff_parser(parser):
         type = int,
         default = 3,
     )
+    parser.add_argument(
+        '--max_memory',
+        help = "approximate memory ceiling for computing deltas, e.g. 4G (def: 256M)",
+        type = memory_spec,
+        default = tec_util.MAX_MEMORY,
+    )
 
 def configure_export_parser(parser):
     parser.add_argument(
@@ -342,6 +568,12 @@ def configure_export_parser(parser):
         default = 21,
         type = int,
     )
+    parser.add_argument(
+        "--jobs", "-j",
+        help = "number of worker processes (engines) exporting pages in parallel (def: 1)",
+        default = 1,
+        type = int,
+    )
 
 def configure_extract_parser(parser):
     parser.add_argument(
@@ -380,7 +612,19 @@ def configure_generate_parser(parser):
 def configure_info_parser(parser):
     parser.add_argument(
         "datafile_in",
-        help = "file to print metadata for",
+        nargs = '+',
+        help = "file(s) to print metadata for",
+    )
+    parser.add_argument(
+        "--fast",
+        action = "store_true",
+        help = "read only the file header; variable ranges are those stored in PLT headers (n/a for ASCII files)",
+    )
+    parser.add_argument(
+        "-i", "--index",
+        action = "store_true",
+        help = "answer from the sidecar statistics index (<file>.stats.json), "
+               "creating or refreshing it if needed",
     )
 
 def configure_interp_parser(parser):
@@ -397,15 +641,100 @@ def configure_interp_parser(parser):
         help = "file where outputs are saved (def: interp.plt)",
         default = "interp.plt",
     )
+    parser.add_argument(
+        '-k', '--num_points',
+        help = "number of source points used for each target point (def: 8)",
+        type = int,
+        default = 8,
+    )
+    parser.add_argument(
+        '-e', '--exponent',
+        help = "exponent of the inverse-distance weights (def: 3.5)",
+        type = float,
+        default = 3.5,
+    )
+    parser.add_argument(
+        '-r', '--radius',
+        help = "ignore source points farther than radius (def: no limit)",
+        type = float,
+        default = None,
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help = "number of threads for neighbour searches (def: number of CPUs)",
+        type = int,
+        default = None,
+    )
+    parser.add_argument(
+        '-c', '--cache_dir',
+        help = (
+            "directory where interpolation weights are cached and reused "
+            "for files on the same grids (def: $TEC_UTIL_CACHE_DIR, if set)"
+        ),
+        default = os.environ.get('TEC_UTIL_CACHE_DIR'),
+    )
+    parser.add_argument(
+        '--cache',
+        help = "save the source zone bounding boxes next to the datafile (*.zones.npz) and reuse them",
+        action = 'store_true',
+    )
 
-def configure_merge_parser(parser):
+def configure_lines_parser(parser):
+    parser.add_argument(
+        "line_file",
+        help = "file defining the lines to be sampled (Python or YAML)",
+    )
+    parser.add_argument(
+        "datafile_in",
+        help = "dataset to be sampled (first 2 or 3 variables are the coordinates)",
+    )
+    parser.add_argument(
+        "-o", "--datafile_out",
+        help = "file where extracted lines will be saved (def: lines.plt)",
+        default = "lines.plt",
+    )
     parser.add_argument(
-        'datafile1',
-        help = 'base dataset for merge',
+        '-m', '--mode',
+        help = "cell: values interpolated in the cell holding each point; nearest: values at the nearest node (def: cell)",
+        choices = ['cell', 'nearest'],
+        default = 'cell',
     )
     parser.add_argument(
-        'datafile2',
-        help = 'dataset merged into dataset1',
+        '-z', '--zones',
+        help = "Comma-separated list of zones to search (supports globs)",
+        type = glob_spec,
+        default = None, # all zones
+    )
+    parser.add_argument(
+        '-v', '--variables',
+        help = "Comma-separated list of variables to sample (supports globs)",
+        type = glob_spec,
+        default = None,  # all vars
+    )
+    parser.add_argument(
+        '-k', '--num_cells',
+        help = "cells tested per point in cell mode (def: 16)",
+        type = int,
+        default = 16,
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help = "number of threads for searches (def: number of CPUs)",
+        type = int,
+        default = None,
+    )
+    parser.add_argument(
+        '--cache',
+        help = "save the search index next to the datafile (*.probe.npz) and reuse it",
+        action = 'store_true',
+    )
+
+def configure_merge_parser(parser):
+    parser.add_argument(
+        'datafiles',
+        metavar = 'datafile',
+        nargs = '+',
+        help = 'datasets to merge; later datasets take precedence (at least two)',
     )
     parser.add_argument(
         '-o', '--datafile_out',
@@ -420,6 +749,68 @@ def configure_merge_parser(parser):
         default = True
     )
 
+def configure_pipe_parser(parser):
+    parser.add_argument(
+        'steps',
+        help = (
+            "subcommands and their arguments, separated by '{sep}'. Each step "
+            "after the first gets the previous result in place of '-' or, if '-' "
+            "is not used, as its first argument. Only the last step writes its "
+            "output file. Steps: {cmds}"
+        ).format(sep=PIPE_SEPARATOR, cmds=', '.join(sorted(PIPE_COMMANDS))),
+        nargs = argparse.REMAINDER,
+    )
+
+def configure_probe_parser(parser):
+    parser.add_argument(
+        'datafile_in',
+        help = "dataset to be probed (first 2 or 3 variables are the coordinates)",
+    )
+    parser.add_argument(
+        'points_file',
+        help = "CSV or whitespace-separated file of probe coordinates (x,y or x,y,z)",
+    )
+    parser.add_argument(
+        '-o', '--datafile_out',
+        help = "file where probe values are saved; CSV if *.csv, else tab-separated (def: probe.csv)",
+        default = "probe.csv",
+    )
+    parser.add_argument(
+        '-m', '--mode',
+        help = "nearest: values at the nearest node; cell: values interpolated in the cell holding the point (def: nearest)",
+        choices = ['nearest', 'cell'],
+        default = 'nearest',
+    )
+    parser.add_argument(
+        '-z', '--zones',
+        help = "Comma-separated list of zones to search (supports globs)",
+        type = glob_spec,
+        default = None, # all zones
+    )
+    parser.add_argument(
+        '-v', '--variables',
+        help = "Comma-separated list of variables to sample (supports globs)",
+        type = glob_spec,
+        default = None,  # all vars
+    )
+    parser.add_argument(
+        '-k', '--num_cells',
+        help = "cells tested per point in cell mode (def: 16)",
+        type = int,
+        default = 16,
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help = "number of threads for searches (def: number of CPUs)",
+        type = int,
+        default = None,
+    )
+    parser.add_argument(
+        '--cache',
+        help = "save the search index next to the datafile (*.probe.npz) and reuse it",
+        action = 'store_true',
+    )
+
 def configure_rename_vars_parser(parser):
     parser.add_argument(
         "datafile_in",
@@ -489,6 +880,25 @@ def configure_revolve_parser(parser):
         action = 'append',
         default = None
     )
+    parser.add_argument(
+        "-j", "--jobs",
+        help = "number of threads used to revolve zones (def: number of CPUs)",
+        type = int,
+        default = None
+    )
+
+def configure_serve_parser(parser):
+    parser.add_argument(
+        '-w', '--workers',
+        help = "number of worker processes/engines to keep alive (def: 1)",
+        type = int,
+        default = 1,
+    )
+    parser.add_argument(
+        '-s', '--socket',
+        help = "path of the Unix socket (def: $TEC_UTIL_SOCKET or /tmp/tec_util-<uid>.sock)",
+        default = None,
+    )
 
 def configure_slice_parser(parser):
     parser.add_argument(
@@ -504,6 +914,11 @@ def configure_slice_parser(parser):
         help = "file where extracted slices will be saved (def: slices.plt)",
         default = "slices.plt",
     )
+    parser.add_argument(
+        "--cache",
+        help = "save the zone bounding boxes next to the datafile (*.zones.npz) and reuse them",
+        action = 'store_true',
+    )
 
 def configure_stats_parser(parser):
     parser.add_argument(
@@ -522,6 +937,12 @@ def configure_stats_parser(parser):
         type = glob_spec,
         default = None,  # all zones
     )
+    parser.add_argument(
+        "-i", "--index",
+        action = "store_true",
+        help = "answer from the sidecar statistics index (<file>.stats.json), "
+               "creating or refreshing it if needed",
+    )
 
 def configure_to_ascii_parser(parser):
     parser.add_argument(
@@ -572,6 +993,26 @@ def build_parser():
         dest = 'loglevel',
         const = logging.DEBUG,
     )
+    parser.add_argument(
+        '--engine',
+        help = 'always load data with the Tecplot engine (no native readers)',
+        action = 'store_true',
+    )
+    parser.add_argument(
+        '--local',
+        help = 'run in this process even if a tec_util server is running',
+        action = 'store_true',
+    )
+    parser.add_argument(
+        '--profile',
+        metavar = 'REPORT',
+        help = 'time each phase (load/select/compute/write, per zone) and save a JSON report',
+    )
+    parser.add_argument(
+        '--trace',
+        metavar = 'TRACE',
+        help = 'save the profiled phases as a Chrome trace-event file',
+    )
     subparsers = parser.add_subparsers(
         metavar = 'cmd',
         help = 'Subcommand to execute',
@@ -580,16 +1021,21 @@ def build_parser():
     # Subcommand parsers
     cmds = {
         # name            function       parser
+        'batch':        ( batch,         configure_batch_parser        ),
         'diff':         ( diff,          configure_diff_parser         ),
         'export':       ( export,        configure_export_parser       ),
         'extract':      ( extract,       configure_extract_parser      ),
         'generate':     ( generate,      configure_generate_parser     ),
         'info':         ( info,          configure_info_parser         ),
         'interp':       ( interp,        configure_interp_parser       ),
+        'lines':        ( lines,         configure_lines_parser        ),
         'merge':        ( merge,         configure_merge_parser        ),
+        'pipe':         ( pipe,          configure_pipe_parser         ),
+        'probe':        ( probe,         configure_probe_parser        ),
         'rename_vars':  ( rename_vars,   configure_rename_vars_parser  ),
         'rename_zones': ( rename_zones,  configure_rename_zones_parser ),
         'revolve':      ( revolve,       configure_revolve_parser      ),
+        'serve':        ( serve,         configure_serve_parser        ),
         'slice':        ( slice,         configure_slice_parser        ),
         'stats':        ( stats,         configure_stats_parser        ),
         'to_ascii':     ( to_ascii,      configure_to_ascii_parser     ),
@@ -606,18 +1052,51 @@ def build_parser():
 
     return parser
 
+def run(args):
+    ''' Run the selected subcommand, profiling it if requested '''
+    if not (args.profile or args.trace):
+        return args.func(args)
+    with tec_util.profiling(args.profile, args.trace) as profiler:
+        status = args.func(args)
+    print('{:8s} {:>6s} {:>10s} {:>10s} {:>10s} {:>10s}'.format(
+        'Phase', 'Calls', 'Wall', 'CPU', 'Peak RSS', 'RSS Growth',
+    ), file=sys.stderr)
+    for name, total in profiler.summary().items():
+        rss, growth = [
+            '-' if total[key] is None else '{:.0f}M'.format(total[key] / 2**20)
+            for key in ['peak_rss', 'rss_growth']
+        ]
+        print('{:8s} {:6d} {:9.3f}s {:9.3f}s {:>10s} {:>10s}'.format(
+            name, total['count'], total['wall'], total['cpu'], rss, growth,
+        ), file=sys.stderr)
+    return status
+
 def main(args=None):
     if not args:
         args = sys.argv[1:]
+    argv = list(args)
     parser = build_parser()
     args = parser.parse_args(args)
     logging.getLogger('tec_util').setLevel(args.loglevel)
-    if "func" in args:
-        args.func(args)
-    else:
+    status = None
+    if "func" not in args:
         parser.print_help()
+    elif args.local or args.profile or args.trace or args.func in (batch, serve):
+        # Profiles are printed/written by this process, so don't forward
+        status = run(args)
+    else:
+        # Hand the command to a warm server if one is running
+        result = tec_util.server.forward(argv)
+        if result is None:
+            status = run(args)
+        else:
+            ok, output = result
+            sys.stdout.write(output)
+            status = 0 if ok else 1
     if os.path.exists("batch.log"):
         os.remove("batch.log")
+    if status:
+        sys.exit(status)
 
 if __name__ == '__main__':
     main()
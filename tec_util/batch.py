@@ -0,0 +1,105 @@
+''' Process pool used by the batch subcommand
+
+Commands are command lines for tec_util.__main__, run by long-lived
+worker processes. Each worker starts the Tecplot engine at most once (on
+first use) and reuses it for every file it is given, so engine startup is
+paid once per worker rather than once per file. Workers are spawned, not
+forked, since the engine cannot be shared across a fork.
+'''
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import time
+
+LOG = logging.getLogger(__name__)
+
+def expand_template(args, path, index):
+    ''' Fill {path}, {dir}, {name}, {stem}, {ext}, {index} in command arguments '''
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    fields = {
+        'path':  path,
+        'dir':   os.path.dirname(path) or '.',
+        'name':  name,
+        'stem':  stem,
+        'ext':   ext,
+        'index': index,
+    }
+    return [a.format(**fields) for a in args]
+
+def loglevel_options(loglevel):
+    ''' Command line options that reproduce a tec_util log level '''
+    if loglevel <= logging.DEBUG:
+        return ['--debug']
+    if loglevel <= logging.INFO:
+        return ['--verbose']
+    return []
+
+def init_worker(warm_engine=False):
+    ''' Initialize a worker process, optionally starting the Tecplot engine '''
+    if warm_engine:
+        try:
+            import tecplot as tp
+            tp.new_layout()
+        except Exception:
+            LOG.warning('Could not start the Tecplot engine in worker %d', os.getpid(),
+                        exc_info=True)
+
+def run_command(argv, cwd=None, env=None):
+    ''' Run one tec_util command line, returning (ok, elapsed, output)
+
+        Output written to stdout (including log messages) is captured and
+        returned so the results of concurrent commands are not interleaved.
+        If cwd is given, the command is run in that directory; env holds
+        environment variables set while it runs.
+    '''
+    from .__main__ import build_parser, run
+    start = time.perf_counter()
+    output = io.StringIO()
+    logger = logging.getLogger('tec_util')
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
+    ))
+    logger.addHandler(handler)
+    logger.propagate = False
+    prev_cwd = os.getcwd()
+    prev_env = {k: os.environ.get(k) for k in env or {}}
+    ok = True
+    try:
+        with contextlib.redirect_stdout(output):
+            if cwd:
+                os.chdir(cwd)
+            os.environ.update(env or {})
+            args = build_parser().parse_args(argv)
+            logger.setLevel(args.loglevel)
+            ok = not run(args)
+    except (Exception, SystemExit):
+        LOG.exception('Command failed: %s', ' '.join(argv))
+        ok = False
+    finally:
+        os.chdir(prev_cwd)
+        for k, v in prev_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        logger.removeHandler(handler)
+        logger.propagate = True
+    return ok, time.perf_counter() - start, output.getvalue()
+
+def run_commands(commands, jobs=1):
+    ''' Yield run_command() results for each command line, in order
+
+        Arguments:
+            commands    List of argument lists for tec_util.__main__
+            jobs        Number of worker processes (1 runs in this process)
+    '''
+    if jobs <= 1:
+        yield from map(run_command, commands)
+        return
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(jobs, init_worker) as pool:
+        yield from pool.imap(run_command, commands)
@@ -6,15 +6,21 @@ import numpy as np
 import os
 import sys
 import tempfile
-import yaml
-from . import generators
-from contextlib import contextmanager
+from . import interp, lines, probe, slicing, spatial, statindex, timing
+from .dataset import Dataset, DatasetWriter, FormatError, ValueLocation, Zone, ZoneType, _item_index
+from .datfile import DatWriter, read_dat, read_dat_header, rename_dat, write_dat
+from .pltfile import PltWriter, extract_plt, read_plt, read_plt_header, rename_plt, write_plt
+from .stats import zone_statistics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from importlib.machinery import SourceFileLoader
-from statistics import mean
 # import tecplot  (deferred to function scope to minimize load time)
 
 LOG = logging.getLogger(__name__)
 
+# Default memory ceiling (bytes) for chunked operations, e.g. diff
+MAX_MEMORY = 1<<28
+
 
 #-----------------------------------------------------------------------
 # Helper Functions
@@ -40,21 +46,22 @@ def get_variables(ds, select=None, ignore=None, num_ignore=0):
         Returns:
             List of Variables that match patterns
     '''
-    if not isinstance(select,list):
-        select = [select]
+    with timing.phase('select'):
+        if not isinstance(select,list):
+            select = [select]
 
-    select_index = set()
+        select_index = set()
 
-    for s in select:
-        select_index |= set(v.index for v in ds.variables(s))
+        for s in select:
+            select_index |= set(v.index for v in ds.variables(s))
 
-    if ignore:
-        select_index -= set(v.index for v in get_variables(ds, select=ignore))
+        if ignore:
+            select_index -= set(v.index for v in get_variables(ds, select=ignore))
 
-    if num_ignore:
-        select_index -= set(range(num_ignore))
+        if num_ignore:
+            select_index -= set(range(num_ignore))
 
-    return [ds.variable(index) for index in sorted(select_index)]
+        return [ds.variable(index) for index in sorted(select_index)]
 
 def get_zones(ds, select=None, ignore=None, num_ignore=0):
     ''' Return list of zone objects matching specified patterns
@@ -68,21 +75,22 @@ def get_zones(ds, select=None, ignore=None, num_ignore=0):
         Returns:
             List of Zones that match patterns
     '''
-    if not isinstance(select,list):
-        select = [select]
+    with timing.phase('select'):
+        if not isinstance(select,list):
+            select = [select]
 
-    select_index = set()
+        select_index = set()
 
-    for s in select:
-        select_index |= set(z.index for z in ds.zones(s))
+        for s in select:
+            select_index |= set(z.index for z in ds.zones(s))
 
-    if ignore:
-        select_index -= set(z.index for z in get_zones(ds, select=ignore))
+        if ignore:
+            select_index -= set(z.index for z in get_zones(ds, select=ignore))
 
-    if num_ignore:
-        select_index -= set(range(num_ignore))
+        if num_ignore:
+            select_index -= set(range(num_ignore))
 
-    return [ds.zone(index) for index in sorted(select_index)]
+        return [ds.zone(index) for index in sorted(select_index)]
 
 def rescale_frame(frame, num_contour):
     ''' Rescale 1st colormap for 2D and 3D plots, 1st xy-axes for XY plots '''
@@ -126,101 +134,470 @@ def set_contour_variable(frame, cvar):
 def temp_frame():
     ''' Create/deletes a temporary frame on the current layout page.
     '''
-    import tecplot
-    page  = tecplot.active_page()
-    frame = page.add_frame()
+    with timing.phase('engine'):
+        import tecplot
+        page  = tecplot.active_page()
+        frame = page.add_frame()
     yield frame
     page.delete_frame(frame)
 
-def write_dataset(filename, dataset, **kwargs):
-    ''' Writes dataset as ASCII or PLT depending on extension '''
+def is_ascii(filename):
+    ''' True if filename has the ASCII datafile extension (.dat) '''
+    return os.path.splitext(filename)[1] == ".dat"
+
+def read_native(filename, *, zones=None, variables=None):
+    ''' Read datafile w/o the Tecplot engine; returns None if not supported
+
+        zones/variables are the indices of the zones/variables to load
+        (def: all); see header_selection(). An in-memory Dataset is
+        returned as is (or as a subset sharing its arrays).
+    '''
+    if isinstance(filename, Dataset):
+        if zones is None and variables is None:
+            return filename
+        return filename.subset(zones, variables)
+    try:
+        with timing.phase('load', file=filename):
+            reader = read_plt if is_binary(filename) else read_dat
+            return reader(filename, zones=zones, variables=variables)
+    except FormatError as e:
+        LOG.info("Cannot read %s natively (%s); using Tecplot engine", filename, e)
+        return None
+
+def read_header(filename):
+    ''' Dataset of value-less zones from the datafile header (None if not supported) '''
+    try:
+        with timing.phase('select', file=filename):
+            reader = read_plt_header if is_binary(filename) else read_dat_header
+            return reader(filename)
+    except FormatError as e:
+        LOG.info("Cannot read header of %s natively (%s)", filename, e)
+        return None
+
+def is_binary(filename):
+    ''' True if the file starts with the Tecplot binary magic number '''
+    with open(filename, 'rb') as f:
+        return f.read(5) == b'#!TDV'
+
+def header_selection(filename, select_vars=None, ignore_vars=None,
+                     select_zones=None, ignore_zones=None, *, keep_vars=0):
+    ''' Resolve zone/variable patterns against the header of a datafile
+
+        Arguments:
+            filename        Path to the datafile
+            select_vars     Patterns of variables selected (see get_variables)
+            ignore_vars     Patterns of variables ignored
+            select_zones    Patterns of zones selected (see get_zones)
+            ignore_zones    Patterns of zones ignored
+            keep_vars       The first N variables are always selected
+
+        Returns:
+            (zones, variables) index lists to pass to open_dataset, so only
+            the matching blocks are loaded; (None, None) if the header
+            cannot be read natively or filename is an in-memory Dataset
+    '''
+    if isinstance(filename, Dataset):
+        return None, None   # Nothing to load; callers select from the dataset
+    header = read_header(filename)
+    if header is None:
+        return None, None
+    variables = set(range(min(keep_vars, header.num_variables)))
+    variables.update(v.index for v in get_variables(header, select_vars, ignore_vars))
+    zones = [z.index for z in get_zones(header, select_zones, ignore_zones)]
+    LOG.info("Load %d of %d zones, %d of %d variables from %s",
+             len(zones), header.num_zones, len(variables), header.num_variables, filename)
+    return zones, sorted(variables)
+
+@contextmanager
+def open_dataset(filename, *, native=True, plot_type=None, zones=None, variables=None):
+    ''' Load a datafile, preferring the native (engine-free) readers.
+
+        Yields a native Dataset if native=True and the file format is
+        supported. Otherwise, the file is loaded by PyTecplot into a
+        temporary frame (w/ initial plot type plot_type, e.g. 'Cartesian3D')
+        that is deleted on exit.
+
+        If given, only the zones/variables with the listed indices are
+        loaded (see header_selection) and the dataset is renumbered to
+        hold just those.
+
+        filename may also be an in-memory Dataset, which is used directly
+        (even if native=False).
+    '''
+    LOG.info("Load dataset %s", filename)
+    native = native or isinstance(filename, Dataset)
+    dataset = read_native(filename, zones=zones, variables=variables) if native else None
+    if dataset is not None:
+        yield dataset
+        return
+    if (zones is not None and not len(zones)) or (variables is not None and not len(variables)):
+        # Nothing to load; the engine cannot load an empty selection
+        header = read_header(filename)
+        if header is not None:
+            yield header.subset(zones, variables)
+            return
     import tecplot as tp
+    import tecplot.constant as tpc
+    kwargs = {}
+    if plot_type:
+        kwargs['initial_plot_type'] = tpc.PlotType[plot_type]
+    if zones is not None or variables is not None:
+        kwargs['collapse'] = True
+        if zones is not None:
+            kwargs['zones'] = list(zones)
+        if variables is not None:
+            kwargs['variables'] = list(variables)
+    with temp_frame() as frame:
+        with timing.phase('load', file=filename):
+            dataset = tp.data.load_tecplot(filename, frame=frame, **kwargs)
+        yield dataset
+
+def open_writer(filename, title, variables, zones, aux_data=None):
+    ''' Create a streaming writer (DatWriter|PltWriter) based on extension
+
+        Zones are described up front (see Zone.header) and their data is
+        then written one zone at a time with writer.write_zone(), so
+        outputs larger than memory can be produced. If filename is None,
+        a DatasetWriter collects the zones into writer.dataset instead.
+    '''
+    if filename is None:
+        return DatasetWriter(title, variables, zones, aux_data)
+    LOG.info("Write dataset %s", filename)
+    writer = DatWriter if is_ascii(filename) else PltWriter
+    return writer(filename, title, variables, zones, aux_data)
+
+def write_dataset(filename, dataset, **kwargs):
+    ''' Writes dataset as ASCII or PLT depending on extension
+
+        If filename is None, nothing is written; the dataset (or the
+        zones/variables selected by the keyword arguments) is returned as
+        an in-memory Dataset instead.
+    '''
+    if filename is None:
+        return to_native(dataset, kwargs.get('zones'), kwargs.get('variables'))
     LOG.info("Write dataset %s", filename)
-    ext = os.path.splitext(filename)[1]
-    if ext == ".dat":
-        tp.data.save_tecplot_ascii(filename, dataset=dataset, **kwargs)
+    with timing.phase('write', file=filename):
+        if isinstance(dataset, Dataset):
+            if is_ascii(filename):
+                write_dat(filename, dataset, **kwargs)
+            else:
+                write_plt(filename, dataset, **kwargs)
+            return
+        import tecplot as tp
+        if is_ascii(filename):
+            tp.data.save_tecplot_ascii(filename, dataset=dataset, **kwargs)
+        else:
+            tp.data.save_tecplot_plt(filename, dataset=dataset, **kwargs)
+
+def to_native(dataset, zones=None, variables=None):
+    ''' In-memory Dataset holding the given zones/variables (def: all)
+
+        A native Dataset is subset without copying its arrays; the values
+        of a PyTecplot dataset are copied out of the engine.
+    '''
+    if isinstance(dataset, Dataset):
+        return dataset.subset(zones, variables)
+    zones = list(dataset.zones()) if zones is None else [dataset.zone(_item_index(z)) for z in zones]
+    variables = range(dataset.num_variables) if variables is None \
+                else [_item_index(v) for v in variables]
+    result = Dataset(dataset.title, [dataset.variable(v).name for v in variables],
+                     dict(dataset.aux_data))
+    for zone in zones:
+        zone_type = ZoneType[zone.zone_type.name]
+        connectivity = None
+        if zone_type == ZoneType.Ordered:
+            dimensions = zone.dimensions
+        else:
+            dimensions = (zone.num_points, zone.num_elements)
+            connectivity = np.array(zone.nodemap.array[:]).reshape(zone.num_elements, -1)
+        locations = [ValueLocation[zone.values(v).location.name] for v in variables]
+        result.add_zone(Zone(
+            zone.name, zone_type, dimensions,
+            values        = [np.array(zone.values(v)[:]) for v in variables],
+            connectivity  = connectivity,
+            strand        = zone.strand,
+            solution_time = zone.solution_time,
+            locations     = locations if any(locations) else None,
+        ))
+    return result
+
+@contextmanager
+def dataset_file(source):
+    ''' Path of a datafile holding source (for loading with the Tecplot engine)
+
+        An in-memory Dataset is written to a temporary PLT file, which is
+        deleted on exit; paths are passed through.
+    '''
+    if not isinstance(source, Dataset):
+        yield source
+        return
+    fd, path = tempfile.mkstemp(suffix='.plt')
+    os.close(fd)
+    try:
+        write_plt(path, source)
+        yield path
+    finally:
+        os.remove(path)
+
+def zone_boxes(source, dataset, *, cache=False):
+    ''' ZoneBoxes of a dataset; with cache, saved next to source (if it is
+        a datafile) and reused while it is unchanged
+    '''
+    if not cache or isinstance(source, Dataset):
+        return spatial.ZoneBoxes.from_dataset(dataset)
+    return spatial.load_zone_boxes(source, dataset)
+
+def chunk_slices(size, chunk_size):
+    ''' Yield slices that split range(size) into chunks of chunk_size '''
+    chunk_size = max(int(chunk_size), 1)
+    for start in range(0, size, chunk_size):
+        yield slice(start, min(start + chunk_size, size))
+
+def write_differences(datafile_out, data_new, zone_new, zone_old, var_new, var_old, nskip,
+                      max_memory=MAX_MEMORY):
+    ''' Write first nskip variables of data_new plus deltas (new - old)
+
+        Output is produced one zone and one chunk at a time: each delta
+        block is written as soon as it is computed, so the working set is
+        a few chunks of max_memory/32 values regardless of zone size.
+        Deltas are floating point (at least float32), so integer
+        variables do not wrap around and mismatched zones can hold NaN.
+        Returns the Dataset of differences if datafile_out is None.
+    '''
+    chunk = max(max_memory // 32, 1)   # new + old + delta + conversion, float64
+    keep  = list(range(nskip))
+    names = [data_new.variable_names[v] for v in keep]
+    names += ["delta_" + v.name for v in var_new]
+    headers = [z.header(keep + [v.index for v in var_new]) for z in zone_new]
+    with open_writer(datafile_out, data_new.title, names, headers, data_new.aux_data) as writer:
+        for znew, zold in zip(zone_new, zone_old):
+            with timing.phase('compute', zone=znew.name):
+                inputs = [(vnew.values(znew.index), vold.values(zold.index))
+                          for vnew, vold in zip(var_new, var_old)]
+                dtypes = [znew.values(v).dtype for v in keep]
+                dtypes += [np.result_type(new.dtype, old.dtype, np.float32) for new, old in inputs]
+                writer.begin_zone(dtypes)
+                for i, v in enumerate(keep):
+                    values = znew.values(v)
+                    for s in chunk_slices(len(values), chunk):
+                        writer.write_values(i, values[s])
+                for i, (vnew, (new, old)) in enumerate(zip(var_new, inputs), nskip):
+                    if len(new) != len(old):
+                        LOG.error(
+                            'Error while computing delta "%s" for zones "%s" and "%s" '
+                            '(%d != %d values). Setting to NaN.',
+                            vnew.name, zold.name, znew.name, len(new), len(old),
+                        )
+                        nan = np.full(min(chunk, len(new)), math.nan, dtypes[i])
+                        for s in chunk_slices(len(new), chunk):
+                            writer.write_values(i, nan[:s.stop-s.start])
+                        continue
+                    for s in chunk_slices(len(new), chunk):
+                        writer.write_values(i, np.subtract(new[s], old[s], dtype=dtypes[i]))
+                writer.end_zone(znew.connectivity)
+    return getattr(writer, 'dataset', None)
+
+def revolve_values(values, planes, factors=None, *, dtype=None):
+    ''' Revolve an array of values over a number of planes in one broadcast
+
+        Returns a preallocated (planes, len(values)) array, filled with a
+        copy of values in each plane or, if factors (one per plane, e.g.
+        cos/sin of the plane angle) are given, with the outer product
+        factors x values.
+    '''
+    values = np.asarray(values)
+    out = np.empty((planes, values.size), dtype or values.dtype)
+    if factors is None:
+        out[...] = values
     else:
-        tp.data.save_tecplot_plt(filename, dataset=dataset, **kwargs)
+        np.multiply.outer(factors, values, out=out, casting='unsafe')
+    return out
+
+def write_revolved(datafile_out, data_in, vars_out, vector_vars, planes, ct, st, jobs=None):
+    ''' Write revolved copy of a native dataset, one zone/variable at a time
+
+        Each output variable is revolved with revolve_values. Blocks are
+        computed by a pool of jobs threads (NumPy releases the GIL) across
+        zones and variables, and written in order as they complete, so at
+        most about 2*jobs revolved variables are held in memory.
+    '''
+    source = {v: (v, None) for v in vars_out}
+    for v, (vy, vz) in vector_vars.items():
+        source[vy] = (v, ct)
+        source[vz] = (v, st)
+    zones = list(data_in.zones())
+    headers = [
+        Zone(zin.name, ZoneType.Ordered, [*zin.dimensions[0:zin.rank], planes],
+             strand=zin.strand, solution_time=zin.solution_time)
+        for zin in zones
+    ]
+    dtypes = {}
+    for zin in zones:
+        dtypes[zin.index] = []
+        for v in vars_out:
+            vin, factors = source[v]
+            dtype = zin.values(vin).dtype
+            if factors is not None:
+                dtype = np.result_type(dtype, np.float32)
+            dtypes[zin.index].append(dtype)
+    jobs = jobs or os.cpu_count()
+
+    def revolve(zin, i):
+        vin, factors = source[vars_out[i]]
+        with timing.phase('compute', zone=zin.name, var=vars_out[i]):
+            return revolve_values(zin.values(vin)[:], planes, factors, dtype=dtypes[zin.index][i])
+
+    with open_writer(datafile_out, data_in.title, vars_out, headers, data_in.aux_data) as writer, \
+         ThreadPoolExecutor(jobs) as pool:
+        pending = collections.deque()
+        def write_next():
+            zin, i, future = pending.popleft()
+            values = future.result()
+            with timing.phase('write', zone=zin.name, var=vars_out[i]):
+                if i == 0:
+                    writer.begin_zone(dtypes[zin.index])
+                writer.write_values(i, values)
+                if i == len(vars_out) - 1:
+                    writer.end_zone()
+        for zin in zones:
+            for i in range(len(vars_out)):
+                pending.append((zin, i, pool.submit(revolve, zin, i)))
+                if len(pending) > jobs:
+                    write_next()
+        while pending:
+            write_next()
+    return getattr(writer, 'dataset', None)
+
+def probe_source(datafile_in, dim, select_vars=None, ignore_vars=None,
+                 select_zones=None, ignore_zones=None, *, cache=False, cells=False, native=True):
+    ''' Native Dataset of the selected zones/variables of a datafile (with its
+        first dim variables as coordinates) and its saved probe.ProbeIndex
+        (None unless cache is set)
+    '''
+    zones, variables = header_selection(
+        datafile_in, select_vars, ignore_vars, select_zones, ignore_zones, keep_vars=dim,
+    )
+    with open_dataset(datafile_in, native=native, zones=zones, variables=variables) as ds:
+        zone_index = [z.index for z in get_zones(ds, select_zones, ignore_zones)]
+        var_index = set(range(dim))
+        var_index.update(v.index for v in get_variables(ds, select_vars, ignore_vars))
+        dataset = to_native(ds, zone_index, sorted(var_index))
+    index = None
+    if cache and not isinstance(datafile_in, Dataset):
+        file_zones = zone_index if zones is None else [sorted(zones)[z] for z in zone_index]
+        index = probe.load_probe_index(datafile_in, dataset, dim, file_zones, cells=cells)
+    return dataset, index
 
 
 #-----------------------------------------------------------------------
 # API Functions
 #-----------------------------------------------------------------------
+def load_dataset_index(datafile_in, *, native=True):
+    ''' Sidecar statistics index of a datafile, rebuilt if missing/stale
+
+        See tec_util.statindex. Rebuilding reads every variable in every
+        zone once and saves the index next to the datafile.
+    '''
+    stats_index = statindex.load_index(datafile_in)
+    if stats_index is None:
+        with open_dataset(datafile_in, native=native, plot_type='Cartesian3D') as dataset:
+            LOG.info("Index statistics of %s", datafile_in)
+            with timing.phase('compute', file=datafile_in):
+                stats_index = statindex.update_index(datafile_in, dataset)
+    return stats_index
+
 def compute_statistics(datafile_in, *,
                        select_vars=None, ignore_vars=None,
-                       select_zones=None, ignore_zones=None):
-    ''' Compute min/max/mean for each variable/zone combination
+                       select_zones=None, ignore_zones=None, native=True, index=False):
+    ''' Compute min/max/mean/std for each variable/zone combination
 
     Arguments:
-        datafile_in    [str]  Path of Tecplot datafile
+        datafile_in    [str|Dataset]  Path of Tecplot datafile (or in-memory Dataset)
         select_vars    [list(str)] Name patterns of variables to analyze (def: all)
         ignore_vars    [list(str)] Name patterns of variables to ignore (def: none)
         select_zones   [list(str)] Name patterns of zones to analyze (def: all)
         ignore_zones   [list(str)] Name patterns of zones to ignore (def: none)
+        native         [bool] Read the datafile w/o the Tecplot engine if possible
+        index          [bool] Answer from the sidecar statistics index of the
+                       datafile if it is valid; otherwise scan all variables
+                       and zones and save a new index (def: False; ignored
+                       for in-memory Datasets)
 
     Returns:
-        stats_info         [dict(list(stats_tuple))] Data structure with
-                           max/min/mean for every variable/zone combination
+        stats_info         [dict(list(ZoneStats))] Data structure with
+                           max/min/mean/std and NaN/Inf counts for every
+                           variable/zone combination
                            e.g. stats_info[var_name][zone_id].max
     '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-    with temp_frame() as frame:
-
-        # Load the dataset
-        LOG.info("Load dataset %s", datafile_in)
-        dataset = tp.data.load_tecplot(
-            datafile_in,
-            frame = frame,
-            initial_plot_type = tpc.PlotType.Cartesian3D
-        )
+    if index and not isinstance(datafile_in, Dataset):
+        stats_index = load_dataset_index(datafile_in, native=native)
+        dataset = statindex.index_dataset(stats_index)
+        variables = get_variables(dataset, select_vars, ignore_vars)
+        zones = get_zones(dataset, select_zones, ignore_zones)
+        return {
+            var.name: [statindex.index_stats(stats_index, var.index, zone.index) for zone in zones]
+            for var in variables
+        }
+
+    load_zones, load_vars = header_selection(
+        datafile_in, select_vars, ignore_vars, select_zones, ignore_zones,
+    )
+    with open_dataset(datafile_in, native=native, plot_type='Cartesian3D',
+                      zones=load_zones, variables=load_vars) as dataset:
 
         # Get all variables/zones matching requested patterns
-        variables = get_variables(ds, select_vars, ignore_vars)
+        variables = get_variables(dataset, select_vars, ignore_vars)
         LOG.info("Generating statisitics for: %s", ' '.join([v.name for v in variables]))
-        zones = get_zones(ds, select_zones, ignore_zones)
+        zones = get_zones(dataset, select_zones, ignore_zones)
         LOG.info("Gathering statisitics from: %s", ' '.join([z.name for z in zones]))
 
         # Compute per-zone statistics
         var_stats = {}
-        stats_tuple = collections.namedtuple('ZoneStats',['name','max','min','mean'])
         for var in variables:
             zone_stats = []
             for zone in zones:
-                data = dataset.variable(var.index).values(zone.index)
-                zone_stats.append(stats_tuple(zone.name, data.max(), data.min(), mean(data[:])))
+                with timing.phase('compute', zone=zone.name, var=var.name):
+                    data = dataset.variable(var.index).values(zone.index)
+                    zone_stats.append(zone_statistics(zone.name, data))
             var_stats[var.name] = zone_stats
 
     return var_stats
 
 def difference_datasets(datafile_new, datafile_old, datafile_out, *, nskip=3,
                         select_vars=None, ignore_vars=None,
-                        select_zones=None, ignore_zones=None):
+                        select_zones=None, ignore_zones=None, native=True,
+                        max_memory=MAX_MEMORY):
     ''' Compute variable-by-variable difference between datasets.
 
         INPUTS:
             datafile_new    Path to datafile to be differenced
             datafile_old    Path to datafile to use a baseline
-            datafile_out    Path where datafile of differences is saved
+            datafile_out    Path where datafile of differences is saved (None:
+                            return the differences as an in-memory Dataset)
             nskip           Number of variables at start of datasets to skip (def:3)
             select_vars     [list(str)] Name patterns of variables to analyze (def: all)
             ignore_vars     [list(str)] Name patterns of variables to ignore (def: none)
             select_zones    [list(str)] Name patterns of zones to analyze (def: all)
             ignore_zones    [list(str)] Name patterns of zones to ignore (def: none)
+            native          Read/write w/o the Tecplot engine if possible (def: True)
+            max_memory      Approximate ceiling (bytes) on the working set used to
+                            compute deltas; zones are processed in chunks that fit
+                            (def: 256 MiB)
 
         OUTPUTS:
-            none
-    '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-
-    with temp_frame() as frame_new, temp_frame() as frame_old:
+            Dataset of differences if datafile_out is None, else none
 
-        # Load datasets
-        LOG.info("Load new dataset from %s", datafile_new)
-        data_new = tp.data.load_tecplot(datafile_new, frame = frame_new)
-        LOG.info("Load old dataset from %s", datafile_old)
-        data_old = tp.data.load_tecplot(datafile_old, frame = frame_old)
+        Inputs may also be in-memory Datasets.
+    '''
+    selection = [
+        header_selection(datafile, select_vars, ignore_vars, select_zones, ignore_zones,
+                         keep_vars=nskip)
+        for datafile in (datafile_new, datafile_old)
+    ]
+    with open_dataset(datafile_new, native=native, zones=selection[0][0],
+                      variables=selection[0][1]) as data_new, \
+         open_dataset(datafile_old, native=native, zones=selection[1][0],
+                      variables=selection[1][1]) as data_old:
 
         # Get variable information
         var_new = get_variables(data_new, select_vars, ignore_vars, nskip)
@@ -256,35 +633,67 @@ def difference_datasets(datafile_new, datafile_old, datafile_out, *, nskip=3,
                     i, znew.name, zold.name,
                 )
 
-        # Compute delta new - old. Deltas get appended to data_new.
+        # Native datasets: stream deltas to file one zone at a time
         LOG.info("Compute dataset differences (new - old).")
+        if isinstance(data_new, Dataset):
+            return write_differences(datafile_out, data_new, zone_new, zone_old, var_new, var_old,
+                                     nskip, max_memory)
+
+        # Compute delta new - old. Deltas get appended to data_new.
         initial_num_vars = data_new.num_variables
         for vnew, vold in zip(var_new, var_old):
             delta = data_new.add_variable("delta_" + vnew.name)
             for znew, zold in zip(zone_new, zone_old):
                 try:
-                    delta.values(znew.index)[:] = np.subtract(
-                        vnew.values(znew.index)[:],
-                        vold.values(zold.index)[:],
-                    )
+                    with timing.phase('compute', zone=znew.name, var=vnew.name):
+                        values_new = vnew.values(znew.index)
+                        values_old = vold.values(zold.index)
+                        values_out = delta.values(znew.index)
+                        if len(values_new) != len(values_old):
+                            raise ValueError(f'{len(values_new)} != {len(values_old)} values')
+                        for s in chunk_slices(len(values_out), max_memory // 32):
+                            values_out[s] = np.subtract(values_new[s], values_old[s])
                 except:
                     LOG.exception(
                         'Error while computing delta "%s" for zones "%s" and "%s". Setting to NaN.',
-                        zold.name, znew.name,
+                        vnew.name, zold.name, znew.name,
                     )
                     delta.values(znew.index)[:] = [math.nan] * len(delta.values(znew.index))
 
         # Save results
         vars_to_save = itertools.chain(range(nskip),range(initial_num_vars, data_new.num_variables))
-        write_dataset(datafile_out, data_new, variables=vars_to_save, zones=zone_new)
+        return write_dataset(datafile_out, data_new, variables=vars_to_save, zones=zone_new)
+
+def page_filenames(output_dir, prefix, page_names):
+    ''' Output PNG path of each page: <output_dir>/<prefix><page_name>.png
+
+        Pages that repeat an earlier page name get their page index
+        appended (<prefix><page_name>-<index>.png), so every page is
+        exported to its own file no matter how pages are distributed.
+    '''
+    seen = set()
+    filenames = []
+    for index, name in enumerate(page_names):
+        if name in seen:
+            name = f'{name}-{index}'
+        seen.add(name)
+        filenames.append(os.path.join(output_dir, prefix + name + ".png"))
+    return filenames
 
 def export_pages(output_dir, prefix='', width=600, supersample=2,
-                 yvar=None, cvar=None, rescale=False, num_contour=21):
-    ''' Export all pages in the current layout to <page_name>.png '''
+                 yvar=None, cvar=None, rescale=False, num_contour=21, pages=None):
+    ''' Export all pages in the current layout to <page_name>.png
+
+        If pages (list of page indices) is given, only those pages are
+        exported.
+    '''
     import tecplot as tp
     import tecplot.constant as tpc
     os.makedirs(output_dir, exist_ok=True)
-    for page in tp.pages():
+    all_pages = list(tp.pages())
+    outfiles = page_filenames(output_dir, prefix, [page.name for page in all_pages])
+    for index in (range(len(all_pages)) if pages is None else pages):
+        page = all_pages[index]
         page.activate()
         for frame in page.frames():
             LOG.debug("Pre-process frame %s on page %s", frame.name, page.name)
@@ -294,32 +703,126 @@ def export_pages(output_dir, prefix='', width=600, supersample=2,
                 set_contour_variable(frame, cvar)
             if rescale:
                 rescale_frame(frame, num_contour)
-        outfile = os.path.join(output_dir, prefix + page.name + ".png")
+        outfile = outfiles[index]
+        if os.path.basename(outfile) != prefix + page.name + ".png":
+            LOG.warning("Duplicate page name '%s'; page %d is exported to %s", page.name, index, outfile)
         LOG.info("Export page %s to %s", page.name, outfile)
-        tp.export.save_png(
-            outfile, width,
-            region = tpc.ExportRegion.AllFrames,
-            supersample = supersample
-        )
+        with timing.phase('write', page=page.name):
+            tp.export.save_png(
+                outfile, width,
+                region = tpc.ExportRegion.AllFrames,
+                supersample = supersample
+            )
+
+def load_layout(layout_file):
+    ''' Load a layout file, or configure the layout from a YAML spec (*.yml) '''
+    import tecplot as tp
+    with timing.phase('load', file=layout_file):
+        if layout_file.endswith('.yml'):
+            configure_layout(layout_file)
+        else:
+            tp.layout.load_layout(layout_file)
+
+class _RecordCapture(logging.Handler):
+    ''' Keep log records (made picklable) tagged with the current page '''
+
+    def __init__(self):
+        super().__init__()
+        self.page = -1
+        self.records = []
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append((self.page, record))
+
+def _export_share(layout_file, output_dir, options, worker, jobs, loglevel):
+    ''' Export pages worker, worker+jobs, ... of a layout (in a worker process) '''
+    logger = logging.getLogger('tec_util')
+    logger.setLevel(loglevel)
+    capture = _RecordCapture()
+    logger.addHandler(capture)
+    logger.propagate = False
+    try:
+        import tecplot as tp
+        load_layout(layout_file)
+        for index in range(worker, len(list(tp.pages())), jobs):
+            capture.page = index
+            export_pages(output_dir, pages=[index], **options)
+    except Exception:
+        LOG.exception('Export worker %d failed', worker)
+        return capture.records, False
+    return capture.records, True
+
+def export_layout(layout_file, output_dir, prefix='', width=600, supersample=2,
+                  yvar=None, cvar=None, rescale=False, num_contour=21, *, jobs=1):
+    ''' Load a layout (or YAML spec) and export all pages to <page_name>.png
+
+        With jobs > 1, pages are distributed round-robin over jobs worker
+        processes, each of which loads the layout in its own Tecplot engine
+        and exports its share of the pages. Output names do not depend on
+        the number of jobs (see page_filenames). Log messages of the
+        workers are collected and re-logged here in page order.
+    '''
+    options = dict(
+        prefix = prefix, width = width, supersample = supersample, yvar = yvar,
+        cvar = cvar, rescale = rescale, num_contour = num_contour,
+    )
+    if jobs <= 1:
+        load_layout(layout_file)
+        export_pages(output_dir, **options)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    loglevel = logging.getLogger('tec_util').getEffectiveLevel()
+    with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+        shares = [
+            pool.submit(_export_share, layout_file, output_dir, options, n, jobs, loglevel)
+            for n in range(jobs)
+        ]
+        results = [share.result() for share in shares]
+    records = [r for records, ok in results for r in records]
+    for page, record in sorted(records, key=lambda r: r[0]):
+        logging.getLogger(record.name).handle(record)
+    failed = sum(not ok for records, ok in results)
+    if failed:
+        raise RuntimeError(f'{failed} of {jobs} export workers failed; see log for details')
 
 def extract(datafile_in, datafile_out, *,
-            select_vars=None, ignore_vars=None, select_zones=None, ignore_zones=None):
+            select_vars=None, ignore_vars=None, select_zones=None, ignore_zones=None,
+            native=True):
     ''' Copy specified zones/variables into a new file
 
     Arguments:
-        datafile_in     [str] Path to input Tecplot datafile
-        datafile_out    [str] Path to Tecplot datafile to be written
+        datafile_in     [str|Dataset] Path to input Tecplot datafile (or in-memory Dataset)
+        datafile_out    [str] Path to Tecplot datafile to be written (None: return
+                        the extracted zones/variables as an in-memory Dataset)
         select_vars     [list(str)] Name patterns of variables to analyze (def: all)
         ignore_vars     [list(str)] Name patterns of variables to ignore (def: none)
         select_zones    [list(str)] Name patterns of zones to analyze (def: all)
         ignore_zones    [list(str)] Name patterns of zones to ignore (def: none)
+        native          [bool] Read/write w/o the Tecplot engine if possible. PLT
+                        to PLT extraction copies the selected blocks by byte range
+                        without decoding them (see pltfile.extract_plt).
     '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-    with temp_frame() as frame:
-        LOG.info("Load input dataset from %s", datafile_in)
-        ds = tp.data.load_tecplot(datafile_in, frame=frame)
-        write_dataset(datafile_out, ds,
+    zones, variables = header_selection(
+        datafile_in, select_vars, ignore_vars, select_zones, ignore_zones,
+    )
+    if native and zones is not None and datafile_out is not None \
+            and not is_ascii(datafile_out) and is_binary(datafile_in):
+        try:
+            LOG.info("Copy %d zones, %d variables to %s", len(zones), len(variables), datafile_out)
+            with timing.phase('write', file=datafile_out):
+                extract_plt(datafile_in, datafile_out, zones=zones, variables=variables)
+            return
+        except FormatError as e:
+            LOG.info("Cannot copy blocks of %s (%s)", datafile_in, e)
+    with open_dataset(datafile_in, native=native, zones=zones, variables=variables) as ds:
+        return write_dataset(datafile_out, ds,
             zones = get_zones(ds, select_zones, ignore_zones),
             variables = get_variables(ds, select_vars, ignore_vars),
         )
@@ -333,69 +836,254 @@ def configure_layout(spec_file):
         OUTPUTS:
             None
     '''
+    import yaml
+    from . import generators
     with open(spec_file) as sf:
         spec = yaml.safe_load(sf)
     generators.make_layout(spec['datasets'], spec['pages'], spec['equations'])
 
-def interpolate_dataset(datafile_src, datafile_tgt, datafile_out):
+def interpolate_dataset(datafile_src, datafile_tgt, datafile_out, *,
+                        k=8, exponent=3.5, radius=None, jobs=None, native=True,
+                        cache_dir=None, cache=False):
     ''' Interpolate variables from one dataset onto another (3D only)
 
         INPUTS:
             datafile_src    Path to datafile to be interpolated
             datafile_tgt    Path to datafile with interpolation coordintes
             datafile_out    Path where datafile with interpolated data is saved
+                            (None: return it as an in-memory Dataset)
+            k               Number of source points used per target point (def: 8)
+            exponent        Exponent of inverse-distance weights (def: 3.5)
+            radius          Ignore source points farther than radius (def: None,
+                            no limit; native engine only)
+            jobs            Number of threads for neighbour queries (def: number
+                            of CPUs; native engine only)
+            native          Interpolate w/o the Tecplot engine if possible (def: True)
+            cache_dir       Directory where interpolation weights are cached for
+                            reuse with the same grids (def: None, no caching;
+                            native engine only)
+            cache           Save the source zone bounding boxes next to
+                            datafile_src (*.zones.npz) and reuse them while it
+                            is unchanged (def: False)
 
         OUTPUTS:
-            none
+            Interpolated Dataset if datafile_out is None, else none
+
+        The native engine searches a k-d tree of all source points for
+        the k nearest neighbours of each target point, skipping source
+        zones whose bounding box is too far from the target zone. Variables
+        must be nodal; otherwise the Tecplot engine is used, with the same
+        source zones skipped for each target zone.
     '''
+    if native:
+        data_src = read_native(datafile_src)
+        data_tgt = read_native(datafile_tgt)
+        datasets = [d for d in (data_src, data_tgt) if d is not None]
+        nodal = all(
+            all(z.location(v) == ValueLocation.Nodal for v in range(d.num_variables))
+            for d in datasets for z in d.zones()
+        )
+        if len(datasets) == 2 and nodal:
+            headers = []
+            for zone in data_tgt.zones():
+                header = zone.header()
+                header.locations = None
+                headers.append(header)
+            zone_values = interp.interpolate_zones(
+                data_src, data_tgt,
+                k         = k,
+                exponent  = exponent,
+                radius    = radius if radius is not None else math.inf,
+                workers   = jobs or os.cpu_count(),
+                cache_dir = cache_dir,
+                boxes     = zone_boxes(datafile_src, data_src, cache=cache),
+            )
+            with open_writer(datafile_out, data_src.title, data_src.variable_names,
+                             headers, data_src.aux_data) as writer:
+                for zone, values in zip(data_tgt.zones(), zone_values):
+                    with timing.phase('write', zone=zone.name):
+                        writer.write_zone(values, zone.connectivity)
+            return getattr(writer, 'dataset', None)
+
     import tecplot as tp
     import tecplot.constant as tpc
-    with temp_frame() as frame:
+    source = datafile_src
+    with dataset_file(datafile_src) as datafile_src, \
+         dataset_file(datafile_tgt) as datafile_tgt, \
+         temp_frame() as frame:
 
         # Load datasets
         LOG.info("Load source dataset from %s", datafile_src)
-        data = tp.data.load_tecplot(
-            datafile_src,
-            frame = frame,
-            initial_plot_type = tpc.PlotType.Cartesian3D,
-        )
+        with timing.phase('load', file=datafile_src):
+            data = tp.data.load_tecplot(
+                datafile_src,
+                frame = frame,
+                initial_plot_type = tpc.PlotType.Cartesian3D,
+            )
         nzone_src = data.num_zones
+        boxes = zone_boxes(source, data, cache=cache)
         LOG.info("Load target dataset from %s", datafile_tgt)
-        tp.data.load_tecplot(
-            datafile_tgt,
-            frame = frame,
-            read_data_option = tpc.ReadDataOption.Append,
-        )
+        with timing.phase('load', file=datafile_tgt):
+            tp.data.load_tecplot(
+                datafile_tgt,
+                frame = frame,
+                read_data_option = tpc.ReadDataOption.Append,
+            )
 
         # Perform interpolation
         src_zones = [data.zone(i) for i in range(nzone_src)]
         tgt_zones = [data.zone(i) for i in range(nzone_src, data.num_zones)]
         for zone in tgt_zones:
-            tp.data.operate.interpolate_inverse_distance(
-                destination_zone = zone,
-                source_zones = src_zones,
-            )
+            with timing.phase('compute', zone=zone.name):
+                points = np.column_stack([zone.values(v)[:] for v in range(3)])
+                near = range(nzone_src)
+                if len(points):
+                    with np.errstate(invalid='ignore'):
+                        lower, upper = np.nanmin(points, axis=0), np.nanmax(points, axis=0)
+                    near = np.flatnonzero(boxes.near_mask(lower, upper, k=k))
+                tp.data.operate.interpolate_inverse_distance(
+                    destination_zone = zone,
+                    source_zones = [src_zones[z] for z in near],
+                    exponent = exponent,
+                    num_points = k,
+                )
+        LOG.info('Bounding boxes culled %d of %d source zone searches',
+                 boxes.counters['culled'], boxes.counters['tested'])
 
         # Save results
-        write_dataset(datafile_out, data, zones=tgt_zones)
+        return write_dataset(datafile_out, data, zones=tgt_zones)
+
+def probe_points(datafile_in, points, datafile_out=None, *, mode='nearest',
+                 select_vars=None, ignore_vars=None, select_zones=None, ignore_zones=None,
+                 k=16, jobs=None, cache=False, native=True):
+    ''' Sample a dataset at probe points (e.g. sensor locations)
+
+        INPUTS:
+            datafile_in     Path to datafile to be probed (or in-memory Dataset); its
+                            first 2 or 3 variables are the coordinates of the points
+            points          (m, 2|3) array of probe coordinates, or the path of a CSV
+                            or whitespace-separated file holding them
+            datafile_out    Path where the results are written as CSV (*.csv) or a
+                            tab-separated table (def: None, not written)
+            mode            'nearest': values at the node nearest to each point
+                            (cell-centered variables are NaN); 'cell': values linearly
+                            interpolated in the cell holding each point (def: nearest)
+            select_vars     Name patterns of variables sampled (def: all)
+            ignore_vars     Name patterns of variables not sampled (def: none)
+            select_zones    Name patterns of zones searched (def: all)
+            ignore_zones    Name patterns of zones not searched (def: none)
+            k               Cells tested per point in cell mode, nearest centres
+                            first (def: 16)
+            jobs            Number of threads for the searches (def: number of CPUs)
+            cache           Save the coordinates/cell centres next to the datafile
+                            (*.probe.npz) and reuse them while it is unchanged (def: False)
+            native          Read w/o the Tecplot engine if possible (def: True); data
+                            loaded by the engine is copied into memory
+
+        OUTPUTS:
+            probe.ProbeTable with the zone, node/cell, distance and values of each
+            point (NaN values for points outside the searched zones/cells)
+    '''
+    if isinstance(points, str):
+        points = probe.read_points(points)
+    points = np.asarray(points, dtype=np.float64)
+    dim = points.shape[1] if points.ndim == 2 else 0
+    if dim not in (2, 3):
+        raise ValueError("Probe points must have 2 or 3 coordinates")
+
+    dataset, index = probe_source(
+        datafile_in, dim, select_vars, ignore_vars, select_zones, ignore_zones,
+        cache=cache, cells=mode=='cell', native=native,
+    )
+    LOG.info("Probe %d points (%s)", len(points), mode)
+    table = probe.probe_dataset(
+        dataset, points,
+        mode    = mode,
+        index   = index,
+        k       = k,
+        workers = jobs or os.cpu_count(),
+    )
+    if datafile_out:
+        LOG.info("Write probes to %s", datafile_out)
+        with timing.phase('write', file=datafile_out):
+            probe.write_probes(datafile_out, table)
+    return table
+
+def extract_lines(line_file, datafile_in, datafile_out, *, mode='cell',
+                  select_vars=None, ignore_vars=None, select_zones=None, ignore_zones=None,
+                  k=16, jobs=None, cache=False, native=True):
+    ''' Extract line (rake) zones sampled from a volume or surface dataset.
+
+        INPUTS:
+            line_file
+                Path to a python module that defines a list of tuples called
+                "lines", or to a YAML file (*.yml, *.yaml) with a "lines" list;
+                or the list itself. The elements of each line are:
+                    [0] Name of the line (string)
+                    [1] Vertices of the polyline (list of 2- or 3-tuples of floats)
+                    [2] Number of points sampled along the line (int)
+
+            datafile_in
+                Path to Tecplot dataset to be sampled (or an in-memory Dataset);
+                its first 2 or 3 variables are the coordinates
+
+            datafile_out
+                Path where line data will be written. If the filename has the
+                extension ".dat", the data will be written in ASCII format.
+                Otherwise, binary format will be used. If None, the lines are
+                returned as an in-memory Dataset.
+
+            mode
+                'cell': values interpolated linearly in the cell holding each
+                point (def); 'nearest': values at the nearest node
+
+            select_vars, ignore_vars, select_zones, ignore_zones, k, jobs, cache, native
+                As for probe_points
+
+        Points are spaced evenly along each polyline, and the points of all
+        lines are located in the dataset in a single batch. Each line is
+        written as an ordered zone of the points found, in order, with an
+        "arc_length" variable holding the distance along the line.
+
+        OUPUTS:
+            Dataset of lines if datafile_out is None, else none
+    '''
+    definitions = line_file if isinstance(line_file, list) else lines.read_lines(line_file)
+    dim = len(definitions[0][1][0]) if definitions else 0
+    if dim not in (2, 3):
+        raise ValueError("Line vertices must have 2 or 3 coordinates")
+
+    dataset, index = probe_source(
+        datafile_in, dim, select_vars, ignore_vars, select_zones, ignore_zones,
+        cache=cache, cells=mode=='cell', native=native,
+    )
+    result = lines.extract_lines(
+        dataset, definitions,
+        mode    = mode,
+        index   = index,
+        k       = k,
+        workers = jobs or os.cpu_count(),
+    )
+    return write_dataset(datafile_out, result)
 
 def merge_datasets(datafile1, datafile2, datafile_out,*,
                    select_vars1=None, ignore_vars1=None, num_ignore_vars1=None,
                    select_vars2=None, ignore_vars2=None, num_ignore_vars2=None,
-                   warn_duplicates=True):
+                   warn_duplicates=True, native=True):
     ''' Merge variables from point-matched datasets into one dataset
 
         INPUTS:
             datafile1         Path to 1st dataset to merge
             datafile2         Path to 2nd dataset to merge
-            datafile_out      Path where merged dataset is saved
+            datafile_out      Path where merged dataset is saved (None: return it)
             select_vars?      [list(str)] Name patterns of variables to retain (def: all)
             ignore_vars?      [list(str)] Name patterns of variables to ignore (def: none)
             num_ignore_vars?  [int] Ignore first N variables in file (def: 0)
             warn_duplicates   [bool] Warn if same variable name in both datasets (def: True)
+            native            [bool] Merge w/o the Tecplot engine if possible (def: True)
 
         OUTPUTS:
-            none
+            Merged Dataset if datafile_out is None, else none
 
         NOTES:
           -  If a variable is present in both datasets, the values from
@@ -403,23 +1091,60 @@ def merge_datasets(datafile1, datafile2, datafile_out,*,
              TODO: Make this configurable (prefer1, pefer2, rename, etc.)
 
     '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-    with temp_frame() as frame1, temp_frame() as frame2:
+    return _merge(
+        [datafile1, datafile2],
+        [
+            (select_vars1, ignore_vars1, num_ignore_vars1),
+            (select_vars2, ignore_vars2, num_ignore_vars2),
+        ],
+        datafile_out,
+        warn_duplicates = warn_duplicates,
+        native = native,
+    )
+
+def merge_datafiles(datafiles, datafile_out, *,
+                    select_vars=None, ignore_vars=None, num_ignore_vars=None,
+                    warn_duplicates=True, native=True):
+    ''' Merge variables from any number of point-matched datasets
 
-        # Load datafiles into separate frames. This allows us to treat the
-        # two data files as completely separate objects
-        LOG.debug('Load dataset1 from %s', datafile1)
-        plot1  = frame1.plot(tpc.PlotType.Cartesian3D)
-        data1  = tp.data.load_tecplot(datafile1, frame=frame1)
-        LOG.debug('Load dataset2 from %s', datafile2)
-        plot2  = frame2.plot(tpc.PlotType.Cartesian3D)
-        data2  = tp.data.load_tecplot(datafile2, frame=frame2)
-
-        # Zone type/size checking (do explicitly to try to give helpful messages)
-        assert data1.num_zones == data2.num_zones, \
+        INPUTS:
+            datafiles         [list(str|Dataset)] Paths of the datasets to merge
+                              (or in-memory Datasets)
+            datafile_out      Path where merged dataset is saved (None: return it
+                              as an in-memory Dataset)
+            select_vars       [list(str)] Name patterns of variables to retain (def: all)
+            ignore_vars       [list(str)] Name patterns of variables to ignore (def: none)
+            num_ignore_vars   [int] Ignore first N variables in each file (def: 0)
+            warn_duplicates   [bool] Warn if a variable differs between datasets (def: True)
+            native            [bool] Merge w/o the Tecplot engine if possible (def: True)
+
+        OUTPUTS:
+            Merged Dataset if datafile_out is None, else none
+
+        NOTES:
+          -  Variables are ordered by first appearance. If a variable is
+             present in several datasets with identical values (e.g. the
+             grid coordinates), it is written once. Otherwise, the values
+             from the last dataset are used.
+          -  Natively, zone compatibility is checked from the file headers
+             and values are streamed from each input to the output one
+             variable at a time, without loading the datasets in memory.
+    '''
+    return _merge(
+        datafiles,
+        [(select_vars, ignore_vars, num_ignore_vars)] * len(datafiles),
+        datafile_out,
+        warn_duplicates = warn_duplicates,
+        native = native,
+    )
+
+def _check_mergeable(datasets):
+    ''' Zone type/size checking (do explicitly to try to give helpful messages) '''
+    base = datasets[0]
+    for data in datasets[1:]:
+        assert base.num_zones == data.num_zones, \
                'Cannot merge datasets; number of zones differ'
-        for z1,z2 in zip(data1.zones(), data2.zones()):
+        for z1,z2 in zip(base.zones(), data.zones()):
             assert z1.zone_type  == z2.zone_type, \
                    f'Cannot merge {z1.name}, {z2.name}: zone type mismatch'
             assert z1.rank == z2.rank, \
@@ -427,48 +1152,143 @@ def merge_datasets(datafile1, datafile2, datafile_out,*,
             assert z1.num_points == z2.num_points, \
                    f'Cannot merge {z1.name}, {z2.name}: zone size mismatch'
 
-        # Select variables for final dataset
-        vars1 = get_variables(data1, select_vars1, ignore_vars1, num_ignore_vars1)
-        vars2 = get_variables(data2, select_vars2, ignore_vars2, num_ignore_vars2)
-        vars1_names = [v1.name for v1 in vars1]
-        vars2_names = [v2.name for v2 in vars2]
-        LOG.debug('Variables selected from dataset1: %s', vars1_names)
-        LOG.debug('Variables selected from dataset2: %s', vars2_names)
+def _same_values(var1, var2, max_memory=MAX_MEMORY):
+    ''' True if two variables have identical values in every zone '''
+    for z in range(var1.num_zones):
+        v1, v2 = var1.values(z), var2.values(z)
+        if len(v1) != len(v2):
+            return False
+        for s in chunk_slices(len(v1), max(1, max_memory // 16)):
+            if not np.array_equal(v1[s], v2[s]):
+                return False
+    return True
+
+def _merged_variables(datasets, selections, warn_duplicates):
+    ''' {name: Variable} of the merged dataset, in output order '''
+    merged, source = {}, {}
+    for n, (data, selection) in enumerate(zip(datasets, selections), 1):
+        vars = get_variables(data, *selection)
+        LOG.debug('Variables selected from dataset%d: %s', n, [v.name for v in vars])
+        for var in vars:
+            if var.name in merged:
+                if _same_values(merged[var.name], var):
+                    LOG.debug('Variable "%s" is identical in dataset%d and dataset%d; writing once',
+                              var.name, source[var.name], n)
+                    continue
+                if warn_duplicates:
+                    LOG.warning('Variable "%s" exists in dataset%d and dataset%d. Using values from dataset%d.',
+                                var.name, source[var.name], n, n)
+            merged[var.name] = var
+            source[var.name] = n
+    return merged
+
+def _merge(datafiles, selections, datafile_out, *, warn_duplicates=True, native=True):
+    ''' Merge point-matched datafiles (see merge_datafiles) '''
+    assert len(datafiles) >= 2, 'Cannot merge datasets; at least two are required'
+
+    # Native merge: stream values from the input memory maps to the writer
+    datasets = [read_native(f) for f in datafiles] if native else [None]
+    if all(d is not None for d in datasets):
+        _check_mergeable(datasets)
+        merged = _merged_variables(datasets, selections, warn_duplicates)
+        base = datasets[0]
+        headers = []
+        for z, zone in enumerate(base.zones()):
+            header = zone.header()
+            header.locations = [v.dataset.zone(z).location(v.index) for v in merged.values()]
+            headers.append(header)
+        with open_writer(datafile_out, base.title, list(merged), headers, base.aux_data) as writer:
+            for z, zone in enumerate(base.zones()):
+                with timing.phase('write', zone=zone.name):
+                    writer.write_zone(
+                        [v.values(z) for v in merged.values()],
+                        zone.connectivity,
+                    )
+        return getattr(writer, 'dataset', None)
+
+    import tecplot as tp
+    import tecplot.constant as tpc
+    with ExitStack() as stack:
 
-        # Copy data2 variables into data1
+        # Load datafiles into separate frames. This allows us to treat the
+        # data files as completely separate objects
+        datasets = []
+        for n, datafile in enumerate(datafiles):
+            datafile = stack.enter_context(dataset_file(datafile))
+            frame = stack.enter_context(temp_frame())
+            LOG.debug('Load dataset%d from %s', n+1, datafile)
+            frame.plot(tpc.PlotType.Cartesian3D)
+            with timing.phase('load', file=datafile):
+                datasets.append(tp.data.load_tecplot(datafile, frame=frame))
+        _check_mergeable(datasets)
+
+        # Copy variables of the other datasets into data1
         # Overwrites data in data1 if the variable already exists.
-        new_vars = []
-        for v2 in vars2:
-            if v2.name in vars1_names:
-                if (warn_duplicates):
-                    LOG.warning('Variable "%s" exists in both datasets. Using values from dataset2.', v2.name)
-                v1 = data1.variable(v2.name)
-            else:
-                v1 = data1.add_variable(v2.name)
-                new_vars.append(v1)
-            copy_variable_values(v2, v1)
+        merged = _merged_variables(datasets, selections, warn_duplicates)
+        data1 = datasets[0]
+        vars1_names = [v.name for v in data1.variables()]
+        out_vars = []
+        for name, var in merged.items():
+            if var.dataset != data1:
+                if name in vars1_names:
+                    dst = data1.variable(name)
+                else:
+                    dst = data1.add_variable(name)
+                with timing.phase('compute', var=name):
+                    copy_variable_values(var, dst)
+            out_vars.append(data1.variable(name))
 
         # Write data out
         LOG.info("Write combined dataset to %s", datafile_out)
-        write_dataset(datafile_out, data1, variables=[*vars1, *new_vars])
-
-def rename_variables(datafile_in, datafile_out, name_map):
-    ''' Rename variables in a dataset '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-    with temp_frame() as frame:
+        return write_dataset(datafile_out, data1, variables=out_vars)
 
-        # Create frame to hold data. This modifies the global state of
-        # the tecplot module and must be undone in the "finally" block.
-        frame = tp.active_page().add_frame()
+def rename_datafile(datafile_in, datafile_out, *, variables=None, zones=None):
+    ''' Rename variables/zones by rewriting only the header of a datafile
 
-        # Load the dataset
-        LOG.info("Load dataset %s", datafile_in)
-        dataset = tp.data.load_tecplot(
-            datafile_in,
-            frame = frame,
-            initial_plot_type = tpc.PlotType.Cartesian3D
-        )
+        variables/zones map old names (or patterns) to new names. The data
+        is copied byte for byte (see pltfile.rename_plt, datfile.rename_dat),
+        so the cost is I/O bound. datafile_out may be datafile_in. Returns
+        False without doing anything if the input is an in-memory Dataset,
+        the output is not a file of the same format as the input, or the
+        header cannot be read natively.
+    '''
+    if isinstance(datafile_in, Dataset) or datafile_out is None:
+        return False
+    binary = is_binary(datafile_in)
+    if binary == is_ascii(datafile_out):
+        return False
+    header = read_header(datafile_in)
+    if header is None:
+        return False
+    var_names, zone_names = {}, {}
+    for old_name, new_name in (variables or {}).items():
+        var = header.variable(old_name)
+        var_names[var.index] = new_name
+        LOG.info("Rename %d-th variable '%s' to '%s'", var.index, old_name, new_name)
+    for old_name, new_name in (zones or {}).items():
+        zone = header.zone(old_name)
+        zone_names[zone.index] = new_name
+        LOG.info("Rename %d-th zone '%s' to '%s'", zone.index, old_name, new_name)
+    LOG.info("Rewrite header of %s to %s", datafile_in, datafile_out)
+    with timing.phase('write', file=datafile_out):
+        rename = rename_plt if binary else rename_dat
+        rename(datafile_in, datafile_out, variables=var_names, zones=zone_names)
+    return True
+
+def rename_variables(datafile_in, datafile_out, name_map, *, native=True):
+    ''' Rename variables in a dataset
+
+        name_map maps old names (or patterns) to new names. datafile_in may
+        be an in-memory Dataset (which is not modified); if datafile_out is
+        None, the renamed Dataset is returned instead of being written.
+        With native=True, renaming a datafile into one of the same format
+        only rewrites its header (see rename_datafile).
+    '''
+    if native and rename_datafile(datafile_in, datafile_out, variables=name_map):
+        return
+    with open_dataset(datafile_in, native=native, plot_type='Cartesian3D') as dataset:
+        if dataset is datafile_in:
+            dataset = dataset.subset()
 
         # Rename the variables
         for old_name, new_name in name_map.items():
@@ -477,37 +1297,33 @@ def rename_variables(datafile_in, datafile_out, name_map):
             LOG.info("Rename %d-th variable '%s' to '%s'", var.index, old_name, new_name)
 
         # Save results
-        write_dataset(datafile_out, dataset)
-
-def rename_zones(datafile_in, datafile_out, name_map):
-    ''' Rename zones in a dataset '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-    with temp_frame() as frame:
+        return write_dataset(datafile_out, dataset)
 
-        # Load the dataset
-        LOG.info("Load dataset %s", datafile_in)
-        dataset = tp.data.load_tecplot(
-            datafile_in,
-            frame = frame,
-            initial_plot_type = tpc.PlotType.Cartesian3D
-        )
+def rename_zones(datafile_in, datafile_out, name_map, *, native=True):
+    ''' Rename zones in a dataset (see rename_variables) '''
+    if native and rename_datafile(datafile_in, datafile_out, zones=name_map):
+        return
+    with open_dataset(datafile_in, native=native, plot_type='Cartesian3D') as dataset:
+        if dataset is datafile_in:
+            dataset = dataset.subset()
 
-        # Rename the variables
+        # Rename the zones
         for old_name, new_name in name_map.items():
             zone = dataset.zone(old_name)
             zone.name = new_name
             LOG.info("Rename %d-th zone '%s' to '%s'", zone.index, old_name, new_name)
 
         # Save results
-        write_dataset(datafile_out, dataset)
+        return write_dataset(datafile_out, dataset)
 
-def revolve_dataset(datafile_in, datafile_out, *, radial_coord=None, planes=65, angle=180.0, vector_vars=None):
+def revolve_dataset(datafile_in, datafile_out, *, radial_coord=None, planes=65, angle=180.0, vector_vars=None,
+                    native=True, jobs=None):
     ''' Create a 3D dataset by revolving a 2D dataset. Supports vector quantities.
 
     Arguments:
-        datafile_in    Path to 2D datafile to be revolved
-        datafile_old   Path to 3D datafile to be written
+        datafile_in    Path to 2D datafile to be revolved (or in-memory Dataset)
+        datafile_out   Path to 3D datafile to be written (None: return the
+                       revolved Dataset)
         radial_coord   Name of variable to use as the radial grid coordinate. If
                        unspecifed, the second variable in the dataset will be used.
                        In the output dataset, this variable will be overwritten with
@@ -527,27 +1343,25 @@ def revolve_dataset(datafile_in, datafile_out, *, radial_coord=None, planes=65,
                        tuple, e.g. { 'r': ('x','y'), 'vr': ('vx','vy') }. Note that
                        if a key appears in the name tuple, e.g {'y':('y','z')}, only
                        one new variable is added and the 'y' variable is overwritten.
+        native         Read/write w/o the Tecplot engine if possible (def: True). The
+                       native path writes the output one zone/variable at a time.
+        jobs           Number of threads used to revolve zones/variables in
+                       parallel (def: number of CPUs). Native path only.
 
     Limitations:
         Only works for block-structured grids.
         All variable names in the dataset must be unique.
 
     '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-
     if vector_vars:
         if isinstance(vector_vars,list):
             vector_vars = { v:(v+'_cos',v+'_sin') for v in vector_vars }
     else:
         vector_vars = {}
 
-    with temp_frame() as frame_in, temp_frame() as frame_out:
+    with open_dataset(datafile_in, native=native) as data_in:
 
-        # Load input dataset
-        LOG.info("Load input dataset from %s", datafile_in)
-        frame_in.activate()
-        data_in = tp.data.load_tecplot(datafile_in, frame=frame_in)
+        # Check input dataset
         vars_in = [v.name for v in data_in.variables()]
         assert len(vars_in) == len(set(vars_in)), \
                f'ERROR: Cannot revolve {datafile_in}. All variables must have unique names.'
@@ -576,47 +1390,56 @@ def revolve_dataset(datafile_in, datafile_out, *, radial_coord=None, planes=65,
             assert v in vars_in, \
                    f'ERROR: User requested vector variable {v} not present in dataset.'
 
-        # Initialize output dataset and construct variable list
-        data_out = frame_out.create_dataset('anchor3d')
+        # Construct output variable list
+        vars_out = []
         for v in vars_in:
-            data_out.add_variable(v)
+            vars_out.append(v)
             if v in vector_vars:
                 LOG.info(f'Using variable {v} as a vector-valued variable.')
                 for component in vector_vars[v]:
                     if not component in vars_in:
                         LOG.info(f'Adding vector component variable "{component}" to the dataset')
-                        data_out.add_variable(component)
+                        vars_out.append(component)
 
         # Compute sine/cosine for each data plane
         t = np.linspace(0.0, np.radians(angle), planes)
         st = np.sin(t)
         ct = np.cos(t)
 
-        # Construct all zones and revolve data
+        # Check zones
         for zin in data_in.zones():
-            assert isinstance(zin, tp.data.OrderedZone), \
+            assert zin.zone_type.name == 'Ordered', \
                    f'ERROR: Cannot revolve zone "{zin.name}". Must be an OrderedZone.'
             assert zin.rank < 3, \
                    f'ERROR: Cannot revolve zone "{zin.name}". Must be rank 1 or 2.'
-            zout = data_out.add_ordered_zone(zin.name, [*zin.dimensions[0:zin.rank], planes])
-            npt  = np.prod(zin.dimensions)
-            for v in vars_in:
-                vals_in  = zin.values(v)
-                vals_out = zout.values(v)
-                for k in range(planes):
-                    vals_out[k*npt:(k+1)*npt] = vals_in[:]
-                if v in vector_vars:
-                    vy,vz  = vector_vars[v]
-                    vals_y = zout.values(vy)
-                    vals_z = zout.values(vz)
-                    for k in range(planes):
-                        vals_y[k*npt:(k+1)*npt] = np.multiply(vals_in[:],ct[k])
-                        vals_z[k*npt:(k+1)*npt] = np.multiply(vals_in[:],st[k])
-
-        # Write output
-        write_dataset(datafile_out, data_out)
-
-def slice_surfaces(slice_file, datafile_in, datafile_out):
+
+        # Revolve data
+        if isinstance(data_in, Dataset):
+            return write_revolved(datafile_out, data_in, vars_out, vector_vars, planes, ct, st, jobs)
+
+        import tecplot as tp
+        with temp_frame() as frame_out:
+
+            # Initialize output dataset
+            data_out = frame_out.create_dataset('anchor3d')
+            for v in vars_out:
+                data_out.add_variable(v)
+
+            # Construct all zones and revolve data
+            for zin in data_in.zones():
+                zout = data_out.add_ordered_zone(zin.name, [*zin.dimensions[0:zin.rank], planes])
+                for v in vars_in:
+                    vals_in = zin.values(v)[:]
+                    zout.values(v)[:] = revolve_values(vals_in, planes).ravel()
+                    if v in vector_vars:
+                        vy,vz = vector_vars[v]
+                        zout.values(vy)[:] = revolve_values(vals_in, planes, ct).ravel()
+                        zout.values(vz)[:] = revolve_values(vals_in, planes, st).ravel()
+
+            # Write output
+            return write_dataset(datafile_out, data_out)
+
+def slice_surfaces(slice_file, datafile_in, datafile_out, *, native=True, cache=False):
     ''' Extract slice zones from a datafile of surface zones.
 
         INPUTS:
@@ -629,19 +1452,30 @@ def slice_surfaces(slice_file, datafile_in, datafile_out):
                     [3] Indices of surface zones to be sliced (list of ints)
 
             datafile_in
-                Path to Tecplot dataset with surface zone to slice
+                Path to Tecplot dataset with surface zone to slice (or an
+                in-memory Dataset)
 
             datafile_out
                 Path where slice data will be written. If the filename has the
                 extension ".dat", the data will be written in ASCII format.
-                Otherwise, binary format will be used.
+                Otherwise, binary format will be used. If None, the slices are
+                returned as an in-memory Dataset.
+
+            native
+                Slice w/o the Tecplot engine if possible (def: True). All
+                slices are cut in one pass over each surface zone and are
+                written as FELineSeg zones.
+
+            cache
+                Save the zone bounding boxes next to datafile_in (*.zones.npz)
+                and reuse them while the datafile is unchanged (def: False)
+
+        Zones whose bounding box does not straddle a slice plane are not
+        sliced.
 
         OUPUTS:
-            none
+            Dataset of slices if datafile_out is None, else none
     '''
-    import tecplot as tp
-    import tecplot.constant as tpc
-
     # Load slice definition file as "config" module
     # This is based on https://stackoverflow.com/questions/67631
     LOG.info("Load slice definition from %s", slice_file)
@@ -649,43 +1483,66 @@ def slice_surfaces(slice_file, datafile_in, datafile_out):
     config = SourceFileLoader("config", slice_file).load_module()
     sys.dont_write_bytecode = False
 
-    try:
+    # Native slicer
+    dataset = read_native(datafile_in) if native else None
+    if dataset is not None:
+        try:
+            boxes = zone_boxes(datafile_in, dataset, cache=cache)
+            slices = slicing.slice_dataset(dataset, config.slices, boxes=boxes)
+        except FormatError as e:
+            LOG.info("Cannot slice %s natively (%s); using Tecplot engine", datafile_in, e)
+        else:
+            return write_dataset(datafile_out, slices)
 
-        # Create frame to hold data. This modifies the global state of
-        # the tecplot module and must be undone in the "finally" block.
-        frame = tp.active_page().add_frame()
+    import tecplot as tp
+    import tecplot.constant as tpc
 
-        # Load and slice the dataset
-        LOG.info("Load dataset %s", datafile_in)
-        dataset = tp.data.load_tecplot(
-            datafile_in,
-            frame = frame,
-            initial_plot_type = tpc.PlotType.Cartesian3D
-        )
-        slice_zones = []
-        for slice_definition in config.slices:
-            name, origin, normal, zones = slice_definition
-            if isinstance(zones, str):
-                if zones == "all":
-                    zones = range(dataset.num_zones)
-                else:
-                    raise RuntimeError("String '%s' is not a valid zone specifier" % zones)
-            LOG.info("Extract slice '%s'", name)
-            frame.active_zones(zones)
-            zone = tp.data.extract.extract_slice(
-                origin  = origin,
-                normal  = normal,
-                source  = tpc.SliceSource.SurfaceZones,
-                dataset = dataset,
-            )
-            zone.name = name
-            slice_zones.append(zone)
+    with dataset_file(datafile_in) as path:
+        try:
 
-        # Save results
-        write_dataset(datafile_out, dataset, zones=slice_zones)
+            # Create frame to hold data. This modifies the global state of
+            # the tecplot module and must be undone in the "finally" block.
+            frame = tp.active_page().add_frame()
 
-    finally:
-        # Restore global state
-        tp.active_page().delete_frame(frame)
+            # Load and slice the dataset
+            LOG.info("Load dataset %s", datafile_in)
+            with timing.phase('load', file=datafile_in):
+                dataset = tp.data.load_tecplot(
+                    path,
+                    frame = frame,
+                    initial_plot_type = tpc.PlotType.Cartesian3D
+                )
+            boxes = zone_boxes(datafile_in, dataset, cache=cache)
+            slice_zones = []
+            for slice_definition in config.slices:
+                name, origin, normal, zones = slice_definition
+                if isinstance(zones, str):
+                    if zones == "all":
+                        zones = range(dataset.num_zones)
+                    else:
+                        raise RuntimeError("String '%s' is not a valid zone specifier" % zones)
+                zones = np.asarray(zones, dtype=np.intp)
+                zones = zones[boxes.plane_mask(origin, normal, zones)].tolist()
+                if not zones:
+                    LOG.warning("Slice '%s' does not intersect any zone; skipped", name)
+                    continue
+                LOG.info("Extract slice '%s'", name)
+                frame.active_zones(zones)
+                with timing.phase('compute', slice=name):
+                    zone = tp.data.extract.extract_slice(
+                        origin  = origin,
+                        normal  = normal,
+                        source  = tpc.SliceSource.SurfaceZones,
+                        dataset = dataset,
+                    )
+                zone.name = name
+                slice_zones.append(zone)
+            LOG.info("Bounding boxes culled %d of %d zone slices",
+                     boxes.counters['culled'], boxes.counters['tested'])
 
+            # Save results
+            return write_dataset(datafile_out, dataset, zones=slice_zones)
 
+        finally:
+            # Restore global state
+            tp.active_page().delete_frame(frame)
@@ -0,0 +1,422 @@
+import enum
+import fnmatch
+import math
+import numpy as np
+
+
+#-----------------------------------------------------------------------
+# Constants and Errors
+#-----------------------------------------------------------------------
+class FormatError(RuntimeError):
+    ''' Datafile uses a feature the native readers/writers do not support '''
+
+class ZoneType(enum.IntEnum):
+    ''' Zone types (names match tecplot.constant.ZoneType) '''
+    Ordered      = 0
+    FELineSeg    = 1
+    FETriangle   = 2
+    FEQuad       = 3
+    FETetra      = 4
+    FEBrick      = 5
+    FEPolygon    = 6
+    FEPolyhedron = 7
+
+class ValueLocation(enum.IntEnum):
+    ''' Variable locations (names match tecplot.constant.ValueLocation) '''
+    Nodal        = 0
+    CellCentered = 1
+
+NODES_PER_ELEMENT = {
+    ZoneType.FELineSeg:  2,
+    ZoneType.FETriangle: 3,
+    ZoneType.FEQuad:     4,
+    ZoneType.FETetra:    4,
+    ZoneType.FEBrick:    8,
+}
+
+FACES_PER_ELEMENT = {
+    ZoneType.FELineSeg:  2,
+    ZoneType.FETriangle: 3,
+    ZoneType.FEQuad:     4,
+    ZoneType.FETetra:    4,
+    ZoneType.FEBrick:    6,
+}
+
+
+#-----------------------------------------------------------------------
+# Helper Functions
+#-----------------------------------------------------------------------
+def _matches(name, pattern):
+    ''' True if name matches glob pattern (None matches everything) '''
+    return pattern is None or fnmatch.fnmatchcase(name, pattern)
+
+def _item_index(item):
+    ''' Get integer index from an int or a Zone/Variable-like object '''
+    return item if isinstance(item, (int, np.integer)) else item.index
+
+def _item_indices(items, count):
+    ''' Sorted list of unique indices of items (all of range(count) if None) '''
+    if items is None:
+        return list(range(count))
+    indices = sorted(set(_item_index(i) for i in items))
+    if indices and not (indices[0] >= 0 and indices[-1] < count):
+        raise IndexError(f'Index out of range for {count} items')
+    return indices
+
+
+#-----------------------------------------------------------------------
+# Dataset Model
+#-----------------------------------------------------------------------
+class Variable:
+    ''' Handle to a variable in a Dataset (mirrors tecplot.data.Variable) '''
+    __slots__ = ('dataset', 'index')
+
+    def __init__(self, dataset, index):
+        self.dataset = dataset
+        self.index   = index
+
+    def __repr__(self):
+        return 'Variable(index={}, name={!r})'.format(self.index, self.name)
+
+    @property
+    def name(self):
+        return self.dataset.variable_names[self.index]
+
+    @name.setter
+    def name(self, value):
+        self.dataset.variable_names[self.index] = value
+
+    @property
+    def num_zones(self):
+        return self.dataset.num_zones
+
+    def values(self, zone):
+        ''' Array of values for this variable in the specified zone '''
+        return self.dataset.zone(zone).values(self.index)
+
+class Zone:
+    ''' Array-backed zone (mirrors tecplot.data.OrderedZone/FEZone)
+
+        Arguments:
+            name            Zone name
+            zone_type       ZoneType of the zone
+            dimensions      (I,J,K) for ordered zones, or (num_points,
+                            num_elements) for finite-element zones
+            values          List of arrays, one per dataset variable
+            connectivity    (num_elements, nodes_per_element) array of
+                            zero-based node indices (FE zones only)
+            strand          Strand ID (0 for static zones)
+            solution_time   Solution time of the zone
+            locations       List of ValueLocation, one per variable (def: Nodal)
+            aux_data        Dict of auxiliary name/value strings
+            ranges          List of (min,max) per variable, if known without
+                            reading data (e.g. from a PLT header)
+    '''
+    __slots__ = (
+        'dataset', 'index', 'name', 'zone_type', '_dimensions',
+        '_values', 'connectivity', 'strand', 'solution_time',
+        'locations', 'aux_data', 'ranges',
+    )
+
+    def __init__(self, name, zone_type, dimensions, values=None, *,
+                 connectivity=None, strand=0, solution_time=0.0,
+                 locations=None, aux_data=None, ranges=None):
+        self.dataset       = None
+        self.index         = None
+        self.name          = name
+        self.zone_type     = ZoneType(zone_type)
+        self._dimensions   = tuple(int(d) for d in dimensions)
+        self._values       = list(values) if values is not None else []
+        self.connectivity  = connectivity
+        self.strand        = strand
+        self.solution_time = solution_time
+        self.locations     = list(locations) if locations is not None else None
+        self.aux_data      = dict(aux_data) if aux_data else {}
+        self.ranges        = ranges
+        if self.zone_type == ZoneType.Ordered:
+            self._dimensions = (self._dimensions + (1,1,1))[:3]
+        elif len(self._dimensions) != 2:
+            raise ValueError('FE zone dimensions must be (num_points, num_elements)')
+
+    def __repr__(self):
+        return 'Zone(index={}, name={!r})'.format(self.index, self.name)
+
+    @property
+    def dimensions(self):
+        return self._dimensions
+
+    @property
+    def num_points(self):
+        if self.zone_type == ZoneType.Ordered:
+            return math.prod(self._dimensions)
+        return self._dimensions[0]
+
+    @property
+    def num_elements(self):
+        if self.zone_type == ZoneType.Ordered:
+            return math.prod(max(d-1,1) for d in self._dimensions)
+        return self._dimensions[1]
+
+    @property
+    def num_faces(self):
+        return self.num_elements * FACES_PER_ELEMENT.get(self.zone_type, 0)
+
+    @property
+    def rank(self):
+        if self.zone_type == ZoneType.Ordered:
+            return sum(d > 1 for d in self._dimensions)
+        return {
+            ZoneType.FELineSeg: 1, ZoneType.FETriangle: 2, ZoneType.FEQuad: 2,
+            ZoneType.FEPolygon: 2,
+        }.get(self.zone_type, 3)
+
+    def header(self, variables=None):
+        ''' Copy of the zone metadata (no values) for a subset of variables '''
+        locations = self.locations
+        if locations is not None and variables is not None:
+            locations = [self.location(v) for v in variables]
+        return Zone(
+            self.name, self.zone_type, self._dimensions,
+            strand        = self.strand,
+            solution_time = self.solution_time,
+            locations     = locations,
+            aux_data      = self.aux_data,
+        )
+
+    def location(self, var):
+        ''' ValueLocation of the specified variable '''
+        if self.locations is None:
+            return ValueLocation.Nodal
+        return ValueLocation(self.locations[self._var_index(var)])
+
+    def num_values(self, var):
+        ''' Number of values stored for the specified variable '''
+        if self.location(var) == ValueLocation.CellCentered:
+            return self.num_elements
+        return self.num_points
+
+    def values(self, var):
+        ''' Array of values for a variable (index, name/pattern, or Variable) '''
+        return self._values[self._var_index(var)]
+
+    def set_values(self, var, array):
+        ''' Replace the array of values for a variable '''
+        self._values[self._var_index(var)] = array
+
+    def _var_index(self, var):
+        if isinstance(var, str):
+            if self.dataset is None:
+                raise KeyError(f'Zone "{self.name}" is not part of a dataset')
+            return self.dataset.variable(var).index
+        return _item_index(var)
+
+class Dataset:
+    ''' Array-backed Tecplot dataset (mirrors tecplot.data.Dataset)
+
+        Implements the subset of the PyTecplot Dataset interface used by
+        tec_util, so helpers like get_zones/get_variables work with either
+        object. Everything lives in ordinary NumPy arrays (or memory-mapped
+        views of a datafile), so no Tecplot engine is required.
+    '''
+    __slots__ = ('title', 'variable_names', 'aux_data', '_zones')
+
+    def __init__(self, title='', variables=(), aux_data=None):
+        self.title          = title
+        self.variable_names = list(variables)
+        self.aux_data       = dict(aux_data) if aux_data else {}
+        self._zones         = []
+
+    def __repr__(self):
+        return 'Dataset(title={!r}, num_zones={}, num_variables={})'.format(
+            self.title, self.num_zones, self.num_variables,
+        )
+
+    @property
+    def num_variables(self):
+        return len(self.variable_names)
+
+    @property
+    def num_zones(self):
+        return len(self._zones)
+
+    @property
+    def solution_times(self):
+        return sorted(set(z.solution_time for z in self._zones if z.strand > 0))
+
+    @property
+    def num_solution_times(self):
+        return len(self.solution_times)
+
+    def variables(self, pattern=None):
+        ''' Yield variables with names matching a glob pattern '''
+        for i, name in enumerate(self.variable_names):
+            if _matches(name, pattern):
+                yield Variable(self, i)
+
+    def variable(self, key):
+        ''' Get variable by index, exact name, or glob pattern '''
+        if isinstance(key, str):
+            if key in self.variable_names:
+                return Variable(self, self.variable_names.index(key))
+            for v in self.variables(key):
+                return v
+            raise KeyError(f'No variable matching "{key}"')
+        index = _item_index(key)
+        if not 0 <= index < self.num_variables:
+            raise IndexError(f'Variable index {index} out of range')
+        return Variable(self, index)
+
+    def zones(self, pattern=None):
+        ''' Yield zones with names matching a glob pattern '''
+        for zone in self._zones:
+            if _matches(zone.name, pattern):
+                yield zone
+
+    def zone(self, key):
+        ''' Get zone by index, exact name, or glob pattern '''
+        if isinstance(key, str):
+            for zone in self._zones:
+                if zone.name == key:
+                    return zone
+            for zone in self.zones(key):
+                return zone
+            raise KeyError(f'No zone matching "{key}"')
+        return self._zones[_item_index(key)]
+
+    def add_zone(self, zone):
+        ''' Append a Zone to the dataset; returns the zone '''
+        if len(zone._values) != self.num_variables:
+            raise ValueError(
+                f'Zone "{zone.name}" has {len(zone._values)} variables; '
+                f'dataset has {self.num_variables}'
+            )
+        zone.dataset = self
+        zone.index   = len(self._zones)
+        self._zones.append(zone)
+        return zone
+
+    def add_ordered_zone(self, name, dimensions, *, dtype=np.float32, **kwargs):
+        ''' Create an ordered zone initialized with zeros '''
+        zone = Zone(name, ZoneType.Ordered, dimensions, **kwargs)
+        zone._values = [np.zeros(zone.num_values(i), dtype) for i in range(self.num_variables)]
+        return self.add_zone(zone)
+
+    def add_fe_zone(self, zone_type, name, num_points, num_elements, *,
+                    dtype=np.float32, **kwargs):
+        ''' Create a finite-element zone initialized with zeros '''
+        zone = Zone(name, zone_type, (num_points, num_elements), **kwargs)
+        zone._values = [np.zeros(zone.num_values(i), dtype) for i in range(self.num_variables)]
+        if zone.connectivity is None:
+            nodes = NODES_PER_ELEMENT.get(zone.zone_type, 0)
+            zone.connectivity = np.zeros((num_elements, nodes), np.int32)
+        return self.add_zone(zone)
+
+    def add_variable(self, name, *, dtype=np.float32, location=ValueLocation.Nodal):
+        ''' Append a variable (zero-filled in every zone); returns the Variable '''
+        self.variable_names.append(name)
+        index = self.num_variables - 1
+        for zone in self._zones:
+            if zone.locations is not None or location != ValueLocation.Nodal:
+                if zone.locations is None:
+                    zone.locations = [ValueLocation.Nodal] * index
+                zone.locations.append(ValueLocation(location))
+            zone._values.append(np.zeros(zone.num_values(index), dtype))
+            if zone.ranges is not None:
+                zone.ranges.append(None)
+        return Variable(self, index)
+
+    def subset(self, zones=None, variables=None):
+        ''' Dataset of the given zones/variables (def: all), sharing their arrays
+
+            Zone metadata and names are copied, so the subset can be renamed
+            or extended without changing this dataset.
+        '''
+        zones = range(self.num_zones) if zones is None else [_item_index(z) for z in zones]
+        variables = list(range(self.num_variables)) if variables is None \
+                    else [_item_index(v) for v in variables]
+        result = Dataset(self.title, [self.variable_names[v] for v in variables], self.aux_data)
+        for z in zones:
+            zone = self._zones[z]
+            copy = zone.header(variables)
+            copy._values = [zone._values[v] for v in variables]
+            copy.connectivity = zone.connectivity
+            if zone.ranges is not None:
+                copy.ranges = [zone.ranges[v] for v in variables]
+            result.add_zone(copy)
+        return result
+
+
+#-----------------------------------------------------------------------
+# In-Memory Writer
+#-----------------------------------------------------------------------
+class DatasetWriter:
+    ''' Collects written zones into a Dataset instead of a file
+
+        Mirrors the PltWriter/DatWriter interface, so functions that stream
+        their output through a writer can return the result in memory (see
+        core.open_writer). A variable written in one piece is kept as is,
+        without a copy.
+    '''
+
+    def __init__(self, title, variables, zones, aux_data=None):
+        self.dataset  = Dataset(title, variables, aux_data)
+        self.zones    = list(zones)
+        self._current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+    def close(self):
+        ''' Check that all zones have been written '''
+        if self.dataset.num_zones != len(self.zones) or self._current:
+            raise RuntimeError(
+                f'DatasetWriter closed after {self.dataset.num_zones} of {len(self.zones)} zones'
+            )
+
+    def begin_zone(self, dtypes):
+        ''' Start the next zone (dtypes: one per variable) '''
+        if self._current:
+            raise RuntimeError('Previous zone was not finished with end_zone()')
+        if self.dataset.num_zones >= len(self.zones):
+            raise RuntimeError('All zones have already been written')
+        self._current = {
+            'dtypes': [np.dtype(t) for t in dtypes],
+            'chunks': [[] for v in range(self.dataset.num_variables)],
+        }
+
+    def write_values(self, var, values):
+        ''' Append values for a variable '''
+        if not self._current:
+            raise RuntimeError('write_values() called outside begin_zone()/end_zone()')
+        self._current['chunks'][var].append(np.asarray(values).ravel())
+
+    def end_zone(self, connectivity=None):
+        ''' Finish the current zone (FE zones require zero-based connectivity) '''
+        cur  = self._current
+        zone = self.zones[self.dataset.num_zones].header()
+        for v, (chunks, dtype) in enumerate(zip(cur['chunks'], cur['dtypes'])):
+            values = chunks[0] if len(chunks) == 1 else np.concatenate(chunks or [[]])
+            values = values.astype(dtype, copy=False)
+            if values.size != zone.num_values(v):
+                raise RuntimeError(
+                    f'Zone "{zone.name}" variable {v}: wrote {values.size} '
+                    f'values, expected {zone.num_values(v)}'
+                )
+            zone._values.append(values)
+        if zone.zone_type != ZoneType.Ordered:
+            if connectivity is None:
+                raise RuntimeError(f'FE zone "{zone.name}" requires connectivity')
+            zone.connectivity = np.asarray(connectivity)
+        self.dataset.add_zone(zone)
+        self._current = None
+
+    def write_zone(self, values, connectivity=None):
+        ''' Add the next zone from a list of arrays (one per variable) '''
+        self.begin_zone([np.asarray(v).dtype for v in values])
+        for v, array in enumerate(values):
+            self.write_values(v, array)
+        self.end_zone(connectivity)
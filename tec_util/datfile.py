@@ -0,0 +1,625 @@
+''' Native reader/writer for Tecplot ASCII (*.dat) datafiles.
+
+    The reader scans the file for header records (TITLE, VARIABLES, ZONE,
+    ...) and hands each numeric body to NumPy's text parser in bulk, so the
+    per-value cost is paid in C rather than Python. Supported features:
+
+      - BLOCK and POINT data packing
+      - Ordered and classic FE zones (FELineSeg .. FEBrick)
+      - DT, VARLOCATION, VARSHARELIST, PASSIVEVARLIST, CONNECTIVITYSHAREZONE
+      - Dataset and zone auxiliary data
+
+    Anything else (polyhedral zones, face neighbors, BIT data, geometries,
+    ...) raises FormatError so callers can fall back to the Tecplot engine.
+'''
+import contextlib
+import logging
+import mmap
+import re
+import warnings
+import numpy as np
+from . import rewrite
+from .dataset import (
+    Dataset, FormatError, NODES_PER_ELEMENT, ValueLocation, Zone, ZoneType,
+    _item_index, _item_indices,
+)
+
+LOG = logging.getLogger(__name__)
+
+# Size of text chunks handed to the numeric parser
+PARSE_CHUNK = 1 << 26
+
+DATA_TYPES = {
+    'SINGLE':   np.float32,
+    'DOUBLE':   np.float64,
+    'LONGINT':  np.int32,
+    'SHORTINT': np.int16,
+    'BYTE':     np.uint8,
+}
+
+ZONE_TYPES = {
+    'ORDERED':         ZoneType.Ordered,
+    'FELINESEG':       ZoneType.FELineSeg,
+    'FETRIANGLE':      ZoneType.FETriangle,
+    'FEQUADRILATERAL': ZoneType.FEQuad,
+    'FETETRAHEDRON':   ZoneType.FETetra,
+    'FEBRICK':         ZoneType.FEBrick,
+    'FEPOLYGON':       ZoneType.FEPolygon,
+    'FEPOLYHEDRON':    ZoneType.FEPolyhedron,
+}
+
+ELEMENT_TYPES = {
+    'LINESEG':       ZoneType.FELineSeg,
+    'TRIANGLE':      ZoneType.FETriangle,
+    'QUADRILATERAL': ZoneType.FEQuad,
+    'TETRAHEDRON':   ZoneType.FETetra,
+    'BRICK':         ZoneType.FEBrick,
+}
+
+RECORD_KEYWORDS = {
+    'TITLE', 'VARIABLES', 'FILETYPE', 'ZONE', 'DATASETAUXDATA',
+    'VARAUXDATA', 'TEXT', 'GEOMETRY', 'CUSTOMLABELS',
+}
+
+TOKEN_PATTERN  = re.compile(r'''
+      "(?:[^"\\]|\\.)*"       # quoted string
+    | \([^)]*\)               # parenthesized list
+    | \[[^\]]*\]              # bracketed list
+    | =                       # assignment
+    | [^\s,=()"\[\]]+         # bare word/number
+''', re.VERBOSE)
+BODY_START     = re.compile(rb'^[ \t]*[-+.0-9]', re.MULTILINE)
+HEADER_START   = re.compile(rb'^[ \t]*[A-Za-z#]', re.MULTILINE)
+COMMENT_LINE   = re.compile(r'^[ \t]*#.*$', re.MULTILINE)
+NUMBER_FIXUPS  = bytes.maketrans(b',dD', b' eE')
+
+
+#-----------------------------------------------------------------------
+# Helper Functions
+#-----------------------------------------------------------------------
+def _unquote(token):
+    if len(token) >= 2 and token[0] == token[-1] == '"':
+        return token[1:-1].replace('\\"', '"')
+    return token
+
+def _index_list(text):
+    ''' Parse "1,3-5" into zero-based indices [0,2,3,4] '''
+    indices = []
+    for part in text.strip('[] ').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = part.split('-')
+            indices.extend(range(int(lo)-1, int(hi)))
+        else:
+            indices.append(int(part)-1)
+    return indices
+
+def _tokenize(text):
+    ''' Split header text into tokens, dropping comment lines '''
+    lines = [l for l in text.splitlines() if not l.lstrip().startswith('#')]
+    return TOKEN_PATTERN.findall('\n'.join(lines))
+
+def _parse_numbers(buf, start, end, count=None):
+    ''' Parse whitespace/comma separated numbers in buf[start:end] '''
+    chunks = []
+    pos = start
+    while pos < end:
+        stop = min(pos + PARSE_CHUNK, end)
+        if stop < end:
+            stop = buf.find(b'\n', stop, end) + 1 or end
+        text = bytes(buf[pos:stop]).translate(NUMBER_FIXUPS)
+        if b'*' in text:
+            text = _expand_repeats(text)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            chunks.append(np.fromstring(text, sep=' '))
+        pos = stop
+    values = np.concatenate(chunks) if chunks else np.empty(0)
+    if count is not None and values.size != count:
+        raise FormatError(f'Expected {count} values, found {values.size}')
+    return values
+
+def _expand_repeats(text):
+    ''' Expand Tecplot "N*value" repeat notation (slow path) '''
+    words = []
+    for word in text.split():
+        if b'*' in word:
+            n, value = word.split(b'*')
+            words.extend([value] * int(n))
+        else:
+            words.append(word)
+    return b' '.join(words)
+
+
+#-----------------------------------------------------------------------
+# Header Parsing
+#-----------------------------------------------------------------------
+class _Header:
+    ''' Parsed header state shared across records '''
+
+    def __init__(self):
+        self.title     = ''
+        self.variables = []
+        self.aux_data  = {}
+
+def _parse_records(text, header):
+    ''' Parse header records; return dict of ZONE parameters (or None) '''
+    tokens = _tokenize(text)
+    zone = None
+    i = 0
+    while i < len(tokens):
+        key = tokens[i].upper()
+        if key == 'TITLE':
+            header.title = _unquote(tokens[i+2])
+            i += 3
+        elif key == 'VARIABLES':
+            i += 2
+            while i < len(tokens) and tokens[i].upper() not in RECORD_KEYWORDS:
+                header.variables.append(_unquote(tokens[i]))
+                i += 1
+        elif key == 'FILETYPE':
+            if tokens[i+2].upper() != 'FULL':
+                raise FormatError(f'FILETYPE={tokens[i+2]} is not supported')
+            i += 3
+        elif key == 'DATASETAUXDATA':
+            header.aux_data[tokens[i+1]] = _unquote(tokens[i+3])
+            i += 4
+        elif key == 'VARAUXDATA':
+            i += 5
+        elif key == 'ZONE':
+            zone = {'AUXDATA': {}}
+            i += 1
+            while i < len(tokens):
+                name = tokens[i].upper()
+                if name == 'AUXDATA':
+                    zone['AUXDATA'][tokens[i+1]] = _unquote(tokens[i+3])
+                    i += 4
+                elif i+1 < len(tokens) and tokens[i+1] == '=':
+                    zone[name] = tokens[i+2]
+                    i += 3
+                else:
+                    raise FormatError(f'Unexpected token "{tokens[i]}" in ZONE record')
+        elif key in ('TEXT', 'GEOMETRY', 'CUSTOMLABELS'):
+            raise FormatError(f'{key} records are not supported')
+        else:
+            raise FormatError(f'Unexpected token "{tokens[i]}" in file header')
+    return zone
+
+def _zone_layout(params, num_vars, num_zones):
+    ''' Convert ZONE parameters into a Zone (without data) and read plan '''
+    name = _unquote(params.get('T', 'ZONE {}'.format(num_zones+1)))
+
+    # Zone type / packing (new style and pre-2008 F=FEPOINT style)
+    packing = params.get('DATAPACKING', 'BLOCK').upper()
+    zone_type = ZONE_TYPES.get(params.get('ZONETYPE', 'ORDERED').upper())
+    if 'F' in params:
+        fmt = params['F'].upper()
+        packing = 'POINT' if fmt.endswith('POINT') else 'BLOCK'
+        if fmt.startswith('FE'):
+            zone_type = ELEMENT_TYPES.get(params.get('ET', '').upper())
+    if zone_type is None or zone_type in (ZoneType.FEPolygon, ZoneType.FEPolyhedron):
+        raise FormatError(f'Zone "{name}" has an unsupported zone type')
+    if int(params.get('FACENEIGHBORCONNECTIONS', 0)):
+        raise FormatError(f'Zone "{name}" defines face neighbors')
+
+    if zone_type == ZoneType.Ordered:
+        dims = [int(params.get(k, 1)) for k in ('I', 'J', 'K')]
+    else:
+        dims = [
+            int(params.get('NODES', params.get('N', 0))),
+            int(params.get('ELEMENTS', params.get('E', 0))),
+        ]
+
+    # Variable locations, data types, sharing and passive variables
+    locations = [ValueLocation.Nodal] * num_vars
+    for indices, loc in re.findall(r'\[([^\]]*)\]\s*=\s*(\w+)', params.get('VARLOCATION', '')):
+        for v in _index_list(indices):
+            locations[v] = ValueLocation[{'NODAL': 'Nodal'}.get(loc.upper(), 'CellCentered')]
+    dtypes = [np.float32] * num_vars
+    if 'DT' in params:
+        names = params['DT'].strip('()').split()
+        try:
+            dtypes[:len(names)] = [DATA_TYPES[n.upper()] for n in names]
+        except KeyError as e:
+            raise FormatError(f'Zone "{name}" has unsupported data type {e}')
+        dtypes = dtypes[:num_vars]
+    shared = {}
+    for indices, src in re.findall(r'\[([^\]]*)\]\s*(?:=\s*(\d+))?', params.get('VARSHARELIST', '')):
+        src = int(src)-1 if src else num_zones-1
+        for v in _index_list(indices):
+            shared[v] = src
+    passive = set(_index_list(params.get('PASSIVEVARLIST', '')))
+    conn_share = int(params.get('CONNECTIVITYSHAREZONE', 0)) - 1
+
+    zone = Zone(
+        name, zone_type, dims,
+        strand        = int(params.get('STRANDID', 0)),
+        solution_time = float(params.get('SOLUTIONTIME', 0.0)),
+        locations     = locations if any(locations) else None,
+        aux_data      = params['AUXDATA'],
+    )
+    if packing == 'POINT' and zone.locations is not None:
+        raise FormatError(f'Zone "{name}" uses POINT packing with cell-centered data')
+    return zone, packing, dtypes, shared, passive, conn_share
+
+def _quote(name):
+    return '"' + name.replace('"', '\\"') + '"'
+
+def _rename_records(text, variables, zone_name=None):
+    ''' Header records text with variables ({index: name}) and the zone title renamed '''
+    masked = COMMENT_LINE.sub(lambda m: ' ' * len(m.group()), text)
+    tokens = list(TOKEN_PATTERN.finditer(masked))
+    edits = []
+    i = 0
+    while i < len(tokens):
+        key = tokens[i].group().upper()
+        if key == 'VARIABLES':
+            i += 2
+            v = 0
+            while i < len(tokens) and tokens[i].group().upper() not in RECORD_KEYWORDS:
+                if v in variables:
+                    edits.append((tokens[i].span(), _quote(variables[v])))
+                i += 1
+                v += 1
+        elif key == 'ZONE':
+            if zone_name is not None:
+                span = (tokens[i].end(), tokens[i].end())
+                new = ' T=' + _quote(zone_name)
+                j = i + 1
+                while j < len(tokens):
+                    name = tokens[j].group().upper()
+                    if name == 'AUXDATA':
+                        j += 4
+                        continue
+                    if name == 'T':
+                        span, new = tokens[j+2].span(), _quote(zone_name)
+                    j += 3
+                edits.append((span, new))
+            break
+        else:
+            i += {'TITLE': 3, 'FILETYPE': 3, 'DATASETAUXDATA': 4, 'VARAUXDATA': 5}.get(key, 1)
+    for (start, end), new in reversed(edits):
+        text = text[:start] + new + text[end:]
+    return text
+
+
+#-----------------------------------------------------------------------
+# Public Interface
+#-----------------------------------------------------------------------
+def read_dat(filename, *, zones=None, variables=None):
+    ''' Read a Tecplot ASCII datafile into a Dataset without the Tecplot engine
+
+        Arguments:
+            filename    Path to the ASCII datafile
+            zones       Indices of the zones to load (def: all); the numeric
+                        bodies of other zones are skipped, not parsed
+            variables   Indices of the variables to load (def: all)
+
+        Returns:
+            Dataset with one NumPy array per zone/variable
+    '''
+    with _map_file(filename) as buf:
+        dataset = _read_buffer(buf, zones, variables)
+    LOG.debug('Read %d zones, %d variables from %s',
+              dataset.num_zones, dataset.num_variables, filename)
+    return dataset
+
+def read_dat_header(filename):
+    ''' Dataset of value-less zones described by the records of an ASCII file
+
+        Numeric bodies are located but not parsed, so zone and variable
+        patterns can be resolved before loading any values.
+    '''
+    with _map_file(filename) as buf:
+        header, plans = _scan_buffer(buf)
+    dataset = Dataset(header.title, header.variables, header.aux_data)
+    for zone, *plan in plans:
+        zone._values = [None] * dataset.num_variables
+        dataset.add_zone(zone)
+    return dataset
+
+@contextlib.contextmanager
+def _map_file(filename):
+    with open(filename, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            raise FormatError(f'{filename} is empty')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:5] == b'#!TDV':
+                raise FormatError(f'{filename} is a binary datafile')
+            yield buf
+
+def _body_pieces(buf, pos):
+    ''' Locate numeric body starting at pos; returns list of (start,end) '''
+    pieces = []
+    while True:
+        match = HEADER_START.search(buf, pos)
+        if not match:
+            pieces.append((pos, len(buf)))
+            return pieces
+        pieces.append((pos, match.start()))
+        if match.group()[-1:] != b'#':
+            return pieces
+        # Skip comment line embedded in the body
+        pos = buf.find(b'\n', match.end()) + 1 or len(buf)
+
+def _scan_buffer(buf):
+    ''' Parse header records; return (_Header, [zone read plan]) '''
+    header = _Header()
+    plans  = []
+    pos    = 0
+    while pos < len(buf):
+
+        # Header records up to the next numeric body
+        match = BODY_START.search(buf, pos)
+        body_start = match.start() if match else len(buf)
+        params = _parse_records(buf[pos:body_start].decode('latin-1'), header)
+        if params is None:
+            if body_start < len(buf):
+                raise FormatError('Found numeric data outside of a ZONE record')
+            break
+        zone, packing, dtypes, shared, passive, conn_share = \
+            _zone_layout(params, len(header.variables), len(plans))
+        for v, src in shared.items():
+            if not 0 <= src < len(plans):
+                raise FormatError(f'Zone "{zone.name}" shares data with invalid zone {src+1}')
+        if conn_share >= len(plans):
+            raise FormatError(f'Zone "{zone.name}" shares connectivity with invalid zone {conn_share+1}')
+
+        # Locate (but do not parse) the numeric body
+        pieces = _body_pieces(buf, body_start)
+        pos = pieces[-1][1]
+        plans.append((zone, packing, dtypes, shared, passive, conn_share, pieces))
+    return header, plans
+
+def _read_buffer(buf, zones=None, variables=None):
+    header, plans = _scan_buffer(buf)
+    num_vars  = len(header.variables)
+    zones     = _item_indices(zones, len(plans))
+    variables = _item_indices(variables, num_vars)
+    wanted    = set(variables)
+
+    # Zones to parse: the selected ones and those they share data with
+    needed = set(zones)
+    for z in reversed(range(len(plans))):
+        if z in needed:
+            zone, packing, dtypes, shared, passive, conn_share, pieces = plans[z]
+            needed.update(src for v, src in shared.items() if v in wanted)
+            if conn_share >= 0:
+                needed.add(conn_share)
+
+    loaded = {}
+    for z, (zone, packing, dtypes, shared, passive, conn_share, pieces) in enumerate(plans):
+        if z not in needed:
+            continue
+
+        # Parse the numeric body
+        stored = [v for v in range(num_vars) if v not in shared and v not in passive]
+        counts = [zone.num_values(v) for v in stored]
+        nodes_per_elem = NODES_PER_ELEMENT.get(zone.zone_type, 0)
+        num_conn = 0
+        if zone.zone_type != ZoneType.Ordered and conn_share < 0:
+            num_conn = zone.num_elements * nodes_per_elem
+        total = sum(counts) + num_conn
+        data = [_parse_numbers(buf, a, b) for a, b in pieces]
+        data = data[0] if len(data) == 1 else np.concatenate(data)
+        if data.size != total:
+            raise FormatError(
+                f'Zone "{zone.name}" expects {total} values, found {data.size}'
+            )
+
+        # Split into variables (only the wanted ones are kept)
+        values = [None] * num_vars
+        if packing == 'POINT':
+            block = data[:sum(counts)].reshape(zone.num_points, len(stored))
+            for j, v in enumerate(stored):
+                if v in wanted:
+                    values[v] = np.ascontiguousarray(block[:,j], dtype=dtypes[v])
+        else:
+            offset = 0
+            for v, n in zip(stored, counts):
+                if v in wanted:
+                    values[v] = data[offset:offset+n].astype(dtypes[v])
+                offset += n
+        for v, src in shared.items():
+            if v in wanted:
+                values[v] = loaded[src]._values[v]
+        for v in passive:
+            if v in wanted:
+                values[v] = np.zeros(zone.num_values(v), dtypes[v])
+        zone._values = values
+
+        # Connectivity (stored 1-based in the file)
+        if zone.zone_type != ZoneType.Ordered:
+            if conn_share >= 0:
+                zone.connectivity = loaded[conn_share].connectivity
+            else:
+                conn = data[sum(counts):].astype(np.int64) - 1
+                if zone.num_points < np.iinfo(np.int32).max:
+                    conn = conn.astype(np.int32)
+                zone.connectivity = conn.reshape(zone.num_elements, nodes_per_elem)
+        loaded[z] = zone
+
+    dataset = Dataset(header.title, [header.variables[v] for v in variables], header.aux_data)
+    for z in zones:
+        zone = loaded[z]
+        if len(variables) != num_vars:
+            values, connectivity = zone._values, zone.connectivity
+            zone = zone.header(variables)
+            zone._values = [values[v] for v in variables]
+            zone.connectivity = connectivity
+        dataset.add_zone(zone)
+    return dataset
+
+def rename_dat(filename_in, filename_out, *, variables=None, zones=None):
+    ''' Copy an ASCII datafile with renamed variables and/or zones
+
+        Only the header records (VARIABLES and ZONE titles) are rewritten;
+        numeric bodies are copied byte for byte without being parsed (see
+        rewrite.rewrite_file).
+
+        Arguments:
+            filename_in     Path to the ASCII datafile
+            filename_out    Path of the renamed datafile (may be filename_in)
+            variables       {index: new name} of the variables to rename
+            zones           {index: new name} of the zones to rename
+    '''
+    variables = variables or {}
+    zones = zones or {}
+    with _map_file(filename_in) as buf:
+        header, plans = _scan_buffer(buf)
+        bodies = [(plan[-1][0][0], plan[-1][-1][1]) for plan in plans]
+        pieces, pos = [], 0
+        for z, (start, end) in enumerate(bodies + [(len(buf), len(buf))]):
+            if (variables and pos == 0) or z in zones:
+                text = buf[pos:start].decode('latin-1')
+                pieces.append(_rename_records(text, variables, zones.get(z)).encode('latin-1'))
+            else:
+                pieces.append((pos, start))
+            pieces.append((start, end))
+            pos = end
+    rewrite.rewrite_file(filename_in, filename_out, pieces)
+    LOG.debug('Renamed %d variables, %d zones of %s', len(variables), len(zones), filename_in)
+
+class DatWriter:
+    ''' Streaming writer for Tecplot ASCII datafiles (BLOCK packing)
+
+        Mirrors the pltfile.PltWriter interface: zone headers are given up
+        front and zone data is appended one zone at a time, either with
+        write_zone() or with begin_zone()/write_values()/end_zone().
+    '''
+
+    def __init__(self, filename, title, variables, zones, aux_data=None):
+        self.num_vars = len(variables)
+        self.zones = list(zones)
+        self._next_zone = 0
+        self._current = None
+        self._file = open(filename, 'w')
+        self._file.write('TITLE     = {}\n'.format(_quote(title)))
+        self._file.write('VARIABLES = {}\n'.format(
+            '\n'.join(_quote(name) for name in variables)
+        ))
+        for name, value in (aux_data or {}).items():
+            self._file.write('DATASETAUXDATA {}={}\n'.format(name, _quote(str(value))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def begin_zone(self, dtypes):
+        ''' Write the header of the next zone (dtypes: one per variable) '''
+        if self._current:
+            raise RuntimeError('Previous zone was not finished with end_zone()')
+        if self._next_zone >= len(self.zones):
+            raise RuntimeError('All zones have already been written')
+        f = self._file
+        zone = self.zones[self._next_zone]
+        self._next_zone += 1
+        f.write('ZONE T={}\n'.format(_quote(zone.name)))
+        f.write(' STRANDID={}, SOLUTIONTIME={!r}\n'.format(zone.strand, float(zone.solution_time)))
+        if zone.zone_type == ZoneType.Ordered:
+            f.write(' I={}, J={}, K={}, ZONETYPE=Ordered\n'.format(*zone.dimensions))
+        else:
+            type_name = {v: k for k, v in ZONE_TYPES.items()}[zone.zone_type]
+            f.write(' Nodes={}, Elements={}, ZONETYPE={}\n'.format(
+                zone.num_points, zone.num_elements, type_name,
+            ))
+        f.write(' DATAPACKING=BLOCK\n')
+        cell_vars = [
+            str(v+1) for v in range(self.num_vars)
+            if zone.location(v) == ValueLocation.CellCentered
+        ]
+        if cell_vars:
+            f.write(' VARLOCATION=([{}]=CELLCENTERED)\n'.format(','.join(cell_vars)))
+        type_names = {np.dtype(t): name for name, t in DATA_TYPES.items()}
+        types = [type_names.get(np.dtype(t), 'DOUBLE') for t in dtypes]
+        f.write(' DT=({} )\n'.format(' '.join(types)))
+        for name, value in zone.aux_data.items():
+            f.write(' AUXDATA {}={}\n'.format(name, _quote(str(value))))
+        self._current = {
+            'zone':    zone,
+            'formats': [{'SINGLE': '%.9E', 'DOUBLE': '%.16E'}.get(t, '%d') for t in types],
+            'var':     0,
+            'count':   0,
+        }
+
+    def write_values(self, var, values):
+        ''' Append values for a variable; variables must be written in order '''
+        cur = self._current
+        if not cur:
+            raise RuntimeError('write_values() called outside begin_zone()/end_zone()')
+        if var != cur['var']:
+            self._finish_variable()
+            if var != cur['var']:
+                raise RuntimeError(f'Expected values for variable {cur["var"]}, got {var}')
+        values = np.asarray(values).ravel()
+        _write_values(self._file, values, cur['formats'][var])
+        cur['count'] += values.size
+
+    def _finish_variable(self):
+        cur  = self._current
+        zone = cur['zone']
+        expected = zone.num_values(cur['var'])
+        if cur['count'] != expected:
+            raise ValueError(
+                f'Zone "{zone.name}" variable {cur["var"]}: wrote {cur["count"]} '
+                f'values, expected {expected}'
+            )
+        cur['var'] += 1
+        cur['count'] = 0
+
+    def end_zone(self, connectivity=None):
+        ''' Finish the current zone, writing FE connectivity (zero-based) '''
+        zone = self._current['zone']
+        self._finish_variable()
+        if self._current['var'] != self.num_vars:
+            raise ValueError(f'Zone "{zone.name}" is missing variable data')
+        if zone.zone_type != ZoneType.Ordered:
+            conn = np.asarray(connectivity)
+            _write_values(self._file, conn.ravel() + 1, '%d', per_line=conn.shape[1])
+        self._current = None
+
+    def write_zone(self, values, connectivity=None):
+        ''' Write the next zone from a list of arrays (one per variable) '''
+        arrays = [np.asarray(a) for a in values]
+        self.begin_zone([a.dtype for a in arrays])
+        for v, array in enumerate(arrays):
+            self.write_values(v, array)
+        self.end_zone(connectivity)
+
+def write_dat(filename, dataset, *, zones=None, variables=None):
+    ''' Write a Dataset to a Tecplot ASCII datafile (BLOCK packing)
+
+        Arguments:
+            filename    Path of the datafile to be written
+            dataset     Dataset to be written
+            zones       Zones (or indices) to write (def: all)
+            variables   Variables (or indices) to write (def: all)
+    '''
+    zones = [dataset.zone(_item_index(z)) for z in zones] \
+        if zones is not None else list(dataset.zones())
+    var_index = [_item_index(v) for v in variables] \
+        if variables is not None else list(range(dataset.num_variables))
+    names = [dataset.variable_names[v] for v in var_index]
+    headers = [z.header(var_index) for z in zones]
+    with DatWriter(filename, dataset.title, names, headers, dataset.aux_data) as writer:
+        for zone in zones:
+            writer.write_zone([zone.values(v) for v in var_index], zone.connectivity)
+
+def _write_values(f, values, fmt, per_line=5):
+    ''' Write values, per_line to a line, formatting in large chunks '''
+    line  = (' ' + fmt) * per_line + '\n'
+    chunk = per_line * (PARSE_CHUNK // 256)
+    for start in range(0, values.size, chunk):
+        block = values[start:start+chunk].tolist()
+        nfull = len(block) // per_line * per_line
+        f.write((line * (nfull // per_line)) % tuple(block[:nfull]))
+        if nfull < len(block):
+            f.write((' ' + fmt) * (len(block) - nfull) % tuple(block[nfull:]) + '\n')
@@ -0,0 +1,181 @@
+''' Native inverse-distance interpolation
+
+Source points from all source zones are put in a single PointTree. Each
+target point takes the inverse-distance weighted average of its k nearest
+source points (weights 1/d**exponent), optionally limited to a search
+radius. Weights are computed once per target zone and applied to every
+variable.
+
+Weights depend only on the source/target coordinates and the parameters,
+so they can be saved in a cache directory, keyed by a hash of both grids.
+Interpolating another solution on the same grids then skips the search
+and is a pure gather: a sparse (k entries per row) matrix-vector product.
+
+Given the source zone bounding boxes, each target zone searches only the
+source zones that can hold one of its k nearest points (within radius),
+using a tree over those zones alone.
+'''
+import hashlib
+import logging
+import math
+import numpy as np
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from . import timing
+from .spatial import PointTree
+
+LOG = logging.getLogger(__name__)
+
+# Target points per query batch
+BATCH_SIZE = 1<<16
+
+def idw_weights(tree, points, *, k=8, exponent=3.5, radius=math.inf, workers=1):
+    ''' Inverse-distance weights of the k nearest tree points
+
+        Arguments:
+            tree        PointTree of source points
+            points      (m, dim) array of target points
+            k           Number of neighbours used for each target point
+            exponent    Distance exponent of the weights
+            radius      Ignore source points farther than radius
+            workers     Number of threads used for the queries
+
+        Returns:
+            index, weights  (m, k) arrays of source point indices and
+                            normalized weights. A target point that
+                            coincides with source points uses those alone;
+                            one with no neighbour within radius gets NaN
+                            weights (so interpolated values are NaN).
+    '''
+    points = np.asarray(points, dtype=np.float64)
+    index = np.empty((len(points), k), dtype=np.intp)
+    weights = np.empty((len(points), k))
+
+    def batch(start):
+        s = slice(start, start + BATCH_SIZE)
+        dist, idx = tree.query(points[s], k, radius=radius)
+        valid = idx < tree.n
+        with np.errstate(divide='ignore'):
+            w = np.where(valid, dist, np.inf) ** -exponent
+        exact = valid & (dist == 0.0)
+        has_exact = exact.any(axis=1)
+        w[has_exact] = exact[has_exact]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w /= w.sum(axis=1, keepdims=True)
+        index[s] = np.where(valid, idx, 0)
+        weights[s] = w
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        list(pool.map(batch, range(0, len(points), BATCH_SIZE)))
+    return index, weights
+
+def apply_weights(index, weights, values):
+    ''' Weighted sum of source values for each target point '''
+    values = np.asarray(values)
+    return np.einsum('ij,ij->i', weights, values[index])
+
+def stencil_key(src_zones, tgt_zones, **params):
+    ''' Hash of the source/target coordinates and interpolation parameters '''
+    key = hashlib.sha1(repr(sorted(params.items())).encode())
+    for zones in (src_zones, tgt_zones):
+        key.update(b'zones:%d' % len(zones))
+        for zone in zones:
+            for v in range(3):
+                values = np.ascontiguousarray(zone.values(v))
+                key.update(values.dtype.str.encode())
+                key.update(values.view(np.uint8))
+    return key.hexdigest()
+
+def load_stencils(path, num_zones):
+    ''' Load per-zone (index, weights) from a cache file; None if unusable '''
+    try:
+        with np.load(path) as f:
+            return [(f[f'index{i}'], f[f'weights{i}']) for i in range(num_zones)]
+    except (OSError, KeyError, ValueError) as e:
+        LOG.warning('Ignoring interpolation cache %s (%s)', path, e)
+        return None
+
+def save_stencils(path, stencils):
+    ''' Save per-zone (index, weights) to a cache file (atomically) '''
+    arrays = {}
+    for i, (index, weights) in enumerate(stencils):
+        if index.size == 0 or index.max() < np.iinfo(np.int32).max:
+            index = index.astype(np.int32)
+        arrays[f'index{i}'] = index
+        arrays[f'weights{i}'] = weights
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except:
+        os.remove(tmp)
+        raise
+
+def interpolate_zones(data_src, data_tgt, *, k=8, exponent=3.5, radius=math.inf, workers=1,
+                      cache_dir=None, boxes=None):
+    ''' Interpolate source variables onto the target zones (3D only)
+
+        The first three variables of each dataset are the coordinates.
+        Yields a list of values for each target zone in turn: coordinates
+        from the target, then interpolated values of the remaining source
+        variables. If cache_dir is given, weights are read from/saved to
+        a cache file there. If boxes (ZoneBoxes of the source zones) is
+        given, source zones too far from a target zone are not searched.
+    '''
+    src_zones = list(data_src.zones())
+    tgt_zones = list(data_tgt.zones())
+    stencils = None
+    if cache_dir:
+        key = stencil_key(src_zones, tgt_zones, k=k, exponent=exponent, radius=radius)
+        path = os.path.join(cache_dir, f'idw-{key}.npz')
+        if os.path.exists(path):
+            LOG.info('Load interpolation weights from %s', path)
+            stencils = load_stencils(path, len(tgt_zones))
+    if stencils is None:
+        coords = [np.column_stack([z.values(v)[:] for v in range(3)]) for z in src_zones]
+        offsets = np.cumsum([0] + [len(c) for c in coords])
+        used, tree = None, None
+        stencils = []
+        for zone in tgt_zones:
+            points = np.column_stack([zone.values(v)[:] for v in range(3)])
+            if boxes is not None and len(points):
+                with np.errstate(invalid='ignore'):
+                    lower, upper = np.nanmin(points, axis=0), np.nanmax(points, axis=0)
+                near = np.flatnonzero(boxes.near_mask(lower, upper, k=k, radius=radius))
+            else:
+                near = np.arange(len(src_zones))
+            if tree is None or not np.array_equal(near, used):
+                # Consecutive target zones usually search the same source zones
+                used = near
+                LOG.info('Build search tree over %d source zones', len(used))
+                tree = PointTree(np.concatenate([coords[z] for z in used] or [np.empty((0, 3))]))
+                source = np.concatenate(
+                    [np.arange(offsets[z], offsets[z+1]) for z in used] or [np.zeros(1, np.intp)]
+                )
+            LOG.info('Compute weights for %d points of zone %s', len(points), zone.name)
+            with timing.phase('compute', zone=zone.name):
+                index, weights = idw_weights(
+                    tree, points, k=k, exponent=exponent, radius=radius, workers=workers,
+                )
+            stencils.append((source[index], weights))
+        if boxes is not None:
+            LOG.info('Bounding boxes culled %d of %d source zone searches',
+                     boxes.counters['culled'], boxes.counters['tested'])
+        if cache_dir:
+            LOG.info('Save interpolation weights to %s', path)
+            save_stencils(path, stencils)
+
+    source_vars = range(3, data_src.num_variables)
+    sources = {
+        v: np.concatenate([z.values(v)[:] for z in src_zones]) for v in source_vars
+    }
+    for zone, (index, weights) in zip(tgt_zones, stencils):
+        with timing.phase('compute', zone=zone.name):
+            values = [zone.values(v) for v in range(3)]
+            for v in source_vars:
+                dtype = np.result_type(sources[v].dtype, np.float32)
+                values.append(apply_weights(index, weights, sources[v]).astype(dtype))
+        yield values
@@ -0,0 +1,114 @@
+''' Native line (rake) extraction
+
+Each line is a polyline resampled at points evenly spaced along its arc
+length. The sample points of all lines are probed together in one call
+to probe.probe_dataset, so the search index is built (or loaded) once and
+every cell search runs as a single batch, however many lines there are.
+Each line becomes a 1D ordered zone holding its sample coordinates, the
+sampled values and the distance along the line (ARC_LENGTH).
+'''
+import logging
+import numpy as np
+import os
+import sys
+from . import probe, timing
+from .dataset import Dataset, Zone, ZoneType
+from importlib.machinery import SourceFileLoader
+
+LOG = logging.getLogger(__name__)
+
+# Name of the variable holding the distance along each line
+ARC_LENGTH = 'arc_length'
+
+def read_lines(line_file):
+    ''' List of (name, vertices, num_points) line definitions
+
+        A YAML file (*.yml, *.yaml) holds a "lines" list whose items are
+        [name, vertices, num_points] lists or mappings with those keys.
+        Any other file is loaded as a Python module that defines a list of
+        tuples called "lines".
+    '''
+    if os.path.splitext(line_file)[1].lower() in ('.yml', '.yaml'):
+        import yaml
+        with open(line_file) as f:
+            lines = (yaml.safe_load(f) or {}).get('lines')
+    else:
+        sys.dont_write_bytecode = True # So we don't clutter users workspace
+        try:
+            config = SourceFileLoader("config", line_file).load_module()
+        finally:
+            sys.dont_write_bytecode = False
+        lines = getattr(config, 'lines', None)
+    if not lines:
+        raise ValueError(f'{line_file} does not define any lines')
+    return [
+        (line['name'], line['vertices'], line['num_points']) if isinstance(line, dict)
+        else tuple(line)
+        for line in lines
+    ]
+
+def sample_polyline(vertices, num_points):
+    ''' (num_points, dim) points evenly spaced along a polyline, and their arc length '''
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if vertices.ndim != 2 or len(vertices) < 2 or vertices.shape[1] not in (2, 3):
+        raise ValueError('A line needs at least two vertices of 2 or 3 coordinates')
+    if num_points < 2:
+        raise ValueError('A line needs at least two points')
+    length = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(vertices, axis=0), axis=1))])
+    arc = np.linspace(0.0, length[-1], num_points)
+    points = np.column_stack([np.interp(arc, length, x) for x in vertices.T])
+    return points, arc
+
+def extract_lines(dataset, lines, *, mode='cell', index=None, k=16, workers=1):
+    ''' Sample a native Dataset along many polylines at once
+
+        Arguments:
+            dataset     Dataset whose first dim variables are coordinates
+            lines       List of (name, vertices, num_points) tuples; vertices
+                        is a list of 2 or 3 coordinates (the same for all lines)
+            mode        'cell': values interpolated in the cell holding each
+                        point; 'nearest': values at the nearest node
+            index       probe.ProbeIndex of the dataset (def: built here)
+            k           Cells tested per point in cell mode (def: 16)
+            workers     Number of threads used for the searches
+
+        Returns:
+            Dataset with one ordered zone per line, holding the points
+            found in the dataset in order (lines with none are skipped
+            with a warning)
+    '''
+    samples = [sample_polyline(vertices, num_points) for name, vertices, num_points in lines]
+    dims = {points.shape[1] for points, arc in samples}
+    if len(dims) != 1:
+        raise ValueError('All lines must have the same number of coordinates')
+    dim = dims.pop()
+    offsets = np.cumsum([0] + [len(arc) for points, arc in samples])
+
+    LOG.info("Sample %d lines at %d points (%s)", len(lines), offsets[-1], mode)
+    table = probe.probe_dataset(
+        dataset, np.concatenate([points for points, arc in samples]),
+        mode    = mode,
+        index   = index,
+        k       = k,
+        workers = workers,
+    )
+
+    result = Dataset(
+        dataset.title,
+        dataset.variable_names[:dim] + table.variables + [ARC_LENGTH],
+        dataset.aux_data,
+    )
+    with timing.phase('compute'):
+        for (name, *rest), (points, arc), start, end in zip(lines, samples, offsets, offsets[1:]):
+            found = np.flatnonzero(table.zones[start:end] >= 0)
+            if not len(found):
+                LOG.warning("Line '%s' does not intersect any zone; skipped", name)
+                continue
+            if len(found) < len(arc):
+                LOG.warning("Line '%s': %d of %d points are outside the dataset; dropped",
+                            name, len(arc) - len(found), len(arc))
+            values = [points[found, d] for d in range(dim)]
+            values += [np.ascontiguousarray(v) for v in table.values[start + found].T]
+            values.append(arc[found])
+            result.add_zone(Zone(name, ZoneType.Ordered, (len(found),), values))
+    return result
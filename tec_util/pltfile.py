@@ -0,0 +1,711 @@
+''' Native reader/writer for Tecplot binary (*.plt) datafiles.
+
+    The header section and the small per-zone data headers are parsed with
+    struct; the value blocks themselves are exposed as views into a single
+    copy-on-write np.memmap of the file. Nothing is read from disk until a
+    view is touched, so memory use is proportional to the data actually
+    used and repeated runs are served from the OS page cache.
+
+    Supported: binary versions #!TDV107..#!TDV112, BLOCK packing, ordered
+    and classic FE zones, nodal and FE cell-centered data, passive and
+    shared variables. Anything else, including the older zone header
+    layout of #!TDV102..#!TDV106, raises FormatError. Files are written
+    as #!TDV112 by the streaming PltWriter.
+'''
+import collections
+import logging
+import math
+import mmap
+import os
+import struct
+import numpy as np
+from . import rewrite
+from .dataset import (
+    Dataset, FormatError, NODES_PER_ELEMENT, ValueLocation, Zone, ZoneType,
+    _item_index, _item_indices,
+)
+
+LOG = logging.getLogger(__name__)
+
+# Binary format versions that are parsed
+MIN_VERSION = 107
+MAX_VERSION = 112
+
+ZONE_MARKER    = 299.0
+EOH_MARKER     = 357.0
+GEOM_MARKER    = 399.0
+TEXT_MARKER    = 499.0
+LABEL_MARKER   = 599.0
+USER_MARKER    = 699.0
+AUX_MARKER     = 799.0
+VAR_AUX_MARKER = 899.0
+
+DATA_TYPES = {
+    1: np.float32,
+    2: np.float64,
+    3: np.int32,
+    4: np.int16,
+    5: np.uint8,
+}
+
+# Data type of each format code, by byte order
+DTYPES = {
+    order: {f: np.dtype(t).newbyteorder(order) for f, t in DATA_TYPES.items()}
+    for order in '<>'
+}
+
+ZoneLayout = collections.namedtuple('ZoneLayout', [
+    'zone',         # Zone (header info only, no values)
+    'dtypes',       # [np.dtype] data type of each variable
+    'passive',      # [bool] passive flag for each variable
+    'shared',       # [int] zone each variable is shared from (-1: not shared)
+    'conn_share',   # int zone connectivity is shared from (-1: not shared)
+    'ranges',       # [(min,max)|None] stored range of each variable
+    'offsets',      # [int|None] file offset of each variable block
+    'conn_offset',  # int|None file offset of the connectivity block
+    'data_start',   # int file offset of the zone's data section marker
+    'data_end',     # int file offset just past the zone's data section
+])
+
+PltLayout = collections.namedtuple('PltLayout', [
+    'version',      # int binary format version, e.g. 112
+    'byte_order',   # str struct byte order prefix ('<' or '>')
+    'title',        # str dataset title
+    'variables',    # [str] variable names
+    'aux_data',     # {str:str} dataset auxiliary data
+    'zones',        # [ZoneLayout]
+    'header_end',   # int file offset of the first zone data section
+    'name_offsets', # [int] file offsets of the variable name strings
+    'zone_offsets', # [int] file offsets of the zone header records (name first)
+])
+
+
+#-----------------------------------------------------------------------
+# Low-level Parsing
+#-----------------------------------------------------------------------
+class _Cursor:
+    ''' Sequential reader over a buffer '''
+
+    def __init__(self, buf, byte_order='<', pos=0):
+        self.buf = buf
+        self.pos = pos
+        self.byte_order = byte_order
+
+    def unpack(self, fmt):
+        fmt = self.byte_order + fmt
+        values = struct.unpack_from(fmt, self.buf, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def int32(self):
+        return self.unpack('i')[0]
+
+    def float32(self):
+        return self.unpack('f')[0]
+
+    def float64(self):
+        return self.unpack('d')[0]
+
+    def string(self):
+        ''' Null-terminated string stored as one int32 per character '''
+        chars = []
+        while True:
+            c = self.int32()
+            if c == 0:
+                return ''.join(chars)
+            chars.append(chr(c))
+
+def _parse_zone_header(cur, version, num_vars):
+    name          = cur.string()
+    cur.int32()   # parent zone (unused)
+    strand        = cur.int32() + 1
+    solution_time = cur.float64()
+    cur.int32()   # zone color (unused)
+    zone_type     = cur.int32()
+    if not 0 <= zone_type <= 7:
+        raise FormatError(f'Zone "{name}" has invalid zone type {zone_type}')
+    zone_type = ZoneType(zone_type)
+    if version < 112 and cur.int32() != 0:
+        raise FormatError(f'Zone "{name}" uses POINT data packing')
+    locations = None
+    if cur.int32():
+        locations = [ValueLocation(cur.int32()) for v in range(num_vars)]
+    if version >= 111 and cur.int32():
+        raise FormatError(f'Zone "{name}" has raw face neighbors')
+    if cur.int32():
+        raise FormatError(f'Zone "{name}" has face neighbor connections')
+    if zone_type == ZoneType.Ordered:
+        dimensions = cur.unpack('3i')
+        if locations and any(locations):
+            raise FormatError(f'Zone "{name}" has cell-centered ordered data')
+    else:
+        if zone_type in (ZoneType.FEPolygon, ZoneType.FEPolyhedron):
+            raise FormatError(f'Zone "{name}" is a polytope zone')
+        dimensions = cur.unpack('2i')
+        cur.unpack('3i')  # cell dimensions (unused)
+    aux_data = {}
+    while cur.int32():
+        key = cur.string()
+        cur.int32()  # value format (always string)
+        aux_data[key] = cur.string()
+    return Zone(
+        name, zone_type, dimensions,
+        strand        = strand,
+        solution_time = solution_time,
+        locations     = locations,
+        aux_data      = aux_data,
+    )
+
+def _scatter(items, indices, count):
+    ''' List of count items with items placed at indices (None elsewhere) '''
+    if len(indices) == count:
+        return list(items)
+    result = [None] * count
+    for i, item in zip(indices, items):
+        result[i] = item
+    return result
+
+def _parse_zone_data(cur, zone, zones, num_vars):
+    ''' Parse a zone's data section header, return its ZoneLayout '''
+    start = cur.pos
+    if cur.float32() != ZONE_MARKER:
+        raise FormatError(f'Missing data section marker for zone "{zone.name}"')
+    formats = cur.unpack(f'{num_vars}i')
+    try:
+        dtypes = [DTYPES[cur.byte_order][f] for f in formats]
+    except KeyError:
+        raise FormatError(f'Zone "{zone.name}" has unsupported (bit) data')
+    passive = [False] * num_vars
+    if cur.int32():
+        passive = [bool(p) for p in cur.unpack(f'{num_vars}i')]
+    shared = [-1] * num_vars
+    if cur.int32():
+        shared = list(cur.unpack(f'{num_vars}i'))
+    conn_share = cur.int32()
+
+    stored = [v for v in range(num_vars) if shared[v] < 0 and not passive[v]]
+    minmax = cur.unpack(f'{2*len(stored)}d')
+    ranges = _scatter(zip(minmax[0::2], minmax[1::2]), stored, num_vars)
+    for v in range(num_vars):
+        if shared[v] >= 0:
+            ranges[v] = zones[shared[v]].ranges[v]
+
+    # Value blocks of the stored variables follow each other
+    offsets = [None] * num_vars
+    if stored:
+        cell = np.array(zone.locations or [0] * num_vars)[stored] == ValueLocation.CellCentered
+        nbytes = np.where(cell, zone.num_elements, zone.num_points) * \
+                 np.array([dtypes[v].itemsize for v in stored])
+        ends = cur.pos + np.cumsum(nbytes)
+        offsets = _scatter((ends - nbytes).tolist(), stored, num_vars)
+        cur.pos = int(ends[-1])
+    conn_offset = None
+    if zone.zone_type != ZoneType.Ordered and conn_share < 0:
+        conn_offset = cur.pos
+        cur.pos += 4 * zone.num_elements * NODES_PER_ELEMENT[zone.zone_type]
+
+    return ZoneLayout(
+        zone, dtypes, passive, shared, conn_share, ranges,
+        offsets, conn_offset, start, cur.pos,
+    )
+
+def _scan(cur, version, size):
+    ''' Parse everything following the magic number/byte order marker '''
+    if version >= 111 and cur.int32() != 0:
+        raise FormatError('Only FULL datafiles are supported')
+
+    # Header section
+    title        = cur.string()
+    variables    = []
+    name_offsets = []
+    for v in range(cur.int32()):
+        name_offsets.append(cur.pos)
+        variables.append(cur.string())
+    aux_data     = {}
+    headers      = []
+    zone_offsets = []
+    while True:
+        marker = cur.float32()
+        if marker == ZONE_MARKER:
+            zone_offsets.append(cur.pos)
+            headers.append(_parse_zone_header(cur, version, len(variables)))
+        elif marker == AUX_MARKER:
+            key = cur.string()
+            cur.int32()
+            aux_data[key] = cur.string()
+        elif marker == VAR_AUX_MARKER:
+            cur.int32()
+            cur.string()
+            cur.int32()
+            cur.string()
+        elif marker == USER_MARKER:
+            cur.string()
+        elif marker == LABEL_MARKER:
+            for i in range(cur.int32()):
+                cur.string()
+        elif marker == EOH_MARKER:
+            break
+        elif marker in (GEOM_MARKER, TEXT_MARKER):
+            raise FormatError('Geometry and text records are not supported')
+        else:
+            raise FormatError(f'Unexpected header marker {marker} at byte {cur.pos-4}')
+    header_end = cur.pos
+
+    # Data section
+    zones = []
+    for zone in headers:
+        zones.append(_parse_zone_data(cur, zone, zones, len(variables)))
+    if cur.pos > size:
+        raise FormatError('Datafile is truncated')
+
+    return PltLayout(version, cur.byte_order, title, variables, aux_data, zones, header_end,
+                     name_offsets, zone_offsets)
+
+
+#-----------------------------------------------------------------------
+# Public Interface
+#-----------------------------------------------------------------------
+def scan_plt(buf):
+    ''' Parse header and zone data layout from a buffer holding a PLT file
+
+        Only the header section and the per-zone data headers are read, so
+        this touches a tiny fraction of the file regardless of its size.
+    '''
+    magic = bytes(buf[:8])
+    if not magic.startswith(b'#!TDV'):
+        raise FormatError('Not a Tecplot binary datafile')
+    try:
+        version = int(magic[5:8])
+    except ValueError:
+        raise FormatError(f'Unrecognized binary format "{magic.decode("latin-1")}"')
+    if not MIN_VERSION <= version <= MAX_VERSION:
+        raise FormatError(f'Unsupported binary format version {version}')
+    byte_order = '<' if struct.unpack_from('<i', buf, 8)[0] == 1 else '>'
+    try:
+        return _scan(_Cursor(buf, byte_order, 12), version, len(buf))
+    except struct.error:
+        raise FormatError('Datafile is truncated')
+
+def read_plt(filename, *, zones=None, variables=None):
+    ''' Read a Tecplot binary datafile into a Dataset without the Tecplot engine
+
+        Variable values are zero-copy views into a copy-on-write memory map
+        of the file: pages are read on first access and modifications are
+        private to the process.
+
+        Arguments:
+            filename    Path to the binary datafile
+            zones       Indices of the zones to load (def: all)
+            variables   Indices of the variables to load (def: all)
+
+        Returns:
+            Dataset whose zones hold np.memmap-backed arrays
+    '''
+    buf = np.memmap(filename, dtype=np.uint8, mode='c')
+    layout = scan_plt(buf)
+    zones = _item_indices(zones, len(layout.zones))
+    variables = _item_indices(variables, len(layout.variables))
+    views = {}
+
+    def values(z, v):
+        zl = layout.zones[z]
+        while zl.shared[v] >= 0:
+            z, zl = zl.shared[v], layout.zones[zl.shared[v]]
+        if (z, v) not in views:
+            n = zl.zone.num_values(v)
+            if zl.passive[v]:
+                views[z, v] = np.broadcast_to(np.zeros(1, zl.dtypes[v]), (n,))
+            else:
+                views[z, v] = _view(buf, zl.offsets[v], zl.dtypes[v], n)
+        return views[z, v]
+
+    def connectivity(z):
+        zl = layout.zones[z]
+        while zl.conn_share >= 0:
+            z, zl = zl.conn_share, layout.zones[zl.conn_share]
+        if (z, None) not in views:
+            npe = NODES_PER_ELEMENT[zl.zone.zone_type]
+            conn = _view(buf, zl.conn_offset, np.dtype('i4').newbyteorder(layout.byte_order),
+                         zl.zone.num_elements * npe)
+            views[z, None] = conn.reshape(zl.zone.num_elements, npe)
+        return views[z, None]
+
+    dataset = Dataset(layout.title, [layout.variables[v] for v in variables], layout.aux_data)
+    for z in zones:
+        zl = layout.zones[z]
+        zone = zl.zone if len(variables) == len(layout.variables) else zl.zone.header(variables)
+        zone._values = [values(z, v) for v in variables]
+        zone.ranges  = [zl.ranges[v] for v in variables]
+        if zone.zone_type != ZoneType.Ordered:
+            zone.connectivity = connectivity(z)
+        dataset.add_zone(zone)
+    LOG.debug('Mapped %d zones, %d variables from %s',
+              dataset.num_zones, dataset.num_variables, filename)
+    return dataset
+
+def read_plt_header(filename):
+    ''' Dataset of value-less zones (with stored variable ranges) of a PLT file
+
+        Only the header and the per-zone data headers are read, so zone
+        and variable patterns can be resolved before loading any values.
+    '''
+    layout = scan_plt(np.memmap(filename, dtype=np.uint8, mode='r'))
+    dataset = Dataset(layout.title, layout.variables, layout.aux_data)
+    for zl in layout.zones:
+        zl.zone._values = [None] * len(layout.variables)
+        zl.zone.ranges  = list(zl.ranges)
+        dataset.add_zone(zl.zone)
+    return dataset
+
+def rename_plt(filename_in, filename_out, *, variables=None, zones=None):
+    ''' Copy a PLT file with renamed variables and/or zones
+
+        Only the name strings in the header section are rewritten; the rest
+        of the file is copied byte for byte without decoding any values (see
+        rewrite.rewrite_file). Renaming a file in place with names of the
+        same length only writes the new names.
+
+        Arguments:
+            filename_in     Path to the binary datafile
+            filename_out    Path of the renamed datafile (may be filename_in)
+            variables       {index: new name} of the variables to rename
+            zones           {index: new name} of the zones to rename
+    '''
+    with open(filename_in, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        layout = scan_plt(buf)
+    names = []
+    for v, name in (variables or {}).items():
+        names.append((layout.name_offsets[v], layout.variables[v], name))
+    for z, name in (zones or {}).items():
+        names.append((layout.zone_offsets[z], layout.zones[z].zone.name, name))
+
+    pieces, pos = [], 0
+    for offset, old_name, new_name in sorted(names):
+        pieces.append((pos, offset))
+        pieces.append(struct.pack(f'{layout.byte_order}{len(new_name)+1}i',
+                                  *map(ord, new_name), 0))
+        pos = offset + 4 * (len(old_name) + 1)
+    pieces.append((pos, os.path.getsize(filename_in)))
+    rewrite.rewrite_file(filename_in, filename_out, pieces)
+    LOG.debug('Renamed %d names of %s', len(names), filename_in)
+
+def _view(buf, offset, dtype, count):
+    return buf[offset:offset + count * dtype.itemsize].view(dtype)
+
+
+#-----------------------------------------------------------------------
+# Writer
+#-----------------------------------------------------------------------
+class PltWriter:
+    ''' Streaming writer for Tecplot binary (#!TDV112) datafiles
+
+        Zone headers are written up front; zone data is then appended one
+        zone at a time, either as whole arrays with write_zone() or in
+        pieces with begin_zone()/write_values()/end_zone(). Variable ranges
+        are accumulated while writing and patched into the zone's data
+        header afterwards, so memory use is bounded by the largest chunk
+        rather than the dataset.
+
+        Arguments:
+            filename    Path of the datafile to be written
+            title       Dataset title
+            variables   List of variable names
+            zones       List of Zones describing each zone to be written
+                        (names, types, dimensions, ... values are not used)
+            aux_data    Dict of dataset auxiliary data
+            chunk_size  Number of values converted/written at a time
+    '''
+
+    def __init__(self, filename, title, variables, zones, aux_data=None, *,
+                 chunk_size=1<<22):
+        self.num_vars   = len(variables)
+        self.zones      = list(zones)
+        self.chunk_size = chunk_size
+        self._next_zone = 0
+        self._current   = None
+        self._file      = open(filename, 'wb')
+        try:
+            self._write_header(title, variables, aux_data or {})
+        except:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self._file.close()
+        else:
+            self.close()
+
+    def close(self):
+        ''' Close the file; all zones must have been written '''
+        if self._file.closed:
+            return
+        self._file.close()
+        if self._next_zone != len(self.zones) or self._current:
+            raise RuntimeError(
+                f'PltWriter closed after {self._next_zone} of {len(self.zones)} zones'
+            )
+
+    def _write(self, fmt, *values):
+        self._file.write(struct.pack('<' + fmt, *values))
+
+    def _write_string(self, text):
+        codes = [ord(c) for c in text] + [0]
+        self._write(f'{len(codes)}i', *codes)
+
+    def _write_header(self, title, variables, aux_data):
+        self._file.write(b'#!TDV112')
+        self._write('ii', 1, 0)
+        self._write_string(title)
+        self._write('i', len(variables))
+        for name in variables:
+            self._write_string(name)
+        for zone in self.zones:
+            if zone.zone_type in (ZoneType.FEPolygon, ZoneType.FEPolyhedron):
+                raise FormatError(f'Cannot write polytope zone "{zone.name}"')
+            self._write('f', ZONE_MARKER)
+            self._write_string(zone.name)
+            self._write('iidii', -1, zone.strand - 1, zone.solution_time, -1, zone.zone_type)
+            locations = [zone.location(v) for v in range(self.num_vars)]
+            if any(locations):
+                if zone.zone_type == ZoneType.Ordered:
+                    raise FormatError(f'Cannot write cell-centered ordered zone "{zone.name}"')
+                self._write(f'i{self.num_vars}i', 1, *locations)
+            else:
+                self._write('i', 0)
+            self._write('ii', 0, 0)  # no face neighbors
+            if zone.zone_type == ZoneType.Ordered:
+                self._write('3i', *zone.dimensions)
+            else:
+                self._write('5i', zone.num_points, zone.num_elements, 0, 0, 0)
+            for key, value in zone.aux_data.items():
+                self._write('i', 1)
+                self._write_string(key)
+                self._write('i', 0)
+                self._write_string(value)
+            self._write('i', 0)
+        for key, value in aux_data.items():
+            self._write('f', AUX_MARKER)
+            self._write_string(key)
+            self._write('i', 0)
+            self._write_string(value)
+        self._write('f', EOH_MARKER)
+
+    def begin_zone(self, dtypes):
+        ''' Start the data section of the next zone
+
+            Arguments:
+                dtypes  List of NumPy dtypes, one per variable
+        '''
+        if self._current:
+            raise RuntimeError('Previous zone was not finished with end_zone()')
+        if self._next_zone >= len(self.zones):
+            raise RuntimeError('All zones have already been written')
+        codes = {np.dtype(t): c for c, t in DATA_TYPES.items()}
+        dtypes = [np.dtype(t) for t in dtypes]
+        formats = [codes.get(t, 2) for t in dtypes]
+        self._write('f', ZONE_MARKER)
+        self._write(f'{self.num_vars}i', *formats)
+        self._write('iii', 0, 0, -1)  # no passive vars, no sharing
+        self._current = {
+            'zone':         self.zones[self._next_zone],
+            'dtypes':       [np.dtype(DATA_TYPES[f]).newbyteorder('<') for f in formats],
+            'range_offset': self._file.tell(),
+            'ranges':       [[math.inf, -math.inf] for v in range(self.num_vars)],
+            'var':          0,
+            'count':        0,
+        }
+        self._write(f'{2*self.num_vars}d', *[0.0] * (2*self.num_vars))
+
+    def write_values(self, var, values):
+        ''' Append values for a variable; variables must be written in order '''
+        cur = self._current
+        if not cur:
+            raise RuntimeError('write_values() called outside begin_zone()/end_zone()')
+        if var != cur['var']:
+            self._finish_variable()
+            if var != cur['var']:
+                raise RuntimeError(f'Expected values for variable {cur["var"]}, got {var}')
+        values = np.asarray(values).ravel()
+        dtype  = cur['dtypes'][var]
+        vrange = cur['ranges'][var]
+        for start in range(0, values.size, self.chunk_size):
+            chunk = values[start:start+self.chunk_size].astype(dtype, copy=False)
+            vrange[0] = min(vrange[0], float(np.fmin.reduce(chunk)))
+            vrange[1] = max(vrange[1], float(np.fmax.reduce(chunk)))
+            chunk.tofile(self._file)
+        cur['count'] += values.size
+
+    def _finish_variable(self):
+        cur  = self._current
+        zone = cur['zone']
+        expected = zone.num_values(cur['var'])
+        if cur['count'] != expected:
+            raise RuntimeError(
+                f'Zone "{zone.name}" variable {cur["var"]}: wrote {cur["count"]} '
+                f'values, expected {expected}'
+            )
+        cur['var'] += 1
+        cur['count'] = 0
+
+    def end_zone(self, connectivity=None):
+        ''' Finish the current zone, writing FE connectivity (zero-based) '''
+        cur  = self._current
+        zone = cur['zone']
+        self._finish_variable()
+        if cur['var'] != self.num_vars:
+            raise RuntimeError(f'Zone "{zone.name}" is missing variable data')
+        if zone.zone_type != ZoneType.Ordered:
+            if connectivity is None:
+                raise RuntimeError(f'FE zone "{zone.name}" requires connectivity')
+            conn = np.asarray(connectivity, dtype='<i4')
+            if conn.shape != (zone.num_elements, NODES_PER_ELEMENT[zone.zone_type]):
+                raise RuntimeError(f'Zone "{zone.name}" connectivity has shape {conn.shape}')
+            conn.tofile(self._file)
+        end = self._file.tell()
+        ranges = [x if math.isfinite(x) else 0.0 for r in cur['ranges'] for x in r]
+        self._file.seek(cur['range_offset'])
+        self._write(f'{len(ranges)}d', *ranges)
+        self._file.seek(end)
+        self._current = None
+        self._next_zone += 1
+
+    def write_zone(self, values, connectivity=None):
+        ''' Write the next zone from a list of arrays (one per variable) '''
+        self.begin_zone([np.asarray(v).dtype for v in values])
+        for v, array in enumerate(values):
+            self.write_values(v, array)
+        self.end_zone(connectivity)
+
+    def copy_zone(self, source, layout):
+        ''' Write the next zone by copying its blocks from another PLT file
+
+            Arguments:
+                source  Binary file object of a little-endian PLT file
+                layout  ZoneLayout of the zone as written: dtypes, passive
+                        flags, stored ranges, and sharing (with zones of
+                        this file) of the output variables; offsets and
+                        conn_offset locate the blocks in source
+        '''
+        if self._current:
+            raise RuntimeError('Previous zone was not finished with end_zone()')
+        if self._next_zone >= len(self.zones):
+            raise RuntimeError('All zones have already been written')
+        zone = self.zones[self._next_zone]
+        codes = {t: c for c, t in DTYPES['<'].items()}
+        self._write('f', ZONE_MARKER)
+        self._write(f'{self.num_vars}i', *[codes[t] for t in layout.dtypes])
+        for flags, used in ((layout.passive, any(layout.passive)),
+                            (layout.shared, max(layout.shared, default=-1) >= 0)):
+            if used:
+                self._write(f'i{self.num_vars}i', 1, *[int(f) for f in flags])
+            else:
+                self._write('i', 0)
+        self._write('i', layout.conn_share)
+        stored = [v for v in range(self.num_vars)
+                  if layout.shared[v] < 0 and not layout.passive[v]]
+        self._write(f'{2*len(stored)}d', *[x for v in stored for x in layout.ranges[v]])
+        cell = np.array(zone.locations or [0] * self.num_vars)[stored] == ValueLocation.CellCentered
+        sizes = np.where(cell, zone.num_elements, zone.num_points) * \
+                np.array([layout.dtypes[v].itemsize for v in stored], dtype=np.int64)
+        blocks = list(zip([layout.offsets[v] for v in stored], sizes.tolist()))
+        if zone.zone_type != ZoneType.Ordered and layout.conn_share < 0:
+            blocks.append((layout.conn_offset,
+                           4 * zone.num_elements * NODES_PER_ELEMENT[zone.zone_type]))
+
+        # Adjacent blocks (e.g. consecutive variables) are copied at once
+        ranges = []
+        for start, size in blocks:
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] += size
+            else:
+                ranges.append([start, start + size])
+        for start, end in ranges:
+            rewrite.copy_range(source, self._file, start, end)
+        self._next_zone += 1
+
+def write_plt(filename, dataset, *, zones=None, variables=None):
+    ''' Write a Dataset to a Tecplot binary datafile, one zone at a time
+
+        Arguments:
+            filename    Path of the datafile to be written
+            dataset     Dataset to be written
+            zones       Zones (or indices) to write (def: all)
+            variables   Variables (or indices) to write (def: all)
+    '''
+    zones = [dataset.zone(_item_index(z)) for z in zones] \
+        if zones is not None else list(dataset.zones())
+    var_index = [_item_index(v) for v in variables] \
+        if variables is not None else list(range(dataset.num_variables))
+    names = [dataset.variable_names[v] for v in var_index]
+    headers = [z.header(var_index) for z in zones]
+    with PltWriter(filename, dataset.title, names, headers, dataset.aux_data) as writer:
+        for zone in zones:
+            writer.write_zone([zone.values(v) for v in var_index], zone.connectivity)
+
+def extract_plt(filename_in, filename_out, *, zones=None, variables=None):
+    ''' Copy zones/variables of a PLT file without decoding their values
+
+        A new header and new per-zone data headers (with the stored ranges)
+        are written; value and connectivity blocks are copied by byte range
+        (see rewrite.copy_range), so subsetting runs at disk bandwidth.
+        Variables and connectivity shared with an earlier zone that is also
+        copied stay shared; otherwise the source block is copied.
+
+        Arguments:
+            filename_in     Path to the (little-endian) binary datafile
+            filename_out    Path of the datafile to be written
+            zones           Indices of the zones to copy (def: all)
+            variables       Indices of the variables to copy (def: all)
+    '''
+    with open(filename_in, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        layout = scan_plt(buf)
+    if layout.byte_order != '<':
+        raise FormatError(f'{filename_in} is big-endian')
+    zones = _item_indices(zones, len(layout.zones))
+    variables = _item_indices(variables, len(layout.variables))
+    written = {}
+
+    def owner(z, v):
+        ''' Zone holding the block of variable v of zone z (None: connectivity) '''
+        zl = layout.zones[z]
+        while (zl.conn_share if v is None else zl.shared[v]) >= 0:
+            z = zl.conn_share if v is None else zl.shared[v]
+            zl = layout.zones[z]
+        return z
+
+    out_layouts = []
+    for z in zones:
+        zl = layout.zones[z]
+        sources = [owner(z, v) for v in variables] if max(zl.shared, default=-1) >= 0 else [z] * len(variables)
+        dtypes  = [layout.zones[src].dtypes[v] for src, v in zip(sources, variables)]
+        shared  = [written.get(src, -1) if src != z else -1 for src in sources]
+        passive = [s < 0 and layout.zones[src].passive[v]
+                   for s, src, v in zip(shared, sources, variables)]
+        offsets = [layout.zones[src].offsets[v] for src, v in zip(sources, variables)]
+        conn_share, conn_offset = -1, None
+        if zl.zone.zone_type != ZoneType.Ordered:
+            src = owner(z, None)
+            conn_share = written.get(src, -1) if src != z else -1
+            conn_offset = layout.zones[src].conn_offset
+        written.setdefault(z, len(out_layouts))
+        out_layouts.append(zl._replace(
+            dtypes      = dtypes,
+            passive     = passive,
+            shared      = shared,
+            conn_share  = conn_share,
+            ranges      = [zl.ranges[v] for v in variables],
+            offsets     = offsets,
+            conn_offset = conn_offset,
+        ))
+
+    names = [layout.variables[v] for v in variables]
+    headers = [zl.zone.header(variables) for zl in out_layouts]
+    with open(filename_in, 'rb') as source, \
+         PltWriter(filename_out, layout.title, names, headers, layout.aux_data) as writer:
+        for zl in out_layouts:
+            writer.copy_zone(source, zl)
+    LOG.debug('Copied %d zones, %d variables from %s', len(zones), len(variables), filename_in)
@@ -0,0 +1,397 @@
+''' Native point probes
+
+A ProbeIndex holds the node coordinates and cell centres of every zone of
+a dataset, concatenated into single arrays, and builds a PointTree over
+each on first use. Probes are answered in batches:
+
+  - nearest: values at the node nearest to each probe
+  - cell:    values linearly interpolated in the cell holding each probe
+
+For cell probes, the k cells whose centres are nearest to a probe are
+tested, nearest first. Cells are split into triangles (2D) or tetrahedra
+(3D) and the probe's barycentric coordinates in each are computed at
+once for all probe/cell pairs. The dimension (2 or 3) is the number of
+probe coordinates, which are matched with the first variables of the
+dataset; cells of other dimensions are not searched.
+
+The index arrays can be saved next to the datafile (<datafile>.probe.npz)
+and reused until the datafile changes, so later probes of the same file
+skip reading the coordinates.
+'''
+import collections
+import csv
+import itertools
+import logging
+import numpy as np
+import os
+import tempfile
+from . import timing
+from .dataset import FormatError, ValueLocation, ZoneType
+from .spatial import PointTree, _file_stamp
+
+LOG = logging.getLogger(__name__)
+
+# Cells whose centres are computed at once
+CELL_CHUNK = 1<<20
+
+# Tolerance on barycentric coordinates for points on cell faces
+INSIDE_TOLERANCE = 1e-9
+
+# Triangles/tetrahedra of each (dimension, nodes per cell)
+SIMPLICES = {
+    (2, 3): [[0, 1, 2]],
+    (2, 4): [[0, 1, 2], [0, 2, 3]],
+    (3, 4): [[0, 1, 2, 3]],
+    (3, 8): [[0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6], [0, 5, 1, 6]],
+}
+
+FE_DIMENSION = {
+    ZoneType.FETriangle: 2,
+    ZoneType.FEQuad:     2,
+    ZoneType.FETetra:    3,
+    ZoneType.FEBrick:    3,
+}
+
+ProbeTable = collections.namedtuple('ProbeTable', [
+    'points',       # (m, dim) probe coordinates
+    'mode',         # 'nearest' or 'cell'
+    'zones',        # (m,) index of the zone sampled (-1: none)
+    'items',        # (m,) node (nearest) or cell (cell mode) index in the zone (-1: none)
+    'distance',     # (m,) distance to the node (nearest), 0 inside a cell, inf: none
+    'zone_names',   # [str] names of the zones of the dataset
+    'variables',    # [str] names of the sampled variables
+    'values',       # (m, num_vars) sampled values (NaN: none)
+])
+
+def _ordered_dims(zone):
+    return [d for d in zone.dimensions if d > 1]
+
+def zone_dimension(zone):
+    ''' Topological dimension of the cells of a zone (0 if it has none) '''
+    if zone.zone_type == ZoneType.Ordered:
+        return len(_ordered_dims(zone))
+    return FE_DIMENSION.get(zone.zone_type, 1 if zone.zone_type == ZoneType.FELineSeg else 0)
+
+def cell_nodes(zone, cells):
+    ''' (len(cells), nodes per cell) node indices of the listed cells '''
+    cells = np.asarray(cells, dtype=np.intp)
+    if zone.zone_type != ZoneType.Ordered:
+        return np.asarray(zone.connectivity[cells], dtype=np.intp)
+    dims = _ordered_dims(zone)
+    ni, nj = dims[0], dims[1]
+    i = cells % (ni - 1)
+    j = (cells // (ni - 1)) % (nj - 1)
+    base = i + ni * j
+    if len(dims) == 3:
+        base += ni * nj * (cells // ((ni - 1) * (nj - 1)))
+    quad = np.stack([base, base + 1, base + 1 + ni, base + ni], axis=-1)
+    if len(dims) == 2:
+        return quad
+    return np.concatenate([quad, quad + ni * nj], axis=-1)
+
+def cell_centres(zone, coords):
+    ''' (num_cells, dim) mean of the node coordinates of each cell '''
+    if zone.zone_type == ZoneType.Ordered:
+        dims = _ordered_dims(zone)
+        grid = coords.reshape(*dims[::-1], coords.shape[1])
+        corners = itertools.product([slice(None, -1), slice(1, None)], repeat=len(dims))
+        return (sum(grid[c] for c in corners) / 2**len(dims)).reshape(-1, coords.shape[1])
+    conn = zone.connectivity
+    return np.concatenate([
+        coords[np.asarray(conn[start:start+CELL_CHUNK], dtype=np.intp)].mean(axis=1)
+        for start in range(0, len(conn), CELL_CHUNK)
+    ] or [np.empty((0, coords.shape[1]))])
+
+def barycentric(vertices, points):
+    ''' Barycentric coordinates (..., dim+1) of points (..., dim) in
+        simplices (..., dim+1, dim); NaN for degenerate simplices
+    '''
+    edges = vertices[..., 1:, :] - vertices[..., :1, :]
+    r = points - vertices[..., 0, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if points.shape[-1] == 2:
+            a, b = edges[..., 0, :], edges[..., 1, :]
+            det = a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+            l1 = (r[..., 0] * b[..., 1] - r[..., 1] * b[..., 0]) / det
+            l2 = (a[..., 0] * r[..., 1] - a[..., 1] * r[..., 0]) / det
+            lam = np.stack([l1, l2], axis=-1)
+        else:
+            a, b, c = edges[..., 0, :], edges[..., 1, :], edges[..., 2, :]
+            bc = np.cross(b, c)
+            det = (a * bc).sum(axis=-1)
+            lam = np.stack([
+                (r * bc).sum(axis=-1),
+                (a * np.cross(r, c)).sum(axis=-1),
+                (a * np.cross(b, r)).sum(axis=-1),
+            ], axis=-1) / det[..., None]
+    return np.concatenate([1.0 - lam.sum(axis=-1, keepdims=True), lam], axis=-1)
+
+class ProbeIndex:
+    ''' Node coordinates and cell centres of the zones of a dataset
+
+        Arguments:
+            nodes           (num_nodes, dim) node coordinates of all zones
+            node_offsets    (num_zones+1,) start of each zone in nodes
+            centres         (num_cells, dim) cell centres of all zones, or
+                            None until add_cells() is called
+            cell_offsets    (num_zones+1,) start of each zone in centres
+    '''
+
+    def __init__(self, nodes, node_offsets, centres=None, cell_offsets=None):
+        self.nodes        = np.asarray(nodes, dtype=np.float64)
+        self.node_offsets = np.asarray(node_offsets, dtype=np.int64)
+        self.centres      = centres
+        self.cell_offsets = cell_offsets
+        self._trees       = {}
+
+    @property
+    def dim(self):
+        return self.nodes.shape[1]
+
+    @classmethod
+    def from_dataset(cls, dataset, dim):
+        ''' Index of the first dim variables of each zone as coordinates '''
+        nodes = [
+            np.column_stack([zone.values(v)[:] for v in range(dim)]).astype(np.float64)
+            for zone in dataset.zones()
+        ]
+        offsets = np.cumsum([0] + [len(n) for n in nodes])
+        return cls(np.concatenate(nodes or [np.empty((0, dim))]), offsets)
+
+    def zone_nodes(self, z):
+        return self.nodes[self.node_offsets[z]:self.node_offsets[z+1]]
+
+    def add_cells(self, dataset):
+        ''' Compute the centres of the cells of dimension dim; True if computed '''
+        if self.centres is not None:
+            return False
+        centres = []
+        for z, zone in enumerate(dataset.zones()):
+            if zone_dimension(zone) == self.dim:
+                centres.append(cell_centres(zone, self.zone_nodes(z)))
+            else:
+                centres.append(np.empty((0, self.dim)))
+        self.cell_offsets = np.cumsum([0] + [len(c) for c in centres])
+        self.centres = np.concatenate(centres or [np.empty((0, self.dim))])
+        return True
+
+    def tree(self, kind):
+        ''' PointTree over the nodes or cell centres (built on first use) '''
+        if kind not in self._trees:
+            points = self.nodes if kind == 'nodes' else self.centres
+            LOG.info('Build search tree over %d %s', len(points), kind)
+            self._trees[kind] = PointTree(points)
+        return self._trees[kind]
+
+    def save(self, path, key):
+        ''' Save the index arrays with key (atomically) '''
+        arrays = {'key': key, 'nodes': self.nodes, 'node_offsets': self.node_offsets}
+        if self.centres is not None:
+            arrays.update(centres=self.centres, cell_offsets=self.cell_offsets)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except:
+            os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path, key):
+        ''' Index saved with the same key; None if missing or out of date '''
+        try:
+            with np.load(path) as f:
+                if not np.array_equal(f['key'], key):
+                    LOG.info('Probe index %s is out of date', path)
+                    return None
+                centres = f['centres'] if 'centres' in f else None
+                offsets = f['cell_offsets'] if 'cell_offsets' in f else None
+                return cls(f['nodes'], f['node_offsets'], centres, offsets)
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            LOG.warning('Ignoring probe index %s (%s)', path, e)
+            return None
+
+def probe_index_path(filename):
+    ''' Path of the probe index saved next to a datafile '''
+    return filename + '.probe.npz'
+
+def load_probe_index(filename, dataset, dim, zones=None, *, cells=False):
+    ''' ProbeIndex of a datafile's dataset, from its saved index if valid
+
+        zones are the indices (in the datafile) of the zones of dataset;
+        the index is rebuilt and saved when they, dim, or the datafile
+        size/modification time change.
+    '''
+    path = probe_index_path(filename)
+    zones = range(dataset.num_zones) if zones is None else zones
+    key = np.concatenate([_file_stamp(filename), [dim], np.asarray(zones, dtype=np.int64)])
+    index = ProbeIndex.load(path, key)
+    changed = index is None
+    if changed:
+        index = ProbeIndex.from_dataset(dataset, dim)
+    else:
+        LOG.info('Use probe index %s', path)
+    if cells:
+        changed |= index.add_cells(dataset)
+    if changed:
+        try:
+            index.save(path, key)
+            LOG.info('Saved probe index %s', path)
+        except OSError as e:
+            LOG.warning('Cannot save probe index %s (%s)', path, e)
+    return index
+
+def _zone_of(offsets, items):
+    return np.searchsorted(offsets, items, side='right') - 1
+
+def find_cells(index, dataset, points, *, k=16, workers=1):
+    ''' Cells containing points, tested in order of their centre distance
+
+        Returns:
+            zones, cells    (m,) zone and cell index (-1: not found)
+            nodes, weights  (m, dim+1) simplex nodes and interpolation weights
+    '''
+    m, dim = points.shape
+    zones   = np.full(m, -1, dtype=np.intp)
+    cells   = np.full(m, -1, dtype=np.intp)
+    nodes   = np.zeros((m, dim + 1), dtype=np.intp)
+    weights = np.zeros((m, dim + 1))
+    tree = index.tree('cells')
+    if tree.n == 0:
+        return zones, cells, nodes, weights
+    dist, cand = tree.query(points, k, workers=workers)
+    probe, order = np.nonzero(cand < tree.n)
+    cand = cand[probe, order]
+    cand_zone = _zone_of(index.cell_offsets, cand)
+
+    # Test all probe/candidate pairs, one zone at a time
+    hits = []
+    for z in np.unique(cand_zone):
+        sel = np.flatnonzero(cand_zone == z)
+        zone = dataset.zone(int(z))
+        local = cand[sel] - index.cell_offsets[z]
+        corners = cell_nodes(zone, local)
+        snodes = corners[:, SIMPLICES[dim, corners.shape[1]]]      # (n, simplices, dim+1)
+        lam = barycentric(index.zone_nodes(z)[snodes], points[probe[sel], None, :])
+        inside = (lam >= -INSIDE_TOLERANCE).all(axis=-1)
+        hit = np.flatnonzero(inside.any(axis=1))
+        first = inside[hit].argmax(axis=1)
+        hits.append((sel[hit], np.full(len(hit), z), local[hit],
+                     snodes[hit, first], lam[hit, first]))
+    if not hits:
+        return zones, cells, nodes, weights
+
+    # Keep the hit of lowest rank (nearest centre) for each point
+    pair, hit_zone, hit_cell, hit_nodes, hit_weights = [np.concatenate(a) for a in zip(*hits)]
+    best = np.lexsort((order[pair], probe[pair]))
+    p, first = np.unique(probe[pair][best], return_index=True)
+    best = best[first]
+    zones[p], cells[p] = hit_zone[best], hit_cell[best]
+    nodes[p], weights[p] = hit_nodes[best], hit_weights[best]
+    return zones, cells, nodes, weights
+
+def probe_dataset(dataset, points, *, mode='nearest', index=None, k=16, workers=1):
+    ''' Sample a native Dataset at probe points
+
+        Arguments:
+            dataset     Dataset whose first dim variables are coordinates
+            points      (m, dim) probe coordinates (dim = 2 or 3)
+            mode        'nearest': values at the nearest node (cell-centered
+                        variables are NaN); 'cell': values linearly
+                        interpolated in the cell holding the probe
+            index       ProbeIndex of the dataset (def: built here)
+            k           Cells tested per probe in cell mode (def: 16)
+            workers     Number of threads used for the searches
+
+        Returns:
+            ProbeTable
+    '''
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] not in (2, 3):
+        raise ValueError('Probe points must be an (m, 2) or (m, 3) array')
+    m, dim = points.shape
+    if dataset.num_variables < dim:
+        raise FormatError(f'Dataset has fewer than {dim} (coordinate) variables')
+    if mode not in ('nearest', 'cell'):
+        raise ValueError(f'Unknown probe mode "{mode}"')
+    if index is None:
+        index = ProbeIndex.from_dataset(dataset, dim)
+    if mode == 'cell':
+        index.add_cells(dataset)
+
+    with timing.phase('compute'):
+        if mode == 'nearest':
+            dist, node = index.tree('nodes').query(points, 1, workers=workers)
+            dist, node = dist[:, 0], node[:, 0]
+            found = node < len(index.nodes)
+            zones = np.where(found, _zone_of(index.node_offsets, node), -1)
+            items = np.where(found, node - index.node_offsets[np.maximum(zones, 0)], -1)
+        else:
+            zones, items, nodes, weights = find_cells(index, dataset, points, k=k, workers=workers)
+            dist = np.where(zones >= 0, 0.0, np.inf)
+
+    variables = list(range(dim, dataset.num_variables))
+    values = np.full((m, len(variables)), np.nan)
+    for z in np.unique(zones[zones >= 0]):
+        zone = dataset.zone(int(z))
+        sel = np.flatnonzero(zones == z)
+        with timing.phase('compute', zone=zone.name):
+            for j, v in enumerate(variables):
+                data = zone.values(v)
+                if zone.location(v) == ValueLocation.CellCentered:
+                    if mode == 'cell':
+                        values[sel, j] = data[items[sel]]
+                elif mode == 'nearest':
+                    values[sel, j] = data[items[sel]]
+                else:
+                    values[sel, j] = (data[nodes[sel]] * weights[sel]).sum(axis=1)
+    LOG.info('Found %d of %d probes', np.count_nonzero(zones >= 0), m)
+    return ProbeTable(
+        points, mode, zones, items, dist,
+        [zone.name for zone in dataset.zones()],
+        [dataset.variable_names[v] for v in variables],
+        values,
+    )
+
+def read_points(filename):
+    ''' (m, dim) probe coordinates from a CSV or whitespace-separated file
+
+        Lines starting with # and a header line of column names are skipped.
+    '''
+    rows = []
+    with open(filename) as f:
+        for line in f:
+            words = line.split('#', 1)[0].replace(',', ' ').split()
+            if words:
+                rows.append(words)
+    try:
+        float(rows[0][0])
+    except ValueError:
+        rows = rows[1:]     # Header line
+    except IndexError:
+        raise ValueError(f'{filename} holds no probe points')
+    return np.array(rows, dtype=np.float64)
+
+def write_probes(filename, table):
+    ''' Write a ProbeTable as CSV (*.csv) or a tab-separated text table
+
+        One row per probe: the probe coordinates, the zone name, the
+        (zero-based) node or cell index, the distance and the values.
+    '''
+    coords = ['x', 'y', 'z'][:table.points.shape[1]]
+    item = 'node' if table.mode == 'nearest' else 'cell'
+    delimiter = ',' if os.path.splitext(filename)[1].lower() == '.csv' else '\t'
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(coords + ['zone', item, 'distance'] + table.variables)
+        for p in range(len(table.points)):
+            z = table.zones[p]
+            writer.writerow(
+                [repr(float(x)) for x in table.points[p]] +
+                [table.zone_names[z] if z >= 0 else '', int(table.items[p]),
+                 repr(float(table.distance[p]))] +
+                [repr(float(x)) for x in table.values[p]]
+            )
@@ -0,0 +1,122 @@
+''' Rewriting datafiles around unchanged data
+
+A rewritten file is described by a list of pieces: bytes objects hold new
+content and (start, end) tuples are byte ranges copied from the input
+file. Ranges are copied inside the kernel (copy_file_range, or sendfile)
+when the platform allows it, so the data never passes through Python.
+
+When the output is the input file and every copied range keeps its
+offset (e.g. a header rewritten with names of the same length), only the
+new bytes are written in place; otherwise the output is written to a
+temporary file that replaces the input when complete.
+'''
+import logging
+import os
+import tempfile
+
+LOG = logging.getLogger(__name__)
+
+# Bytes copied per system call, and per read when copying through Python
+COPY_CHUNK = 1<<30
+READ_CHUNK = 1<<24
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src, dst, count, offset)
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst, src, offset, count)
+
+# Kernel copy functions available on this platform, in order of preference
+KERNEL_COPIES = [
+    copy for name, copy in [('copy_file_range', _copy_file_range), ('sendfile', _sendfile)]
+    if hasattr(os, name)
+]
+
+def copy_range(fsrc, fdst, start, end):
+    ''' Append bytes [start, end) of file object fsrc to file object fdst '''
+    fdst.flush()
+    src, dst = fsrc.fileno(), fdst.fileno()
+    pos = start
+    for copy in KERNEL_COPIES:
+        try:
+            while pos < end:
+                n = copy(src, dst, pos, min(COPY_CHUNK, end - pos))
+                if n == 0:
+                    break
+                pos += n
+        except OSError as e:    # Not supported for these files
+            LOG.debug('%s failed (%s); falling back', copy.__name__, e)
+        if pos >= end:
+            break
+    fsrc.seek(pos)
+    while pos < end:
+        data = fsrc.read(min(READ_CHUNK, end - pos))
+        if not data:
+            raise EOFError(f'{fsrc.name} is shorter than expected')
+        fdst.write(data)
+        pos += len(data)
+    fdst.seek(0, os.SEEK_END)
+
+def _write_pieces(fsrc, fdst, pieces):
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            copy_range(fsrc, fdst, *piece)
+        else:
+            fdst.write(piece)
+
+def _merged(pieces):
+    ''' Pieces with adjacent ranges joined and empty pieces dropped '''
+    result = []
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            if piece[0] == piece[1]:
+                continue
+            if result and isinstance(result[-1], tuple) and result[-1][1] == piece[0]:
+                result[-1] = (result[-1][0], piece[1])
+                continue
+        elif not piece:
+            continue
+        result.append(piece)
+    return result
+
+def _in_place(pieces, size):
+    ''' True if pieces rebuild a file of size bytes with every range in place '''
+    pos = 0
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            if piece[0] != pos:
+                return False
+            pos = piece[1]
+        else:
+            pos += len(piece)
+    return pos == size
+
+def rewrite_file(filename_in, filename_out, pieces):
+    ''' Write filename_out from new bytes and ranges of filename_in '''
+    pieces = _merged(pieces)
+    same = os.path.exists(filename_out) and os.path.samefile(filename_in, filename_out)
+    if same and _in_place(pieces, os.path.getsize(filename_in)):
+        LOG.info('Rewrite %s in place', filename_in)
+        with open(filename_out, 'r+b') as f:
+            pos = 0
+            for piece in pieces:
+                if isinstance(piece, tuple):
+                    pos = piece[1]
+                else:
+                    f.seek(pos)
+                    f.write(piece)
+                    pos += len(piece)
+        return
+    if not same:
+        with open(filename_in, 'rb') as fsrc, open(filename_out, 'wb') as fdst:
+            _write_pieces(fsrc, fdst, pieces)
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename_out) or '.', suffix='.tmp')
+    try:
+        with open(filename_in, 'rb') as fsrc, os.fdopen(fd, 'wb') as fdst:
+            _write_pieces(fsrc, fdst, pieces)
+        os.chmod(tmp, os.stat(filename_in).st_mode & 0o777)
+        os.replace(tmp, filename_out)
+    except:
+        os.remove(tmp)
+        raise
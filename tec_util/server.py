@@ -0,0 +1,121 @@
+''' Warm-engine command server and its client
+
+`tec_util serve` starts a pool of worker processes, each with an
+initialized Tecplot engine, and listens on a Unix socket for command
+lines. When a server is running, `tec_util <cmd>` forwards its arguments,
+working directory and TEC_UTIL_* environment variables to the server
+instead of starting an engine of its own, and prints the output it gets
+back. Other environment variables are those of the server.
+
+Requests and responses are single lines of JSON:
+    request:    {"argv": [...], "cwd": "...", "env": {"TEC_UTIL_...": "..."}}
+    response:   {"ok": true, "elapsed": 0.1, "output": "..."}
+'''
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+from . import batch
+
+LOG = logging.getLogger(__name__)
+
+# Prefix of the environment variables forwarded with a command
+ENV_PREFIX = 'TEC_UTIL_'
+
+def socket_path():
+    ''' Path of the server socket ($TEC_UTIL_SOCKET or a per-user default) '''
+    default = os.path.join(tempfile.gettempdir(), 'tec_util-{}.sock'.format(os.getuid()))
+    return os.environ.get('TEC_UTIL_SOCKET', default)
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def is_running(path=None):
+    ''' True if a server is accepting connections on the socket '''
+    try:
+        _connect(path or socket_path()).close()
+        return True
+    except OSError:
+        return False
+
+def forward(argv, path=None):
+    ''' Run a command line on the server
+
+        Returns (ok, output), or None if no server is listening or it
+        fails to answer (e.g. it is stopped mid-command), in which case
+        the caller should run the command itself.
+    '''
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        sock = _connect(path)
+    except OSError:
+        return None
+    env = {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIX)}
+    try:
+        with sock, sock.makefile('rwb') as stream:
+            request = {'argv': list(argv), 'cwd': os.getcwd(), 'env': env}
+            stream.write(json.dumps(request).encode() + b'\n')
+            stream.flush()
+            response = json.loads(stream.readline())
+        return response['ok'], response['output']
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        LOG.warning('No answer from tec_util server on %s (%s); running locally', path, e)
+        return None
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        LOG.info('Run %s in %s', ' '.join(request['argv']), request['cwd'])
+        ok, elapsed, output = self.server.pool.apply(
+            batch.run_command, (request['argv'], request['cwd'], request.get('env'))
+        )
+        response = {'ok': ok, 'elapsed': elapsed, 'output': output}
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+def serve(path=None, workers=1):
+    ''' Serve tec_util commands on a Unix socket until interrupted
+
+        Arguments:
+            path        Socket path (def: socket_path())
+            workers     Number of worker processes (engines) to keep alive
+    '''
+    path = path or socket_path()
+    if is_running(path):
+        raise RuntimeError(f'A tec_util server is already listening on {path}')
+    if os.path.exists(path):
+        os.remove(path)   # Stale socket from a server that died
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers, batch.init_worker, (True,)) as pool:
+        old_umask = os.umask(0o077)
+        try:
+            server = _Server(path, _Handler)
+        finally:
+            os.umask(old_umask)
+        server.pool = pool
+        signal.signal(signal.SIGTERM, _terminate)
+        LOG.info('Listening on %s with %d worker(s)', path, workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(path)
@@ -0,0 +1,157 @@
+''' Native multi-plane slicing of surface zones
+
+Each surface zone is visited once. Signed distances of its nodes to a
+group of planes are computed with one matrix product, the cell edges
+that cross each plane are found from the signs, and the crossing points
+are interpolated linearly along those edges. Each crossing cell
+contributes a line segment (two for a saddle quad), so every slice is a
+FELineSeg zone whose nodes are shared between neighbouring segments.
+'''
+import logging
+import numpy as np
+from . import timing
+from .dataset import Dataset, FormatError, ValueLocation, Zone, ZoneType
+
+LOG = logging.getLogger(__name__)
+
+# Node distances (nodes x planes) evaluated at once
+DISTANCE_CHUNK = 1<<24
+
+def surface_cells(zone):
+    ''' (num_cells, nodes_per_cell) array of node indices of a surface zone '''
+    if zone.zone_type == ZoneType.Ordered:
+        dims = [d for d in zone.dimensions if d > 1]
+        if len(dims) != 2:
+            raise FormatError(f'Ordered zone "{zone.name}" is not a surface')
+        nodes = np.arange(zone.num_points).reshape(dims[1], dims[0])
+        return np.stack([
+            nodes[:-1, :-1], nodes[:-1, 1:], nodes[1:, 1:], nodes[1:, :-1],
+        ], axis=-1).reshape(-1, 4)
+    if zone.zone_type in (ZoneType.FETriangle, ZoneType.FEQuad):
+        return np.asarray(zone.connectivity)
+    raise FormatError(f'Zone "{zone.name}" ({zone.zone_type.name}) is not a surface zone')
+
+def cell_edges(cells):
+    ''' Unique edges (a, b) and the edge index of each cell side '''
+    sides = np.stack([cells, np.roll(cells, -1, axis=1)], axis=-1).reshape(-1, 2)
+    edges, side_edges = np.unique(np.sort(sides, axis=1), axis=0, return_inverse=True)
+    return edges, side_edges.reshape(cells.shape)
+
+class _SlicePieces:
+    ''' Nodes/segments/values of one slice, accumulated over zones '''
+    __slots__ = ('values', 'segments', 'num_points', 'locations')
+
+    def __init__(self, num_vars):
+        self.values     = [[] for v in range(num_vars)]
+        self.segments   = []
+        self.num_points = 0
+        self.locations  = None
+
+def _slice_zone(zone, planes, pieces, num_vars):
+    ''' Intersect one surface zone with planes [(index, origin, normal)] '''
+    cells = surface_cells(zone)
+    edges, side_edges = cell_edges(cells)
+    a, b = edges[:, 0], edges[:, 1]
+    coords = np.column_stack([zone.values(v)[:] for v in range(3)]).astype(np.float64)
+    locations = [zone.location(v) for v in range(num_vars)]
+    values = [np.asarray(zone.values(v)) for v in range(num_vars)]
+
+    # Cells on each edge (CSR layout), to visit only the cells a plane cuts
+    sides = side_edges.ravel()
+    side_order = np.argsort(sides, kind='stable')
+    edge_start = np.searchsorted(sides[side_order], np.arange(len(edges) + 1))
+
+    chunk = max(1, DISTANCE_CHUNK // max(len(coords), 1))
+    for start in range(0, len(planes), chunk):
+        group   = planes[start:start+chunk]
+        origins = np.array([p[1] for p in group], dtype=np.float64)
+        normals = np.array([p[2] for p in group], dtype=np.float64)
+        dist    = normals @ coords.T - (origins * normals).sum(axis=1)[:, None]
+        for (index, origin, normal), d in zip(group, dist):
+            above = d >= 0.0
+            crosses = above[a] != above[b]
+            crossing = np.flatnonzero(crosses)
+            if crossing.size == 0:
+                continue
+
+            # Cut cells; each contributes one segment per pair of cut sides
+            first, count = edge_start[crossing], np.diff(edge_start)[crossing]
+            offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            cut_cells = np.unique(side_order[np.repeat(first, count) + offsets] // cells.shape[1])
+            rows, cols = np.nonzero(crosses[side_edges[cut_cells]])
+            seg_edges = side_edges[cut_cells[rows], cols].reshape(-1, 2)
+            seg_cells = cut_cells[rows[::2]]
+
+            # One node per crossing edge, linearly interpolated
+            ea, eb = a[crossing], b[crossing]
+            t = d[ea] / (d[ea] - d[eb])
+            out = pieces[index]
+            if out.locations is None:
+                out.locations = locations
+            elif out.locations != locations:
+                raise FormatError(f'Variable locations of zone "{zone.name}" differ from other zones')
+            for v in range(num_vars):
+                if locations[v] == ValueLocation.Nodal:
+                    va = values[v][ea].astype(np.float64)
+                    vb = values[v][eb].astype(np.float64)
+                    vals = va + t * (vb - va)
+                else:
+                    vals = values[v][seg_cells]
+                out.values[v].append(vals.astype(np.result_type(values[v].dtype, np.float32)))
+            out.segments.append(np.searchsorted(crossing, seg_edges) + out.num_points)
+            out.num_points += crossing.size
+
+def slice_dataset(dataset, slices, *, boxes=None):
+    ''' Slice surface zones of a native Dataset with many planes at once
+
+        Arguments:
+            dataset     Dataset with surface zones (first 3 variables are
+                        the x,y,z coordinates)
+            slices      List of (name, origin, normal, zones) tuples, where
+                        zones is a list of zone indices or "all"
+            boxes       ZoneBoxes of the dataset; zones whose bounding box
+                        does not straddle a slice plane are skipped
+
+        Returns:
+            Dataset with one FELineSeg zone per slice that cuts the surface
+            (slices that miss all their zones are skipped with a warning)
+    '''
+    num_vars = dataset.num_variables
+    by_zone = {}
+    for index, (name, origin, normal, zones) in enumerate(slices):
+        if isinstance(zones, str):
+            if zones == "all":
+                zones = range(dataset.num_zones)
+            else:
+                raise RuntimeError("String '%s' is not a valid zone specifier" % zones)
+        if boxes is not None:
+            zones = np.asarray(zones, dtype=np.intp)
+            zones = zones[boxes.plane_mask(origin, normal, zones)].tolist()
+        for z in zones:
+            by_zone.setdefault(z, []).append((index, origin, normal))
+
+    if boxes is not None:
+        LOG.info("Bounding boxes culled %d of %d zone slices",
+                 boxes.counters['culled'], boxes.counters['tested'])
+
+    pieces = [_SlicePieces(num_vars) for s in slices]
+    for z, planes in sorted(by_zone.items()):
+        zone = dataset.zone(z)
+        LOG.info("Slice zone '%s' with %d planes", zone.name, len(planes))
+        with timing.phase('compute', zone=zone.name):
+            _slice_zone(zone, planes, pieces, num_vars)
+
+    result = Dataset(dataset.title, dataset.variable_names, dataset.aux_data)
+    for (name, *rest), out in zip(slices, pieces):
+        if not out.segments:
+            LOG.warning("Slice '%s' does not intersect any zone; skipped", name)
+            continue
+        segments = np.concatenate(out.segments).astype(np.int32)
+        values = [np.concatenate(v) for v in out.values]
+        LOG.info("Extract slice '%s'", name)
+        result.add_zone(Zone(
+            name, ZoneType.FELineSeg, (out.num_points, len(segments)), values,
+            connectivity = segments,
+            locations    = out.locations if any(out.locations) else None,
+        ))
+    return result
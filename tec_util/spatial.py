@@ -0,0 +1,221 @@
+''' Spatial search structures for native (engine-free) operations
+
+PointTree wraps scipy.spatial.cKDTree when SciPy is installed. Without
+SciPy, queries fall back to a chunked brute-force search in NumPy, which
+gives identical results but scales with (query points x tree points) and
+is only practical for small datasets.
+
+ZoneBoxes holds the axis-aligned bounding box of each zone, so slicing
+and interpolation can skip zones that cannot contribute before touching
+their data. Boxes come from the stored variable ranges of PLT files when
+available and are saved next to the datafile for reuse.
+'''
+import collections
+import logging
+import math
+import numpy as np
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+LOG = logging.getLogger(__name__)
+
+# import scipy.spatial  (deferred to PointTree() to minimize load time)
+
+# Distance matrix entries evaluated at once by the brute-force fallback
+BRUTE_FORCE_CHUNK = 1<<22
+
+_warned_brute_force = False
+
+def kdtree_class():
+    ''' scipy.spatial.cKDTree, or None (with a warning, once) without SciPy '''
+    global _warned_brute_force
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        if not _warned_brute_force:
+            LOG.warning('SciPy not available; using slow brute-force nearest neighbour search')
+            _warned_brute_force = True
+        return None
+    return cKDTree
+
+class PointTree:
+    ''' k-nearest-neighbour search over a fixed set of points
+
+        Arguments:
+            points      (n, dim) array of point coordinates
+            leafsize    Points per leaf of the k-d tree (SciPy only)
+    '''
+
+    def __init__(self, points, leafsize=16):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        if self.points.ndim != 2:
+            raise ValueError('points must be an (n, dim) array')
+        self.n = len(self.points)
+        cKDTree = kdtree_class()
+        if cKDTree is not None:
+            self._tree = cKDTree(self.points, leafsize=leafsize)
+        else:
+            self._tree = None
+
+    def query(self, points, k=1, *, radius=math.inf, workers=1):
+        ''' Find the k nearest tree points to each query point
+
+            Arguments:
+                points      (m, dim) array of query points
+                k           Number of neighbours to find
+                radius      Ignore tree points farther than radius
+                workers     Number of threads used for the search
+
+            Returns:
+                dist, index     (m, k) arrays sorted by distance. Missing
+                                neighbours (fewer than k points, or none
+                                within radius) have dist=inf, index=n.
+        '''
+        points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, self.points.shape[1])
+        k = int(k)
+        if self._tree is not None:
+            dist, index = self._tree.query(
+                points, k=[*range(1, k+1)], distance_upper_bound=radius, workers=workers,
+            )
+            return dist, index
+        dist  = np.full((len(points), k), np.inf)
+        index = np.full((len(points), k), self.n, dtype=np.intp)
+        if self.n == 0:
+            return dist, index
+        chunk = max(1, BRUTE_FORCE_CHUNK // self.n)
+        def search(start):
+            stop = min(start + chunk, len(points))
+            d2 = ((points[start:stop, None, :] - self.points[None, :, :])**2).sum(axis=-1)
+            kk = min(k, self.n)
+            part = np.argpartition(d2, kk-1, axis=1)[:, :kk]
+            pd2 = np.take_along_axis(d2, part, axis=1)
+            order = np.argsort(pd2, axis=1, kind='stable')
+            d = np.sqrt(np.take_along_axis(pd2, order, axis=1))
+            i = np.take_along_axis(part, order, axis=1)
+            outside = d > radius
+            d[outside] = np.inf
+            i[outside] = self.n
+            dist[start:stop, :kk] = d
+            index[start:stop, :kk] = i
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            list(pool.map(search, range(0, len(points), chunk)))
+        return dist, index
+
+class ZoneBoxes:
+    ''' Axis-aligned bounding boxes of the zones of a dataset
+
+        Arguments:
+            lower, upper    (num_zones, 3) arrays of box corners
+            num_points      Number of points in each zone
+
+        Zone tests are counted in the counters attribute ("tested" and
+        "culled" zones), so callers can report how much work was skipped.
+    '''
+
+    def __init__(self, lower, upper, num_points):
+        self.lower = np.asarray(lower, dtype=np.float64).reshape(-1, 3)
+        self.upper = np.asarray(upper, dtype=np.float64).reshape(-1, 3)
+        self.num_points = np.asarray(num_points, dtype=np.int64)
+        self.counters = collections.Counter()
+
+    def __len__(self):
+        return len(self.lower)
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        ''' Boxes of the x,y,z (first three) variables of each zone '''
+        lower = np.full((dataset.num_zones, 3), np.inf)
+        upper = np.full((dataset.num_zones, 3), -np.inf)
+        num_points = np.zeros(dataset.num_zones, dtype=np.int64)
+        for z, zone in enumerate(dataset.zones()):
+            num_points[z] = zone.num_points
+            ranges = getattr(zone, 'ranges', None)
+            for v in range(3):
+                if ranges is not None and ranges[v] is not None:
+                    lower[z, v], upper[z, v] = ranges[v]
+                else:
+                    values = np.asarray(zone.values(v)[:], dtype=np.float64)
+                    if np.isfinite(values).any():
+                        lower[z, v], upper[z, v] = np.nanmin(values), np.nanmax(values)
+        return cls(lower, upper, num_points)
+
+    def _count(self, keep):
+        self.counters['tested'] += keep.size
+        self.counters['culled'] += keep.size - int(np.count_nonzero(keep))
+        return keep
+
+    def plane_mask(self, origin, normal, zones=None):
+        ''' Mask of zone boxes (all, or those listed in zones) that
+            straddle the plane through origin with the given normal
+        '''
+        zones = slice(None) if zones is None else np.asarray(zones, dtype=np.intp)
+        lower, upper = self.lower[zones], self.upper[zones]
+        normal = np.asarray(normal, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            dist = (0.5 * (lower + upper) - origin) @ normal
+            reach = (0.5 * (upper - lower)) @ np.abs(normal)
+        return self._count(np.abs(dist) <= reach)
+
+    def box_distances(self, lower, upper):
+        ''' Min and max distance from points in a box to points in each zone box '''
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            gap = np.maximum(0.0, np.maximum(self.lower - upper, lower - self.upper))
+            span = np.maximum(np.abs(self.upper - lower), np.abs(upper - self.lower))
+        return np.sqrt((gap**2).sum(axis=1)), np.sqrt((span**2).sum(axis=1))
+
+    def near_mask(self, lower, upper, *, k=1, radius=math.inf):
+        ''' Mask of zones that may hold one of the k nearest points (within
+            radius) of any point in the box [lower, upper]
+
+            Zones are sorted by their farthest distance to the box; once
+            they hold k points, any zone whose nearest distance is beyond
+            that bound cannot contribute.
+        '''
+        near, far = self.box_distances(lower, upper)
+        order = np.argsort(far, kind='stable')
+        enough = np.searchsorted(np.cumsum(self.num_points[order]), k)
+        bound = far[order[enough]] if enough < len(order) else math.inf
+        return self._count(near <= min(bound, radius))
+
+def zone_boxes_path(filename):
+    ''' Path of the bounding box index saved next to a datafile '''
+    return filename + '.zones.npz'
+
+def _file_stamp(filename):
+    st = os.stat(filename)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+def load_zone_boxes(filename, dataset):
+    ''' Bounding boxes of a datafile's zones, from its saved index if valid
+
+        The index is rebuilt (and saved, if possible) when it is missing or
+        the datafile size/modification time or zone count has changed.
+    '''
+    path = zone_boxes_path(filename)
+    stamp = _file_stamp(filename)
+    try:
+        with np.load(path) as f:
+            if np.array_equal(f['stamp'], stamp) and len(f['lower']) == dataset.num_zones:
+                LOG.debug('Load zone bounding boxes from %s', path)
+                return ZoneBoxes(f['lower'], f['upper'], f['num_points'])
+    except (OSError, KeyError, ValueError):
+        pass
+    boxes = ZoneBoxes.from_dataset(dataset)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, stamp=stamp, lower=boxes.lower, upper=boxes.upper,
+                         num_points=boxes.num_points)
+            os.chmod(tmp, os.stat(filename).st_mode & 0o666)
+            os.replace(tmp, path)
+        except:
+            os.remove(tmp)
+            raise
+        LOG.debug('Saved zone bounding boxes to %s', path)
+    except OSError as e:
+        LOG.debug('Cannot save zone bounding boxes to %s (%s)', path, e)
+    return boxes
@@ -0,0 +1,139 @@
+''' Sidecar statistics index
+
+The index of a datafile is a small JSON file next to it
+(<datafile>.stats.json) that holds the dataset metadata (title, variable
+names, zone types/dimensions/strands/times/locations) and the ZoneStats
+of every variable in every zone. It is valid while the size, modification
+time and content hash of the datafile are unchanged; the hash covers the
+first and last HASH_BLOCK bytes, so checking it costs two small reads.
+
+index_dataset() turns an index back into a Dataset of value-less zones,
+with variable ranges set from the statistics, so variable/zone patterns
+can be matched and dataset info printed without opening the datafile.
+'''
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from .dataset import Dataset, ValueLocation, Zone, ZoneType
+from .stats import ZoneStats, zone_statistics
+
+LOG = logging.getLogger(__name__)
+
+VERSION = 1
+HASH_BLOCK = 1<<20
+
+def index_path(filename):
+    ''' Path of the statistics index saved next to a datafile '''
+    return filename + '.stats.json'
+
+def file_key(filename):
+    ''' Size, modification time and content hash identifying a datafile '''
+    st = os.stat(filename)
+    digest = hashlib.sha1(b'%d' % st.st_size)
+    with open(filename, 'rb') as f:
+        digest.update(f.read(HASH_BLOCK))
+        if st.st_size > HASH_BLOCK:
+            f.seek(max(HASH_BLOCK, st.st_size - HASH_BLOCK))
+            digest.update(f.read(HASH_BLOCK))
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest.hexdigest()}
+
+def _location(zone, var):
+    if hasattr(zone, 'location'):
+        return int(zone.location(var))
+    return int(ValueLocation[zone.values(var).location.name])     # PyTecplot zone
+
+def build_index(filename, dataset):
+    ''' Scan a loaded dataset (native or PyTecplot) and build its index '''
+    key = file_key(filename)
+    zones = []
+    for zone in dataset.zones():
+        zone_type = ZoneType[zone.zone_type.name]
+        if zone_type == ZoneType.Ordered:
+            dimensions = list(zone.dimensions)
+        else:
+            dimensions = [zone.num_points, zone.num_elements]
+        zones.append({
+            'name':          zone.name,
+            'zone_type':     zone_type.name,
+            'dimensions':    dimensions,
+            'strand':        zone.strand,
+            'solution_time': zone.solution_time,
+            'locations':     [_location(zone, v) for v in range(dataset.num_variables)],
+            'stats':         [
+                list(zone_statistics(zone.name, zone.values(v))[1:])
+                for v in range(dataset.num_variables)
+            ],
+        })
+    return {
+        'version':   VERSION,
+        'file':      key,
+        'title':     dataset.title,
+        'variables': [v.name for v in dataset.variables()],
+        'zones':     zones,
+    }
+
+def load_index(filename):
+    ''' Index of a datafile if one is saved and still valid, else None '''
+    path = index_path(filename)
+    try:
+        with open(path) as f:
+            index = json.load(f)
+        if index.get('version') == VERSION and index['file'] == file_key(filename):
+            LOG.info('Use statistics index %s', path)
+            return index
+        LOG.info('Statistics index %s is out of date', path)
+    except FileNotFoundError:
+        pass
+    except (OSError, KeyError, ValueError) as e:
+        LOG.warning('Ignoring statistics index %s (%s)', path, e)
+    return None
+
+def save_index(filename, index):
+    ''' Save the index of a datafile next to it (atomically) '''
+    path = index_path(filename)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.chmod(tmp, os.stat(filename).st_mode & 0o666)  # Readable like the datafile
+        os.replace(tmp, path)
+    except:
+        os.remove(tmp)
+        raise
+    LOG.info('Saved statistics index %s', path)
+
+def update_index(filename, dataset):
+    ''' Build and save the index of a loaded dataset; returns the index
+
+        Failure to save (e.g. a read-only directory) is logged and ignored.
+    '''
+    index = build_index(filename, dataset)
+    try:
+        save_index(filename, index)
+    except OSError as e:
+        LOG.warning('Cannot save statistics index for %s (%s)', filename, e)
+    return index
+
+def index_dataset(index):
+    ''' Dataset of value-less zones described by an index
+
+        Zone ranges hold the (finite) min/max of each variable.
+    '''
+    dataset = Dataset(index['title'], index['variables'])
+    for z in index['zones']:
+        dataset.add_zone(Zone(
+            z['name'], ZoneType[z['zone_type']], z['dimensions'],
+            values        = [None] * len(index['variables']),
+            strand        = z['strand'],
+            solution_time = z['solution_time'],
+            locations     = [ValueLocation(v) for v in z['locations']],
+            ranges        = [(s[1], s[0]) for s in z['stats']],
+        ))
+    return dataset
+
+def index_stats(index, var, zone):
+    ''' ZoneStats of a variable (index) in a zone (index) '''
+    z = index['zones'][zone]
+    return ZoneStats(z['name'], *z['stats'][var])
@@ -0,0 +1,84 @@
+''' Vectorized single-pass statistics for zone data
+
+Values are reduced in fixed-size chunks with float64 accumulation, so
+memory use is bounded by the chunk size no matter how large the zone is.
+Chunk results are merged with the parallel mean/variance update of Chan
+et al., which keeps the standard deviation accurate without a second pass.
+'''
+import collections
+import numpy as np
+
+CHUNK_SIZE = 1<<20
+
+ZoneStats = collections.namedtuple(
+    'ZoneStats', ['name', 'max', 'min', 'mean', 'std', 'num_nan', 'num_inf']
+)
+ZoneStats.__doc__ = ''' Statistics of one variable in one zone
+
+    max/min/mean/std are computed over finite values only; NaN and Inf
+    values are counted in num_nan/num_inf. If a zone has no finite values,
+    max/min/mean/std are all NaN.
+'''
+
+class Accumulator:
+    ''' Running min/max/mean/variance of a stream of value chunks '''
+    __slots__ = ('count', 'min', 'max', 'mean', 'm2', 'num_nan', 'num_inf')
+
+    def __init__(self):
+        self.count   = 0
+        self.min     = np.inf
+        self.max     = -np.inf
+        self.mean    = 0.0
+        self.m2      = 0.0
+        self.num_nan = 0
+        self.num_inf = 0
+
+    def add(self, values):
+        ''' Accumulate an array of values '''
+        chunk = np.asarray(values, dtype=np.float64).ravel()
+        if chunk.size == 0:
+            return
+        finite = np.isfinite(chunk)
+        if not finite.all():
+            nan = np.isnan(chunk)
+            self.num_nan += int(np.count_nonzero(nan))
+            self.num_inf += int(chunk.size - np.count_nonzero(finite | nan))
+            chunk = chunk[finite]
+            if chunk.size == 0:
+                return
+        n     = chunk.size
+        mean  = chunk.mean()
+        dev   = chunk - mean
+        m2    = float(np.dot(dev, dev))
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean  += delta * n / total
+        self.m2    += m2 + delta * delta * self.count * n / total
+        self.count  = total
+        self.min    = min(self.min, float(chunk.min()))
+        self.max    = max(self.max, float(chunk.max()))
+
+    def result(self, name):
+        ''' ZoneStats for the values accumulated so far '''
+        if self.count == 0:
+            return ZoneStats(name, np.nan, np.nan, np.nan, np.nan, self.num_nan, self.num_inf)
+        return ZoneStats(
+            name, self.max, self.min, float(self.mean),
+            float(np.sqrt(self.m2 / self.count)), self.num_nan, self.num_inf,
+        )
+
+def zone_statistics(name, values, *, chunk_size=CHUNK_SIZE):
+    ''' Compute ZoneStats for an array of values in one chunked pass
+
+    Arguments:
+        name        [str] Zone name stored in the result
+        values      [array] NumPy array, memory map, or tecplot.data.Array
+        chunk_size  [int] Number of values converted to float64 at a time
+
+    Returns:
+        stats       [ZoneStats] max/min/mean/std and NaN/Inf counts
+    '''
+    acc = Accumulator()
+    for start in range(0, len(values), chunk_size):
+        acc.add(values[start:start+chunk_size])
+    return acc.result(name)
@@ -0,0 +1,156 @@
+''' Per-phase timing instrumentation
+
+Code marks phases of work with
+
+    with timing.phase('load', file=filename):
+        ...
+
+Phases are named after the step they cover: "engine" (Tecplot engine
+startup), "load", "select", "compute" and "write"; per-zone work is
+tagged with a zone argument. Unless a Profiler is active, phase() returns
+a shared no-op context manager, so the instrumentation costs one function
+call per phase.
+
+With profiling(report, trace), each phase records its start, wall time,
+process CPU time and two memory measures from getrusage's ru_maxrss:
+
+  - peak_rss:   the process's peak resident set size so far, read at the
+                end of the phase (a high-water mark over the whole run)
+  - rss_growth: how much the phase raised that peak, i.e. memory it
+                needed beyond what earlier phases had already used
+
+Growth is measured per process, so phases running concurrently in other
+threads (or nested phases) can share the same increase. The report is a
+JSON file with per-phase totals and the list of events; trace is a
+Chrome trace-event file (open in chrome://tracing or Perfetto).
+'''
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+def peak_rss():
+    ''' Peak resident set size of the process in bytes (None if unknown) '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+class Profiler:
+    ''' Collects timed phase events '''
+
+    def __init__(self):
+        self.events = []
+        self.origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name, **args):
+        start = time.perf_counter()
+        cpu = time.process_time()
+        rss = peak_rss()
+        try:
+            yield
+        finally:
+            end_rss = peak_rss()
+            self.events.append({
+                'name':       name,
+                'start':      start - self.origin,
+                'wall':       time.perf_counter() - start,
+                'cpu':        time.process_time() - cpu,
+                'peak_rss':   end_rss,
+                'rss_growth': None if rss is None else end_rss - rss,
+                'thread':     threading.get_ident(),
+                'args':       {k: str(v) for k, v in args.items()},
+            })
+
+    def summary(self):
+        ''' {phase: {count, wall, cpu, peak_rss, rss_growth}} totals over all events
+
+            peak_rss and rss_growth are the largest over the events.
+            Nested phases of the same name (e.g. a per-zone "compute"
+            inside a whole-dataset "compute") are both counted.
+        '''
+        totals = collections.OrderedDict()
+        for event in sorted(self.events, key=lambda e: e['start']):
+            total = totals.setdefault(event['name'], {
+                'count': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss': None, 'rss_growth': None,
+            })
+            total['count'] += 1
+            total['wall']  += event['wall']
+            total['cpu']   += event['cpu']
+            for key in ['peak_rss', 'rss_growth']:
+                if event[key] is not None:
+                    total[key] = max(total[key] or 0, event[key])
+        return totals
+
+    def report(self):
+        return {
+            'total':  time.perf_counter() - self.origin,
+            'phases': self.summary(),
+            'events': sorted(self.events, key=lambda e: e['start']),
+        }
+
+    def trace(self):
+        ''' Events in the Chrome trace-event format (complete events) '''
+        pid = os.getpid()
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [{
+                'name': e['name'],
+                'cat':  e['name'],
+                'ph':   'X',
+                'ts':   e['start'] * 1e6,
+                'dur':  e['wall'] * 1e6,
+                'pid':  pid,
+                'tid':  e['thread'],
+                'args': {**e['args'], 'cpu': e['cpu'], 'peak_rss': e['peak_rss'],
+                         'rss_growth': e['rss_growth']},
+            } for e in self.events],
+        }
+
+_active = None
+_disabled = contextlib.nullcontext()
+
+def phase(name, **args):
+    ''' Context manager timing a phase of work (no-op unless profiling) '''
+    if _active is None:
+        return _disabled
+    return _active.phase(name, **args)
+
+def _write_json(filename, data):
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=1)
+
+@contextlib.contextmanager
+def profiling(report=None, trace=None):
+    ''' Profile the tec_util calls made within the context
+
+        Arguments:
+            report      Path of the JSON report written on exit (optional)
+            trace       Path of the Chrome trace-event file written on exit
+                        (optional)
+
+        Yields the Profiler, whose events/summary() can also be used
+        directly. Profiling is process-wide; contexts do not nest.
+    '''
+    global _active
+    if _active is not None:
+        raise RuntimeError('Profiling is already active')
+    profiler = _active = Profiler()
+    try:
+        with profiler.phase('total'):
+            yield profiler
+    finally:
+        _active = None
+        if report:
+            _write_json(report, profiler.report())
+        if trace:
+            _write_json(trace, profiler.trace())
@@ -0,0 +1,44 @@
+import numpy as np
+import tec_util
+import test
+import unittest
+from benchmarks import suite, synthetic
+from tec_util.dataset import ZoneType
+
+class TestSynthetic(unittest.TestCase):
+    ''' Unit tests for the synthetic dataset generator '''
+
+    def test_kinds(self):
+        ''' Ordered, FE and axisymmetric datasets have the requested shape '''
+        ordered = synthetic.make_dataset('ordered', 3, 100, 6)
+        self.assertEqual(ordered.num_zones, 3)
+        self.assertEqual(ordered.variable_names, ['x', 'y', 'z', 'q1', 'q2', 'q3'])
+        self.assertEqual(ordered.zone(0).dimensions, (10, 10, 1))
+        fe = synthetic.make_dataset('fe', 2, 100, 4)
+        self.assertEqual(fe.zone(1).zone_type, ZoneType.FEQuad)
+        self.assertEqual(fe.zone(1).connectivity.shape, (81, 4))
+        self.assertTrue(np.array_equal(fe.zone(1).values('q1'), ordered.zone(1).values('q1')))
+        axi = synthetic.make_dataset('axi', 1, 100, 4)
+        self.assertEqual(axi.variable_names, ['x', 'y', 'q1', 'q2'])
+
+    def test_write(self):
+        ''' Synthetic datasets round-trip through the native writer/reader '''
+        with test.temp_workspace():
+            synthetic.write_synthetic('fe.plt', 'fe', 2, 50, 4, seed=3)
+            ds = tec_util.read_plt('fe.plt')
+            self.assertEqual(ds.num_zones, 2)
+            self.assertEqual(ds.zone(0).zone_type, ZoneType.FEQuad)
+
+class TestCompare(unittest.TestCase):
+    ''' Unit tests for comparing results against a baseline '''
+
+    def test_regressions(self):
+        ''' Slowdowns/memory growth beyond the tolerance are flagged '''
+        case = {'op': 'diff', 'size': 'small', 'kind': 'ordered', 'native': True}
+        base = [{**case, 'wall': 1.0, 'peak_rss': 100}]
+        report = suite.compare([{**case, 'wall': 1.1, 'peak_rss': 100}], base)
+        self.assertEqual(report[0][2], [])
+        report = suite.compare([{**case, 'wall': 1.5, 'peak_rss': 200}], base)
+        self.assertEqual(report[0][2], ['time +50%', 'memory +100%'])
+        other = {**case, 'size': 'large', 'wall': 9.0, 'peak_rss': 100}
+        self.assertEqual(suite.compare([other], base), [])
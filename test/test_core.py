@@ -1,4 +1,5 @@
 import math
+import numpy as np
 import tecplot as tp
 import tecplot.constant as tpc
 import tec_util
@@ -81,6 +82,38 @@ class TestDifferenceDatasets(unittest.TestCase):
             self.assertTrue(ds.zone(1).name.endswith(":4"))
             self.assertTrue(ds.zone(2).name.endswith(":6"))
 
+    def test_max_memory(self):
+        ''' Chunked differencing gives the same result as a single pass '''
+        with test.temp_workspace():
+            for name, max_memory in [("diff1.dat", 32*7), ("diff2.dat", tec_util.MAX_MEMORY)]:
+                tec_util.difference_datasets(
+                    test.data_item_path("sphere.dat"),
+                    test.data_item_path("cube.dat"),
+                    name,
+                    nskip=1,
+                    max_memory=max_memory,
+                )
+            ds1 = load_and_replace("diff1.dat")
+            vals1 = [ds1.zone(i).values("delta_z")[:] for i in range(ds1.num_zones)]
+            ds2 = load_and_replace("diff2.dat")
+            vals2 = [ds2.zone(i).values("delta_z")[:] for i in range(ds2.num_zones)]
+            for v1, v2 in zip(vals1, vals2):
+                self.assertEqual(list(v1), list(v2))
+
+    def test_integer_values(self):
+        ''' Deltas of integer variables are signed floats, even in tiny chunks '''
+        datasets = []
+        for values in [[1, 2, 3], [5, 1, 3]]:
+            ds = tec_util.Dataset('ints', ['x', 'n'])
+            zone = ds.add_ordered_zone('line', (3,))
+            zone.set_values('n', np.array(values, dtype=np.uint8))
+            datasets.append(ds)
+        for max_memory in [1, tec_util.MAX_MEMORY]:
+            delta = tec_util.difference_datasets(*datasets, None, nskip=1, max_memory=max_memory)
+            values = delta.zone(0).values('delta_n')
+            self.assertEqual(values.dtype, np.float32)
+            self.assertEqual(values.tolist(), [-4.0, 1.0, 0.0])
+
 class TestExtract(unittest.TestCase):
     ''' Unit tests for extract function '''
 
@@ -99,6 +132,24 @@ class TestExtract(unittest.TestCase):
             self.assertEqual(ds.num_variables,2)
             self.assertEqual(ds.num_zones,3)
 
+    def test_header_selection(self):
+        zones, variables = tec_util.header_selection(
+            test.data_item_path("sphere.dat"),
+            select_vars=['y'], select_zones=['*:[246]'], keep_vars=1,
+        )
+        self.assertEqual(zones, [1, 3, 5])
+        self.assertEqual(variables, [0, 1])
+
+    def test_empty_selection(self):
+        ''' Patterns matching nothing load nothing, with or without the engine '''
+        path = test.data_item_path("sphere.dat")
+        zones, variables = tec_util.header_selection(path, select_zones=['nomatch'])
+        self.assertEqual(zones, [])
+        for native in [True, False]:
+            with tec_util.open_dataset(path, native=native, zones=zones, variables=variables) as ds:
+                self.assertEqual(ds.num_zones, 0)
+                self.assertEqual(ds.num_variables, 3)
+
 class TestMergeDatasets(unittest.TestCase):
     ''' Unit tests for merge_datasets fucntion '''
 
@@ -117,6 +168,43 @@ class TestMergeDatasets(unittest.TestCase):
             # When variable in both dataset, values from dataset2 is used.
             self.assertAlmostEqual(-6.4280895E-05, ds.zone('ZoneA').values('x')[15])
 
+    def test_merge_datafiles(self):
+        ''' N-way native merge writes identical variables once '''
+        with test.temp_workspace():
+            tec_util.merge_datafiles(
+                [test.data_item_path("merge1.dat"), test.data_item_path("merge2.dat")],
+                "merge12.plt",
+                warn_duplicates=False,
+            )
+            tec_util.merge_datafiles(
+                [
+                    test.data_item_path("merge1.dat"),
+                    "merge12.plt",
+                    test.data_item_path("merge2.dat"),
+                ],
+                "merge.plt",
+            )
+            ds = tec_util.read_plt("merge.plt")
+            self.assertEqual(ds.variable_names, ['x', 'p1', 'T1', 'p2', 'T2'])
+            self.assertEqual(ds.num_zones, 2)
+            self.assertAlmostEqual(-6.4280895E-05, ds.zone('ZoneA').values('x')[15])
+
+class TestInMemory(unittest.TestCase):
+    ''' Chaining API functions with in-memory datasets '''
+
+    def test_chain(self):
+        with test.temp_workspace():
+            ds = tec_util.extract(test.data_item_path("cube.dat"), None, select_zones=['*:[12]'])
+            self.assertIsInstance(ds, tec_util.Dataset)
+            self.assertEqual(ds.num_zones, 2)
+            renamed = tec_util.rename_variables(ds, None, {"x": "xx"})
+            self.assertEqual(ds.variable(0).name, "x")
+            delta = tec_util.difference_datasets(renamed, ds, None, nskip=1)
+            self.assertEqual(delta.variable_names, ['xx', 'delta_y', 'delta_z'])
+            self.assertEqual(np.abs(delta.zone(1).values('delta_z')).max(), 0.0)
+            tec_util.write_dataset("chain.plt", delta)
+            self.assertEqual(tec_util.read_plt("chain.plt").num_zones, 2)
+
 class TestRenameVariables(unittest.TestCase):
     ''' Unit test for the rename_variables function '''
 
@@ -261,6 +349,18 @@ class TestRevolveDataset(unittest.TestCase):
                 ds.zone(0).values('z').minmax()
             )
 
+    def test_revolve_values(self):
+        ''' Check the broadcast revolve kernel against a per-plane loop '''
+        values = np.array([1.0, 2.0, 3.0], dtype=np.float32)
+        factors = np.cos(np.linspace(0.0, np.pi, 5))
+        tiled = tec_util.revolve_values(values, 5)
+        scaled = tec_util.revolve_values(values, 5, factors)
+        self.assertEqual(tiled.shape, (5, 3))
+        self.assertEqual(scaled.dtype, np.float32)
+        for k in range(5):
+            self.assertEqual(list(tiled[k]), list(values))
+            self.assertTrue(np.allclose(scaled[k], values * factors[k]))
+
 class TestInterpolate(unittest.TestCase):
     ''' Unit test for the interpolate_datasets function '''
 
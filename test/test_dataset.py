@@ -0,0 +1,65 @@
+import numpy as np
+import unittest
+from tec_util.dataset import Dataset, DatasetWriter, ValueLocation, ZoneType
+
+def triangles():
+    ''' Two-zone dataset: an ordered line and a cell-centered FE triangle '''
+    ds = Dataset('tri', ['x', 'y', 'p'], {'source': 'test'})
+    line = ds.add_ordered_zone('line', (3,))
+    line.set_values('x', np.array([0.0, 1.0, 2.0]))
+    tri = ds.add_fe_zone(
+        ZoneType.FETriangle, 'tri', 3, 1,
+        connectivity = np.array([[0, 1, 2]]),
+        locations    = [ValueLocation.Nodal, ValueLocation.Nodal, ValueLocation.CellCentered],
+    )
+    tri.set_values('p', np.array([5.0]))
+    return ds
+
+class TestSubset(unittest.TestCase):
+    ''' Unit tests for Dataset.subset '''
+
+    def test_subset(self):
+        ''' Subsets share arrays but not names or metadata '''
+        ds = triangles()
+        sub = ds.subset(zones=[1], variables=[2, 0])
+        self.assertEqual(sub.variable_names, ['p', 'x'])
+        self.assertEqual(sub.aux_data, {'source': 'test'})
+        zone = sub.zone(0)
+        self.assertEqual(zone.name, 'tri')
+        self.assertEqual(zone.location('p'), ValueLocation.CellCentered)
+        self.assertIs(zone.values('p'), ds.zone('tri').values('p'))
+        self.assertIs(zone.connectivity, ds.zone('tri').connectivity)
+        zone.name = 'renamed'
+        sub.variable('x').name = 'X'
+        self.assertEqual(ds.zone(1).name, 'tri')
+        self.assertEqual(ds.variable_names, ['x', 'y', 'p'])
+
+class TestDatasetWriter(unittest.TestCase):
+    ''' Unit tests for the in-memory writer '''
+
+    def test_write(self):
+        ''' Zones written in pieces or whole end up in writer.dataset '''
+        ds = triangles()
+        headers = [z.header() for z in ds.zones()]
+        with DatasetWriter(ds.title, ds.variable_names, headers, ds.aux_data) as writer:
+            writer.begin_zone([np.float64, np.float32, np.float32])
+            writer.write_values(0, [0.0, 1.0])
+            writer.write_values(0, [2.0])
+            writer.write_values(1, np.zeros(3))
+            writer.write_values(2, np.ones(3))
+            writer.end_zone()
+            tri = ds.zone('tri')
+            writer.write_zone([tri.values(v) for v in range(3)], tri.connectivity)
+        out = writer.dataset
+        self.assertEqual(out.num_zones, 2)
+        self.assertEqual(out.zone(0).values('x').tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(out.zone(0).values('y').dtype, np.float32)
+        self.assertTrue(np.shares_memory(out.zone(1).values('p'), tri.values('p')))
+        self.assertEqual(out.zone(1).connectivity.tolist(), [[0, 1, 2]])
+
+    def test_value_count(self):
+        ''' Writing the wrong number of values raises RuntimeError '''
+        ds = triangles()
+        writer = DatasetWriter(ds.title, ds.variable_names, [ds.zone(0).header()])
+        with self.assertRaises(RuntimeError):
+            writer.write_zone([np.zeros(2)] * 3)
@@ -0,0 +1,199 @@
+import numpy as np
+import tec_util.datfile as datfile
+import test
+import unittest
+from tec_util.dataset import FormatError, ValueLocation, Zone, ZoneType
+
+FE_POINT_FILE = '''\
+TITLE = "fe point"
+VARIABLES = "x", "y", "p"
+DATASETAUXDATA Common.Source="unit test"
+ZONE T="tris", N=4, E=2, F=FEPOINT, ET=TRIANGLE
+ 0.0 0.0 1.0
+ 1.0 0.0 2.0
+ 1.0 1.0 3.0
+ 0.0 1.0 4.0
+ 1 2 3
+ 1 3 4
+'''
+
+SHARED_FILE = '''\
+TITLE = "shared"
+VARIABLES = "x" "y" "q" "c"
+ZONE T="a"
+ I=3, J=2, K=1, ZONETYPE=Ordered
+ DATAPACKING=BLOCK
+ VARLOCATION=([4]=CELLCENTERED)
+ DT=(SINGLE SINGLE DOUBLE LONGINT)
+ AUXDATA step="10"
+ 0 1 2 0 1 2
+ 0 0 0 1 1 1
+ 1.5 2.5 3.5 4.5 5.5 6.5
+ 7 8
+ZONE T="b"
+ I=3, J=2, K=1, ZONETYPE=Ordered
+ DATAPACKING=BLOCK
+ VARLOCATION=([4]=CELLCENTERED)
+ VARSHARELIST=([1-2]=1)
+ PASSIVEVARLIST=[3]
+ DT=(SINGLE SINGLE DOUBLE LONGINT)
+ 1*9
+# comment lines are allowed in the data
+ 9
+'''
+
+class TestReadDat(unittest.TestCase):
+    ''' Unit tests for the native ASCII reader '''
+
+    def test_ordered_block(self):
+        ''' Read a BLOCK-packed ordered dataset '''
+        ds = datfile.read_dat(test.data_item_path('cube.dat'))
+        self.assertEqual(ds.title, 'Plot3D DataSet')
+        self.assertEqual(ds.variable_names, ['x', 'y', 'z'])
+        self.assertEqual(ds.num_zones, 6)
+        self.assertEqual(ds.zone(0).name, 'cube.x:1')
+        self.assertEqual(ds.zone(0).dimensions, (11, 11, 1))
+        self.assertEqual(ds.zone(0).values('x').dtype, np.float32)
+        self.assertEqual(ds.aux_data['Common.SpeedOfSound'], '1.0')
+        self.assertAlmostEqual(float(ds.zone(0).values('x').max()), 0.5)
+
+    def test_fe_point(self):
+        ''' Read a POINT-packed FE dataset with old-style zone header '''
+        with test.temp_workspace():
+            with open('fe.dat', 'w') as f:
+                f.write(FE_POINT_FILE)
+            ds = datfile.read_dat('fe.dat')
+        zone = ds.zone('tris')
+        self.assertEqual(zone.zone_type, ZoneType.FETriangle)
+        self.assertEqual((zone.num_points, zone.num_elements), (4, 2))
+        self.assertEqual(list(zone.values('p')), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(zone.connectivity.tolist(), [[0, 1, 2], [0, 2, 3]])
+        self.assertEqual(ds.aux_data['Common.Source'], 'unit test')
+
+    def test_sharing(self):
+        ''' Read shared, passive, and cell-centered variables '''
+        with test.temp_workspace():
+            with open('shared.dat', 'w') as f:
+                f.write(SHARED_FILE)
+            ds = datfile.read_dat('shared.dat')
+        a, b = ds.zone('a'), ds.zone('b')
+        self.assertEqual(a.location('c'), ValueLocation.CellCentered)
+        self.assertEqual(a.values('c').tolist(), [7, 8])
+        self.assertEqual(a.values('q').dtype, np.float64)
+        self.assertEqual(a.aux_data, {'step': '10'})
+        self.assertIs(b.values('x'), a.values('x'))
+        self.assertEqual(b.values('q').tolist(), [0.0] * 6)
+        self.assertEqual(b.values('c').tolist(), [9, 9])
+
+    def test_selection(self):
+        ''' Load a subset of zones/variables, including shared data '''
+        with test.temp_workspace():
+            with open('shared.dat', 'w') as f:
+                f.write(SHARED_FILE)
+            ds = datfile.read_dat('shared.dat', zones=[1], variables=[3, 0])
+        self.assertEqual(ds.variable_names, ['x', 'c'])
+        self.assertEqual(ds.num_zones, 1)
+        zone = ds.zone(0)
+        self.assertEqual(zone.name, 'b')
+        self.assertEqual(zone.values('x').tolist(), [0, 1, 2, 0, 1, 2])
+        self.assertEqual(zone.location('c'), ValueLocation.CellCentered)
+        self.assertEqual(zone.values('c').tolist(), [9, 9])
+
+    def test_skip_unselected(self):
+        ''' Bodies of zones that are not loaded are not parsed '''
+        with test.temp_workspace():
+            with open('fe.dat', 'w') as f:
+                f.write(FE_POINT_FILE.replace(' 1.0 1.0 3.0', ' 1.0 1.0 bad'))
+                f.write('ZONE T="line", I=2\n 0 1\n 5 6\n 7 8\n')
+            ds = datfile.read_dat('fe.dat', zones=[1])
+            self.assertEqual(ds.zone(0).values('p').tolist(), [7, 8])
+            header = datfile.read_dat_header('fe.dat')
+        self.assertEqual([z.name for z in header.zones()], ['tris', 'line'])
+        self.assertEqual(header.zone('tris').num_elements, 2)
+
+    def test_value_count_mismatch(self):
+        ''' Truncated data should raise FormatError '''
+        with test.temp_workspace():
+            with open('bad.dat', 'w') as f:
+                f.write(FE_POINT_FILE.rsplit('\n', 2)[0])
+            with self.assertRaises(FormatError):
+                datfile.read_dat('bad.dat')
+
+    def test_binary_file(self):
+        ''' Binary files are rejected with FormatError '''
+        with self.assertRaises(FormatError):
+            datfile.read_dat(test.data_item_path('axi_sphere.plt'))
+
+    def test_rename(self):
+        ''' Renaming rewrites header records only '''
+        with test.temp_workspace():
+            with open('shared.dat', 'w') as f:
+                f.write(SHARED_FILE)
+            datfile.rename_dat('shared.dat', 'out.dat', variables={2: 'pressure'},
+                               zones={0: 'first', 1: 'sec"ond'})
+            out = datfile.read_dat('out.dat')
+            with open('out.dat') as f:
+                text = f.read()
+        self.assertEqual(out.variable_names, ['x', 'y', 'pressure', 'c'])
+        self.assertEqual([z.name for z in out.zones()], ['first', 'sec"ond'])
+        self.assertEqual(out.zone(1).values('c').tolist(), [9, 9])
+        self.assertEqual(text.split('ZONE')[2].split('\n', 1)[1], SHARED_FILE.split('ZONE')[2].split('\n', 1)[1])
+
+class TestWriteDat(unittest.TestCase):
+    ''' Unit tests for the native ASCII writer '''
+
+    def test_round_trip(self):
+        ''' Data written by write_dat is read back unchanged '''
+        ds = datfile.read_dat(test.data_item_path('sphere.dat'))
+        with test.temp_workspace():
+            datfile.write_dat('out.dat', ds, zones=[1, 3], variables=[0, 2])
+            out = datfile.read_dat('out.dat')
+        self.assertEqual(out.variable_names, ['x', 'z'])
+        self.assertEqual([z.name for z in out.zones()], ['sphere.x:2', 'sphere.x:4'])
+        for zin, zout in zip([ds.zone(1), ds.zone(3)], out.zones()):
+            self.assertTrue(np.array_equal(zin.values('z'), zout.values('z')))
+
+    def test_fe_round_trip(self):
+        ''' FE connectivity survives a write/read cycle '''
+        with test.temp_workspace():
+            with open('fe.dat', 'w') as f:
+                f.write(FE_POINT_FILE)
+            ds = datfile.read_dat('fe.dat')
+            datfile.write_dat('out.dat', ds)
+            out = datfile.read_dat('out.dat')
+        self.assertEqual(out.zone(0).zone_type, ZoneType.FETriangle)
+        self.assertEqual(out.zone(0).connectivity.tolist(), [[0, 1, 2], [0, 2, 3]])
+        self.assertEqual(out.zone(0).values('p').tolist(), [1.0, 2.0, 3.0, 4.0])
+
+    def test_quoted_names(self):
+        ''' Names and aux data containing quotes are escaped '''
+        ds = datfile.read_dat(test.data_item_path('sphere.dat'))
+        ds = ds.subset(zones=[0])
+        ds.title = 'the "sphere"'
+        ds.variable('x').name = 'x "m"'
+        ds.zone(0).name = 'cap "1"'
+        ds.aux_data = {'note': 'say "hi"'}
+        ds.zone(0).aux_data = {'note': '"quoted"'}
+        with test.temp_workspace():
+            datfile.write_dat('out.dat', ds)
+            out = datfile.read_dat('out.dat')
+        self.assertEqual(out.title, 'the "sphere"')
+        self.assertEqual(out.variable_names[0], 'x "m"')
+        self.assertEqual(out.zone(0).name, 'cap "1"')
+        self.assertEqual(out.aux_data, {'note': 'say "hi"'})
+        self.assertEqual(out.zone(0).aux_data, {'note': '"quoted"'})
+
+    def test_value_count(self):
+        ''' Writing the wrong number of values is an error '''
+        header = Zone('line', ZoneType.Ordered, (10,))
+        with test.temp_workspace():
+            with self.assertRaises(ValueError):
+                with datfile.DatWriter('short.dat', '', ['x', 'y'], [header]) as writer:
+                    writer.begin_zone([np.float32, np.float32])
+                    writer.write_values(0, np.arange(9))
+                    writer.end_zone()
+            with self.assertRaises(ValueError):
+                with datfile.DatWriter('missing.dat', '', ['x', 'y'], [header]) as writer:
+                    writer.begin_zone([np.float32, np.float32])
+                    writer.write_values(0, np.arange(10))
+                    writer.end_zone()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Cold-start budget (seconds) for importing tec_util, override with
+# $TEC_UTIL_IMPORT_BUDGET on slow machines.
+IMPORT_BUDGET = float(os.environ.get('TEC_UTIL_IMPORT_BUDGET', '1.0'))
+
+def import_times(code):
+    ''' Run code with -X importtime; return {module: cumulative seconds} '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stdout = subprocess.DEVNULL,
+        stderr = subprocess.PIPE,
+        universal_newlines = True,
+        check = True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) * 1e-6
+    return times
+
+class TestImport(unittest.TestCase):
+    ''' Check that startup does not load heavy, optional modules '''
+
+    def test_import_package(self):
+        ''' import tec_util does not import tecplot, yaml, scipy, or generators '''
+        times = import_times('import tec_util')
+        for name in ['tecplot', 'yaml', 'scipy', 'tec_util.generators']:
+            self.assertNotIn(name, times)
+        self.assertLess(times['tec_util'], IMPORT_BUDGET)
+
+    def test_help(self):
+        ''' tec_util --help does not import tecplot '''
+        times = import_times(
+            'from tec_util.__main__ import main\n'
+            'try: main(["--help"])\n'
+            'except SystemExit: pass'
+        )
+        self.assertNotIn('tecplot', times)
+        self.assertNotIn('yaml', times)
+        self.assertNotIn('scipy', times)
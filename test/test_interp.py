@@ -0,0 +1,160 @@
+import math
+import numpy as np
+import os
+import tec_util
+import tec_util.interp as interp
+import tec_util.spatial as spatial
+import test
+import unittest
+from tec_util.dataset import Dataset
+from unittest import mock
+
+class TestPointTree(unittest.TestCase):
+    ''' Unit tests for nearest neighbour search '''
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.points = rng.random((500, 3))
+        self.queries = rng.random((50, 3))
+
+    def check_query(self, tree):
+        dist, index = tree.query(self.queries, 4, workers=2)
+        d2 = ((self.queries[:, None, :] - self.points[None, :, :])**2).sum(axis=-1)
+        expected = np.argsort(d2, axis=1)[:, :4]
+        self.assertTrue(np.array_equal(index, expected))
+        self.assertTrue(np.allclose(dist, np.sqrt(np.take_along_axis(d2, expected, axis=1))))
+
+    def test_query(self):
+        ''' k nearest points are found in order of distance '''
+        self.check_query(spatial.PointTree(self.points))
+
+    def test_brute_force(self):
+        ''' Fallback search (no SciPy) gives the same answer '''
+        with mock.patch.object(spatial, 'kdtree_class', lambda: None):
+            self.check_query(spatial.PointTree(self.points))
+
+    def test_radius(self):
+        ''' Neighbours outside the radius are reported as missing '''
+        tree = spatial.PointTree([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+        dist, index = tree.query([[0.1, 0.0, 0.0]], 3, radius=0.5)
+        self.assertEqual(index.tolist(), [[0, 2, 2]])
+        self.assertEqual(dist[0, 1], math.inf)
+
+class TestInverseDistance(unittest.TestCase):
+    ''' Unit tests for inverse-distance weights '''
+
+    def test_weights(self):
+        ''' Weights are normalized 1/d**p; coincident points are exact '''
+        tree = spatial.PointTree([[0.0, 0.0, 0.0], [2.0, 0.0, 0.0]])
+        values = np.array([1.0, 4.0])
+        index, weights = interp.idw_weights(
+            tree, [[1.5, 0.0, 0.0], [2.0, 0.0, 0.0]], k=2, exponent=2.0,
+        )
+        w = np.array([1/1.5**2, 1/0.5**2])
+        self.assertAlmostEqual(
+            interp.apply_weights(index, weights, values)[0], (w @ values) / w.sum(),
+        )
+        self.assertEqual(interp.apply_weights(index, weights, values)[1], 4.0)
+
+    def test_no_neighbours(self):
+        ''' Target points with no source points within radius are NaN '''
+        tree = spatial.PointTree([[0.0, 0.0, 0.0]])
+        index, weights = interp.idw_weights(tree, [[5.0, 0.0, 0.0]], k=1, radius=1.0)
+        self.assertTrue(math.isnan(interp.apply_weights(index, weights, [1.0])[0]))
+
+def random_dataset(seed, variables, num_points):
+    rng = np.random.default_rng(seed)
+    ds = Dataset('', variables)
+    zone = ds.add_ordered_zone('zone', (num_points,))
+    for v in range(len(variables)):
+        zone.set_values(v, rng.random(num_points).astype(np.float32))
+    return ds
+
+class TestStencilCache(unittest.TestCase):
+    ''' Unit tests for the interpolation weight cache '''
+
+    def test_reuse(self):
+        ''' Cached weights are reused and give identical results '''
+        src = random_dataset(0, ['x', 'y', 'z', 'p'], 200)
+        tgt = random_dataset(1, ['x', 'y', 'z'], 50)
+        with test.temp_workspace():
+            first = list(interp.interpolate_zones(src, tgt, cache_dir='cache'))
+            self.assertEqual(len(os.listdir('cache')), 1)
+            with mock.patch.object(interp, 'PointTree', side_effect=AssertionError):
+                second = list(interp.interpolate_zones(src, tgt, cache_dir='cache'))
+        self.assertTrue(np.array_equal(first[0][3], second[0][3]))
+
+    def test_key(self):
+        ''' Cache key depends on the coordinates and parameters '''
+        src = random_dataset(0, ['x', 'y', 'z', 'p'], 20)
+        tgt = random_dataset(1, ['x', 'y', 'z'], 5)
+        zones = list(src.zones()), list(tgt.zones())
+        key = interp.stencil_key(*zones, k=8)
+        self.assertEqual(key, interp.stencil_key(*zones, k=8))
+        self.assertNotEqual(key, interp.stencil_key(*zones, k=4))
+        src.zone(0).values('p')[:] = 0.0    # Not a coordinate
+        self.assertEqual(key, interp.stencil_key(*zones, k=8))
+        src.zone(0).values('x')[0] += 1.0
+        self.assertNotEqual(key, interp.stencil_key(*zones, k=8))
+
+class TestZoneBoxes(unittest.TestCase):
+    ''' Unit tests for zone bounding box culling '''
+
+    def blocks(self):
+        ''' Source dataset of 8 random unit-cube zones along the x axis '''
+        rng = np.random.default_rng(2)
+        ds = Dataset('', ['x', 'y', 'z', 'p'])
+        for i in range(8):
+            zone = ds.add_ordered_zone(f'block{i}', (100,))
+            zone.set_values('x', rng.random(100) + 2*i)
+            zone.set_values('y', rng.random(100))
+            zone.set_values('z', rng.random(100))
+            zone.set_values('p', rng.random(100))
+        return ds
+
+    def test_culling(self):
+        ''' Interpolation with culled source zones gives the same result '''
+        src = self.blocks()
+        tgt = random_dataset(3, ['x', 'y', 'z'], 50)
+        boxes = spatial.ZoneBoxes.from_dataset(src)
+        full = list(interp.interpolate_zones(src, tgt, k=4))
+        culled = list(interp.interpolate_zones(src, tgt, k=4, boxes=boxes))
+        self.assertTrue(np.array_equal(full[0][3], culled[0][3]))
+        self.assertEqual(boxes.counters['tested'], 8)
+        self.assertGreaterEqual(boxes.counters['culled'], 6)
+
+    def test_plane(self):
+        ''' Only boxes straddling a plane are kept '''
+        boxes = spatial.ZoneBoxes.from_dataset(self.blocks())
+        mask = boxes.plane_mask((4.5, 0, 0), (1, 0, 0))
+        self.assertEqual(np.flatnonzero(mask).tolist(), [2])
+        mask = boxes.plane_mask((0, 0.5, 0), (0, 1, 0), [1, 3])
+        self.assertEqual(mask.tolist(), [True, True])
+
+    def test_persist(self):
+        ''' Boxes are saved next to the datafile and reused until it changes '''
+        ds = self.blocks()
+        with test.temp_workspace():
+            with open('data.plt', 'wb') as f:
+                f.write(b'data')
+            first = spatial.load_zone_boxes('data.plt', ds)
+            self.assertTrue(os.path.exists(spatial.zone_boxes_path('data.plt')))
+            with mock.patch.object(spatial.ZoneBoxes, 'from_dataset', side_effect=AssertionError):
+                second = spatial.load_zone_boxes('data.plt', ds)
+            self.assertTrue(np.array_equal(first.lower, second.lower))
+            with open('data.plt', 'ab') as f:
+                f.write(b'more')
+            build = spatial.ZoneBoxes.from_dataset
+            with mock.patch.object(spatial.ZoneBoxes, 'from_dataset', side_effect=build) as m:
+                spatial.load_zone_boxes('data.plt', ds)
+            m.assert_called_once()
+
+    def test_opt_in(self):
+        ''' Boxes are only saved next to the source datafile when asked '''
+        with test.temp_workspace():
+            tec_util.write_dataset('src.plt', self.blocks())
+            tgt = random_dataset(3, ['x', 'y', 'z'], 50)
+            tec_util.interpolate_dataset('src.plt', tgt, None, k=4)
+            self.assertFalse(os.path.exists(spatial.zone_boxes_path('src.plt')))
+            tec_util.interpolate_dataset('src.plt', tgt, None, k=4, cache=True)
+            self.assertTrue(os.path.exists(spatial.zone_boxes_path('src.plt')))
@@ -0,0 +1,47 @@
+import numpy as np
+import tec_util
+import tec_util.lines as lines
+import test
+import unittest
+from test.test_probe import linear, volume
+
+class TestLines(unittest.TestCase):
+    ''' Unit tests for native line extraction '''
+
+    def test_sample_polyline(self):
+        ''' Points are evenly spaced along the arc length, across vertices '''
+        points, arc = lines.sample_polyline([(0, 0), (1, 0), (1, 2)], 4)
+        self.assertTrue(np.allclose(arc, [0.0, 1.0, 2.0, 3.0]))
+        self.assertTrue(np.allclose(points, [[0, 0], [1, 0], [1, 1], [1, 2]]))
+
+    def test_extract_lines(self):
+        ''' All lines are sampled in one pass; points outside are dropped '''
+        ds = lines.extract_lines(volume(), [
+            ('profile', [(0.5, 0.5, 0.0), (0.5, 0.5, 1.0)], 11),
+            ('bent',    [(0.2, 0.1, 0.1), (0.8, 0.1, 0.1), (0.8, 0.9, 0.5)], 7),
+            ('outside', [(2.0, 0.0, 0.0), (3.0, 0.0, 0.0)], 3),
+            ('partial', [(0.5, 0.5, 0.5), (1.5, 0.5, 0.5)], 5),
+        ])
+        self.assertEqual(ds.variable_names, ['x', 'y', 'z', 'f', 'arc_length'])
+        self.assertEqual([z.name for z in ds.zones()], ['profile', 'bent', 'partial'])
+        self.assertEqual(ds.zone('profile').dimensions, (11, 1, 1))
+        self.assertEqual(ds.zone('partial').num_points, 3)
+        for zone in ds.zones():
+            x, y, z, f = [zone.values(v) for v in 'xyzf']
+            self.assertTrue(np.allclose(f, linear(x, y, z)))
+        self.assertTrue(np.allclose(ds.zone('profile').values('z'), np.linspace(0, 1, 11)))
+        self.assertTrue(np.allclose(ds.zone('partial').values('arc_length'), [0.0, 0.25, 0.5]))
+
+    def test_line_file(self):
+        ''' Lines are read from Python or YAML files '''
+        with test.temp_workspace():
+            tec_util.write_dataset('volume.plt', volume())
+            with open('lines.py', 'w') as f:
+                f.write("lines = [('a', [(0.5, 0.1, 0.0), (0.5, 0.1, 1.0)], 5)]\n")
+            with open('lines.yml', 'w') as f:
+                f.write("lines:\n  - name: a\n    vertices: [[0.5, 0.1, 0.0], [0.5, 0.1, 1.0]]\n    num_points: 5\n")
+            for line_file in ['lines.py', 'lines.yml']:
+                tec_util.extract_lines(line_file, 'volume.plt', 'lines.plt', cache=True)
+                ds = tec_util.read_plt('lines.plt')
+                self.assertEqual(ds.zone(0).name, 'a')
+                self.assertTrue(np.allclose(ds.zone(0).values('f')[:], 0.7 + 0.75 * np.arange(5)))
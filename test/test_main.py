@@ -1,8 +1,11 @@
+import contextlib
+import io
 import shutil
 import tecplot as tp
 import tecplot.constant as tpc
 import test
 import unittest
+from unittest import mock
 from os.path import exists
 from tec_util.__main__ import main
 
@@ -12,6 +15,22 @@ def load_and_replace(dataset_name):
 class TestMain(unittest.TestCase):
     ''' Tests for the main program '''
 
+    def test_batch(self):
+        ''' Make sure batch command runs a subcommand for every input '''
+        with test.temp_workspace():
+            shutil.copy(test.data_item_path('sphere.dat'), 'sphere1.dat')
+            shutil.copy(test.data_item_path('sphere.dat'), 'sphere2.dat')
+            main([
+                'batch',
+                '--inputs', 'sphere*.dat',
+                '--jobs', '2',
+                'extract', '--variables=x', '-o', '{stem}_x.plt',
+            ])
+            for name in ['sphere1_x.plt', 'sphere2_x.plt']:
+                ds = load_and_replace(name)
+                self.assertEqual(ds.num_variables,1)
+                self.assertEqual(ds.num_zones,6)
+
     def test_export_yaml(self):
         ''' Test export command with YAML input file '''
         with test.temp_workspace():
@@ -22,6 +41,16 @@ class TestMain(unittest.TestCase):
             ])
             self.assertTrue(exists('combo_plot.png'))
 
+    def test_export_parallel(self):
+        ''' Test export command with worker processes '''
+        with test.temp_workspace():
+            shutil.copytree(test.data_item_path('spec_data'), 'spec_data')
+            main([
+                'export', '--jobs', '2',
+                test.data_item_path('spec.yml')
+            ])
+            self.assertTrue(exists('combo_plot.png'))
+
     def test_extract(self):
         ''' Make sure extract command works '''
         with test.temp_workspace():
@@ -35,6 +64,21 @@ class TestMain(unittest.TestCase):
             self.assertEqual(ds.num_variables,2)
             self.assertEqual(ds.num_zones,4)
 
+    def test_pipe(self):
+        ''' Chain subcommands without intermediate files '''
+        with test.temp_workspace():
+            main([
+                'pipe',
+                'extract', test.data_item_path('sphere.dat'), '--zones="*:[1-4]"', '+',
+                'rename_vars', 'x=xx', '+',
+                'rename_zones', 'sphere.x:1=front', '-o', 'pipe.plt',
+            ])
+            self.assertFalse(exists('extract.plt'))
+            ds = load_and_replace("pipe.plt")
+            self.assertEqual(ds.num_zones,4)
+            self.assertEqual(ds.variable(0).name, "xx")
+            self.assertEqual(ds.zone(0).name, "front")
+
     def test_generate(self):
         ''' Make sure generate command works '''
         with test.temp_workspace():
@@ -46,10 +90,24 @@ class TestMain(unittest.TestCase):
             ])
             self.assertTrue(exists('layout.lay'))
 
+    def test_info_fast(self):
+        ''' Make sure info --fast reads only the header '''
+        for name, expected in [('sphere.dat', 'n/a'), ('axi_sphere.plt', '+3.00000e+00')]:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output), \
+                 mock.patch('tec_util.core.read_dat', side_effect=AssertionError('data read')), \
+                 mock.patch('tec_util.core.read_plt', side_effect=AssertionError('data read')):
+                main(['info', '--fast', test.data_item_path(name)])
+            lines = output.getvalue().splitlines()
+            ranges = lines[lines.index('Variable Info:') + 2]
+            self.assertIn(' y ', ranges)
+            self.assertIn(expected, ranges)
+
     def test_interp(self):
         ''' Make sure interp command works '''
         with test.temp_workspace():
             main([
+                '--engine',
                 'interp',
                 test.data_item_path('interp_src.dat'),
                 test.data_item_path('interp_tgt.dat'),
@@ -59,6 +117,35 @@ class TestMain(unittest.TestCase):
             self.assertAlmostEqual(max(vrange), 6.39408e-01, delta=1e-6)
             self.assertAlmostEqual(min(vrange), 5.10930e-01, delta=1e-6)
 
+    def test_interp_native(self):
+        ''' Native interp uses k-nearest points, so matches the engine closely '''
+        with test.temp_workspace():
+            main([
+                'interp',
+                test.data_item_path('interp_src.dat'),
+                test.data_item_path('interp_tgt.dat'),
+            ])
+            ds = load_and_replace("interp.plt")
+            vrange = ds.variable("r").values(0).minmax()
+            self.assertAlmostEqual(max(vrange), 6.39408e-01, delta=5e-3)
+            self.assertAlmostEqual(min(vrange), 5.10930e-01, delta=5e-3)
+
+    def test_lines(self):
+        ''' Make sure lines command writes one ordered zone per line '''
+        with test.temp_workspace():
+            with open('lines.py', 'w') as f:
+                f.write("lines = [('profile', [(0.2, 0.8), (0.2, 1.6)], 11)]\n")
+            main([
+                'lines', '-v', 'q1',
+                'lines.py',
+                test.data_item_path('axi_sphere.plt'),
+            ])
+            ds = load_and_replace('lines.plt')
+            vs = [v.name for v in ds.variables()]
+            self.assertEqual(vs, ['x', 'y', 'q1', 'arc_length'])
+            self.assertEqual(ds.zone(0).name, 'profile')
+            self.assertEqual(ds.zone(0).dimensions, (11,1,1))
+
     def test_merge(self):
         ''' Make sure merge command works '''
         with test.temp_workspace():
@@ -71,6 +158,31 @@ class TestMain(unittest.TestCase):
             self.assertEqual(2, ds.num_zones)
             self.assertEqual(5, ds.num_variables)
 
+    def test_probe(self):
+        ''' Make sure probe command writes a table of probe values '''
+        with test.temp_workspace():
+            with open('points.txt', 'w') as f:
+                f.write('0.0 0.5\n0.25 0.25\n')
+            main([
+                'probe', '-v', 'q1',
+                test.data_item_path('axi_sphere_surf.plt'),
+                'points.txt',
+            ])
+            with open('probe.csv') as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0], 'x,y,zone,node,distance,q1')
+            self.assertEqual(len(lines), 3)
+
+    def test_profile_local(self):
+        ''' Make sure profiled commands are not forwarded to a server '''
+        with test.temp_workspace():
+            with mock.patch('tec_util.server.forward', side_effect=AssertionError('forwarded')):
+                main([
+                    '--profile', 'report.json',
+                    'stats', test.data_item_path('cube.dat'),
+                ])
+            self.assertTrue(exists('report.json'))
+
     def test_revolve(self):
         ''' Make sure revolve command works '''
         with test.temp_workspace():
@@ -0,0 +1,195 @@
+import numpy as np
+import os
+import shutil
+import tec_util.pltfile as pltfile
+import test
+import unittest
+from tec_util.dataset import FormatError, Zone, ZoneType
+
+class TestReadPlt(unittest.TestCase):
+    ''' Unit tests for the native binary reader '''
+
+    def test_read(self):
+        ''' Read header and data of an ordered binary dataset '''
+        ds = pltfile.read_plt(test.data_item_path('axi_sphere.plt'))
+        self.assertEqual(ds.variable_names, ['x', 'y', 'q1', 'q2', 'v1', 'v2'])
+        self.assertEqual(ds.num_zones, 1)
+        zone = ds.zone(0)
+        self.assertEqual(zone.zone_type, ZoneType.Ordered)
+        self.assertEqual(zone.dimensions, (11, 9, 1))
+        self.assertEqual(zone.strand, 0)
+        self.assertEqual(ds.aux_data['Common.VectorVarsAreVelocity'], 'FALSE')
+        self.assertEqual(zone.values('q2').tolist(), [2.0] * 99)
+
+    def test_memory_map(self):
+        ''' Values are zero-copy, copy-on-write views of the file '''
+        ds = pltfile.read_plt(test.data_item_path('axi_sphere.plt'))
+        values = ds.zone(0).values('x')
+        self.assertIsInstance(values, np.memmap)
+        values[:] = 0.0
+        again = pltfile.read_plt(test.data_item_path('axi_sphere.plt'))
+        self.assertEqual(again.zone(0).values('x').min(), -0.5)
+
+    def test_stored_ranges(self):
+        ''' Ranges stored in the file match the data '''
+        ds = pltfile.read_plt(test.data_item_path('axi_sphere_surf.plt'))
+        zone = ds.zone(0)
+        for v in range(ds.num_variables):
+            values = zone.values(v)
+            self.assertEqual(zone.ranges[v], (values.min(), values.max()))
+
+    def test_selection(self):
+        ''' Load a subset of the variables '''
+        path = test.data_item_path('axi_sphere.plt')
+        ds = pltfile.read_plt(path, zones=[0], variables=[4, 1])
+        full = pltfile.read_plt(path)
+        self.assertEqual(ds.variable_names, ['y', 'v1'])
+        for v in ds.variable_names:
+            self.assertTrue(np.array_equal(ds.zone(0).values(v), full.zone(0).values(v)))
+        self.assertEqual(ds.zone(0).ranges, [full.zone(0).ranges[1], full.zone(0).ranges[4]])
+        self.assertEqual(pltfile.read_plt(path, zones=[]).num_zones, 0)
+
+    def test_header(self):
+        ''' Header-only read has zones without values '''
+        ds = pltfile.read_plt_header(test.data_item_path('axi_sphere.plt'))
+        self.assertEqual(ds.variable_names, ['x', 'y', 'q1', 'q2', 'v1', 'v2'])
+        self.assertEqual(ds.zone(0).dimensions, (11, 9, 1))
+        self.assertEqual(ds.zone(0).ranges[3], (2.0, 2.0))
+        self.assertIsNone(ds.zone(0).values(0))
+
+    def test_ascii_file(self):
+        ''' ASCII files are rejected with FormatError '''
+        with self.assertRaises(FormatError):
+            pltfile.read_plt(test.data_item_path('cube.dat'))
+
+    def test_old_version(self):
+        ''' Versions with the older header layout are rejected with FormatError '''
+        with open(test.data_item_path('axi_sphere.plt'), 'rb') as f:
+            data = bytearray(f.read())
+        data[:8] = b'#!TDV106'
+        with self.assertRaises(FormatError):
+            pltfile.scan_plt(data)
+
+class TestWritePlt(unittest.TestCase):
+    ''' Unit tests for the native binary writer '''
+
+    def test_round_trip(self):
+        ''' Data written by write_plt is read back unchanged '''
+        ds = pltfile.read_plt(test.data_item_path('axi_sphere.plt'))
+        with test.temp_workspace():
+            pltfile.write_plt('out.plt', ds, variables=[0, 1, 4])
+            out = pltfile.read_plt('out.plt')
+        self.assertEqual(out.variable_names, ['x', 'y', 'v1'])
+        self.assertEqual(out.zone(0).dimensions, (11, 9, 1))
+        self.assertEqual(out.aux_data, ds.aux_data)
+        for v in ['x', 'y', 'v1']:
+            values = out.zone(0).values(v)
+            self.assertTrue(np.array_equal(values, ds.zone(0).values(v)))
+            self.assertEqual(out.zone(0).ranges[out.variable(v).index],
+                             (values.min(), values.max()))
+
+    def test_fe_zone(self):
+        ''' FE zones keep dtypes, connectivity, and strand/time '''
+        header = Zone('tris', ZoneType.FETriangle, (4, 2), strand=2, solution_time=0.5)
+        x = np.array([0.0, 1.0, 1.0, 0.0])
+        n = np.array([1, 2, 3, 4], np.int32)
+        conn = [[0, 1, 2], [0, 2, 3]]
+        with test.temp_workspace():
+            with pltfile.PltWriter('fe.plt', 'fe', ['x', 'n'], [header]) as writer:
+                writer.write_zone([x, n], conn)
+            out = pltfile.read_plt('fe.plt')
+        zone = out.zone(0)
+        self.assertEqual(zone.zone_type, ZoneType.FETriangle)
+        self.assertEqual((zone.strand, zone.solution_time), (2, 0.5))
+        self.assertEqual(zone.values('x').dtype, np.float64)
+        self.assertEqual(zone.values('n').tolist(), [1, 2, 3, 4])
+        self.assertEqual(zone.connectivity.tolist(), conn)
+
+    def test_chunked_values(self):
+        ''' Values may be streamed in pieces smaller than the zone '''
+        header = Zone('line', ZoneType.Ordered, (10,))
+        with test.temp_workspace():
+            with pltfile.PltWriter('line.plt', '', ['x'], [header], chunk_size=3) as writer:
+                writer.begin_zone([np.float32])
+                writer.write_values(0, np.arange(4))
+                writer.write_values(0, np.arange(4, 10))
+                writer.end_zone()
+            out = pltfile.read_plt('line.plt')
+        self.assertEqual(out.zone(0).values('x').tolist(), list(range(10)))
+        self.assertEqual(out.zone(0).ranges[0], (0.0, 9.0))
+
+    def test_value_count(self):
+        ''' Writing the wrong number of values is an error '''
+        header = Zone('line', ZoneType.Ordered, (10,))
+        with test.temp_workspace():
+            with self.assertRaises(RuntimeError):
+                with pltfile.PltWriter('line.plt', '', ['x'], [header]) as writer:
+                    writer.begin_zone([np.float32])
+                    writer.write_values(0, np.arange(9))
+                    writer.end_zone()
+
+class TestRenamePlt(unittest.TestCase):
+    ''' Unit tests for header-only renaming '''
+
+    def test_rename(self):
+        ''' Names change; everything after the header is copied unchanged '''
+        src = test.data_item_path('axi_sphere.plt')
+        with test.temp_workspace():
+            pltfile.rename_plt(src, 'out.plt', variables={2: 'pressure'}, zones={0: 'body'})
+            out = pltfile.read_plt('out.plt')
+            with open(src, 'rb') as a, open('out.plt', 'rb') as b:
+                data_in, data_out = a.read(), b.read()
+        header_in = pltfile.scan_plt(data_in).header_end
+        header_out = pltfile.scan_plt(data_out).header_end
+        self.assertEqual(data_in[header_in:], data_out[header_out:])
+        self.assertEqual(out.variable_names, ['x', 'y', 'pressure', 'q2', 'v1', 'v2'])
+        self.assertEqual(out.zone(0).name, 'body')
+        self.assertEqual(out.zone(0).values('q2').tolist(), [2.0] * 99)
+
+    def test_in_place(self):
+        ''' Renaming a file onto itself, with and without a size change '''
+        with test.temp_workspace():
+            shutil.copy(test.data_item_path('axi_sphere.plt'), 'in.plt')
+            size = os.path.getsize('in.plt')
+            pltfile.rename_plt('in.plt', 'in.plt', variables={0: 'X'})
+            self.assertEqual(os.path.getsize('in.plt'), size)
+            pltfile.rename_plt('in.plt', 'in.plt', variables={1: 'radius'})
+            self.assertEqual(os.path.getsize('in.plt'), size + 20)
+            out = pltfile.read_plt('in.plt')
+        self.assertEqual(out.variable_names[:2], ['X', 'radius'])
+        self.assertEqual(out.zone(0).values('q2').tolist(), [2.0] * 99)
+
+class TestExtractPlt(unittest.TestCase):
+    ''' Unit tests for byte-range extraction '''
+
+    def write_shared(self):
+        ''' Two FE zones; the second shares "x" and connectivity with the first '''
+        headers = [Zone(name, ZoneType.FETriangle, (4, 2)) for name in ['a', 'b']]
+        x = np.array([0.0, 1.0, 1.0, 0.0])
+        with pltfile.PltWriter('fe.plt', 'fe', ['x', 'p'], headers) as writer:
+            for p in [1.0, 2.0]:
+                writer.write_zone([x, np.full(4, p, np.float32)], [[0, 1, 2], [0, 2, 3]])
+        with open('fe.plt', 'rb') as source:
+            layout = pltfile.scan_plt(source.read())
+            with pltfile.PltWriter('shared.plt', 'fe', ['x', 'p'], headers) as writer:
+                writer.copy_zone(source, layout.zones[0])
+                writer.copy_zone(source, layout.zones[1]._replace(shared=[0, -1], conn_share=0))
+
+    def test_extract(self):
+        ''' Shared blocks are copied from the source zone unless it is copied too '''
+        with test.temp_workspace():
+            self.write_shared()
+            pltfile.extract_plt('shared.plt', 'one.plt', zones=[1])
+            pltfile.extract_plt('shared.plt', 'both.plt', variables=[0])
+            with open('both.plt', 'rb') as f:
+                both = pltfile.scan_plt(f.read())
+            one = pltfile.read_plt('one.plt')
+        zone = one.zone(0)
+        self.assertEqual(zone.name, 'b')
+        self.assertEqual(zone.values('x').tolist(), [0.0, 1.0, 1.0, 0.0])
+        self.assertEqual(zone.values('p').tolist(), [2.0] * 4)
+        self.assertEqual(zone.ranges, [(0.0, 1.0), (2.0, 2.0)])
+        self.assertEqual(zone.connectivity.tolist(), [[0, 1, 2], [0, 2, 3]])
+        self.assertEqual(both.variables, ['x'])
+        self.assertEqual(both.zones[1].shared, [0])
+        self.assertEqual(both.zones[1].conn_share, 0)
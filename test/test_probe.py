@@ -0,0 +1,79 @@
+import numpy as np
+import os
+import tec_util
+import tec_util.probe as probe
+import test
+import unittest
+from tec_util.dataset import Dataset, ValueLocation, ZoneType
+
+def linear(x, y, z):
+    return x + 2*y + 3*z
+
+def volume():
+    ''' Curvilinear ordered block holding a linear function f '''
+    g = np.linspace(0.0, 1.0, 6)
+    z, y, x = np.meshgrid(g, g, g, indexing='ij')
+    x = x + 0.1 * np.sin(3*y)
+    ds = Dataset('volume', ['x', 'y', 'z', 'f'])
+    zone = ds.add_ordered_zone('block', (6, 6, 6))
+    for name, values in zip('xyzf', [x, y, z, linear(x, y, z)]):
+        zone.set_values(name, values.ravel())
+    return ds
+
+def quads():
+    ''' Two FE quads with a nodal and a cell-centered variable '''
+    ds = Dataset('quads', ['x', 'y', 'p', 'c'])
+    zone = ds.add_fe_zone(
+        ZoneType.FEQuad, 'quads', 6, 2,
+        connectivity = np.array([[0, 1, 4, 3], [1, 2, 5, 4]]),
+        locations    = [ValueLocation.Nodal] * 3 + [ValueLocation.CellCentered],
+    )
+    zone.set_values('x', np.array([0.0, 1.0, 2.0, 0.0, 1.0, 2.0]))
+    zone.set_values('y', np.array([0.0, 0.0, 0.0, 1.0, 1.0, 1.0]))
+    zone.set_values('p', np.arange(6.0))
+    zone.set_values('c', np.array([7.0, 8.0]))
+    return ds
+
+class TestProbe(unittest.TestCase):
+    ''' Unit tests for native point probes '''
+
+    def test_cell(self):
+        ''' Linear data is reproduced exactly inside curvilinear hexes '''
+        points = np.random.default_rng(3).uniform([0.1, 0.0, 0.0], [1.0, 1.0, 1.0], (200, 3))
+        table = probe.probe_dataset(volume(), points, mode='cell')
+        self.assertTrue((table.zones == 0).all())
+        self.assertTrue(np.allclose(table.values[:, 0], linear(*points.T)))
+        outside = probe.probe_dataset(volume(), [[2.0, 0.5, 0.5]], mode='cell')
+        self.assertEqual(outside.zones.tolist(), [-1])
+        self.assertTrue(np.isnan(outside.values).all())
+
+    def test_cell_2d(self):
+        ''' Two probe coordinates search 2D cells; cell-centered values are taken as is '''
+        table = probe.probe_dataset(quads(), [[0.5, 0.5], [1.5, 0.25]], mode='cell')
+        self.assertEqual(table.items.tolist(), [0, 1])
+        self.assertEqual(table.values.tolist(), [[2.0, 7.0], [2.25, 8.0]])
+
+    def test_nearest(self):
+        ''' Nearest mode reports the nearest node, its distance and nodal values '''
+        table = probe.probe_dataset(quads(), [[0.1, 0.8], [5.0, 1.0]])
+        self.assertEqual(table.items.tolist(), [3, 5])
+        self.assertTrue(np.allclose(table.distance, [np.hypot(0.1, 0.2), 3.0]))
+        self.assertEqual(table.values[:, 0].tolist(), [3.0, 5.0])
+        self.assertTrue(np.isnan(table.values[:, 1]).all())
+
+    def test_probe_points(self):
+        ''' Probe a datafile from a points file, with a reusable index '''
+        with test.temp_workspace():
+            tec_util.write_dataset('volume.plt', volume())
+            with open('points.csv', 'w') as f:
+                f.write('x,y,z\n0.5,0.5,0.5\n0.2,0.7,0.1\n')
+            for run in range(2):
+                table = tec_util.probe_points(
+                    'volume.plt', 'points.csv', 'probes.csv', mode='cell', cache=True,
+                )
+                self.assertTrue(os.path.exists('volume.plt.probe.npz'))
+            with open('probes.csv') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'x,y,z,zone,cell,distance,f')
+        self.assertEqual(lines[1].split(',')[3], 'block')
+        self.assertTrue(np.allclose(table.values[:, 0], [3.0, 1.9]))
@@ -0,0 +1,47 @@
+import os
+import socket
+import tec_util.batch as batch
+import tec_util.server as server
+import test
+import threading
+import unittest
+from unittest import mock
+
+class TestForward(unittest.TestCase):
+    ''' Unit tests for forwarding commands to a server '''
+
+    def test_no_server(self):
+        ''' Without a listening server, the command is not forwarded '''
+        with test.temp_workspace():
+            self.assertIsNone(server.forward(['info', 'x.plt'], 'none.sock'))
+
+    def test_server_dies(self):
+        ''' A server that closes the connection without answering is ignored '''
+        with test.temp_workspace():
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind('dead.sock')
+            listener.listen(1)
+            def accept_and_close():
+                conn, _ = listener.accept()
+                conn.recv(1<<16)
+                conn.close()
+            thread = threading.Thread(target=accept_and_close)
+            thread.start()
+            try:
+                with self.assertLogs('tec_util.server', 'WARNING'):
+                    self.assertIsNone(server.forward(['info', 'x.plt'], 'dead.sock'))
+            finally:
+                thread.join()
+                listener.close()
+
+    def test_environment(self):
+        ''' Forwarded environment variables are set only while the command runs '''
+        os.environ.pop('TEC_UTIL_CACHE_DIR', None)
+        seen = []
+        with mock.patch('tec_util.__main__.run', lambda args: seen.append(args.cache_dir)):
+            ok, elapsed, output = batch.run_command(
+                ['interp', 'src.plt', 'tgt.plt'], env={'TEC_UTIL_CACHE_DIR': 'cache'},
+            )
+        self.assertTrue(ok)
+        self.assertEqual(seen, ['cache'])
+        self.assertNotIn('TEC_UTIL_CACHE_DIR', os.environ)
@@ -0,0 +1,73 @@
+import numpy as np
+import tec_util.slicing as slicing
+import tec_util.spatial as spatial
+import unittest
+from tec_util.dataset import Dataset, ValueLocation, ZoneType
+
+def plate(num_i=5, num_j=3):
+    ''' Ordered unit square in the z=0 plane with p = x + 10*y '''
+    ds = Dataset('plate', ['x', 'y', 'z', 'p'])
+    zone = ds.add_ordered_zone('plate', (num_i, num_j))
+    y, x = np.meshgrid(np.linspace(0, 1, num_j), np.linspace(0, 1, num_i), indexing='ij')
+    zone.set_values('x', x.ravel())
+    zone.set_values('y', y.ravel())
+    zone.set_values('p', x.ravel() + 10*y.ravel())
+    return ds
+
+class TestSliceDataset(unittest.TestCase):
+    ''' Unit tests for the native multi-plane slicer '''
+
+    def test_ordered(self):
+        ''' Slices of an ordered surface interpolate values along edges '''
+        slices = [
+            ('x', (0.3, 0, 0), (1, 0, 0), 'all'),
+            ('y', (0, 0.6, 0), (0, 1, 0), [0]),
+            ('miss', (0, 0, 1), (0, 0, 1), 'all'),
+        ]
+        out = slicing.slice_dataset(plate(), slices)
+        self.assertEqual([z.name for z in out.zones()], ['x', 'y'])
+        zx, zy = out.zone('x'), out.zone('y')
+        self.assertEqual(zx.zone_type, ZoneType.FELineSeg)
+        self.assertEqual((zx.num_points, zx.num_elements), (3, 2))
+        self.assertTrue(np.allclose(zx.values('x'), 0.3))
+        self.assertTrue(np.allclose(zx.values('p'), 0.3 + 10*zx.values('y')))
+        self.assertEqual((zy.num_points, zy.num_elements), (5, 4))
+        self.assertTrue(np.allclose(zy.values('y'), 0.6))
+        self.assertEqual(sorted(zy.values('x').tolist()), [0.0, 0.25, 0.5, 0.75, 1.0])
+
+    def test_connected(self):
+        ''' Neighbouring segments share their end points '''
+        out = slicing.slice_dataset(plate(9, 9), [('d', (0.5, 0.5, 0), (1, 1, 0), 'all')])
+        zone = out.zone(0)
+        degree = np.bincount(zone.connectivity.ravel())
+        self.assertEqual(sorted(degree.tolist())[:3], [1, 1, 2])
+
+    def test_fe_cell_centered(self):
+        ''' FE zones take cell-centered values from the cut cell '''
+        ds = Dataset('tris', ['x', 'y', 'z', 'c'])
+        zone = ds.add_fe_zone(
+            ZoneType.FETriangle, 'tris', 4, 2,
+            locations = [0, 0, 0, ValueLocation.CellCentered],
+        )
+        zone.set_values('x', [0.0, 1.0, 1.0, 0.0])
+        zone.set_values('y', [0.0, 0.0, 1.0, 1.0])
+        zone.set_values('c', [5.0, 7.0])
+        zone.connectivity = np.array([[0, 1, 2], [0, 2, 3]])
+        out = slicing.slice_dataset(ds, [('s', (0, 0.25, 0), (0, 1, 0), 'all')])
+        cut = out.zone(0)
+        self.assertEqual(cut.location('c'), ValueLocation.CellCentered)
+        self.assertEqual(sorted(cut.values('c').tolist()), [5.0, 7.0])
+        self.assertTrue(np.allclose(cut.values('y'), 0.25))
+
+    def test_culling(self):
+        ''' Zones whose bounding box misses a plane are not sliced '''
+        ds = plate()
+        far = ds.add_ordered_zone('far', (2, 2))
+        far.set_values('x', [0.0, 1.0, 0.0, 1.0])
+        far.set_values('y', [5.0, 5.0, 6.0, 6.0])
+        boxes = spatial.ZoneBoxes.from_dataset(ds)
+        slices = [('x', (0.3, 0, 0), (1, 0, 0), 'all'), ('y', (0, 0.6, 0), (0, 1, 0), 'all')]
+        out = slicing.slice_dataset(ds, slices, boxes=boxes)
+        self.assertEqual(boxes.counters, {'tested': 4, 'culled': 1})
+        self.assertEqual(out.zone('x').num_points, 3 + 2)
+        self.assertEqual(out.zone('y').num_points, 5)
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tec_util
+import tec_util.statindex as statindex
+import test
+import unittest
+from unittest import mock
+
+class TestStatsIndex(unittest.TestCase):
+    ''' Unit tests for the sidecar statistics index '''
+
+    def test_reuse(self):
+        ''' Statistics come from the index until the datafile changes '''
+        with test.temp_workspace():
+            shutil.copy(test.data_item_path('cube.dat'), 'cube.dat')
+            scanned = tec_util.compute_statistics('cube.dat', select_vars='y')
+            first = tec_util.compute_statistics('cube.dat', select_vars='y', index=True)
+            self.assertTrue(os.path.exists(statindex.index_path('cube.dat')))
+            for s1, s2 in zip(scanned['y'], first['y']):
+                self.assertEqual(s1.name, s2.name)
+                self.assertAlmostEqual(s1.mean, s2.mean)
+                self.assertEqual(s1.max, s2.max)
+
+            # Valid index: the datafile is not opened
+            with mock.patch.object(tec_util.core, 'open_dataset', side_effect=AssertionError):
+                second = tec_util.compute_statistics(
+                    'cube.dat', select_vars='y', select_zones='*:[12]', index=True,
+                )
+            self.assertEqual(second['y'], first['y'][:2])
+
+            # Modified datafile: index is rebuilt
+            with open('cube.dat', 'a') as f:
+                f.write('\n')
+            self.assertIsNone(statindex.load_index('cube.dat'))
+            tec_util.compute_statistics('cube.dat', index=True)
+            self.assertIsNotNone(statindex.load_index('cube.dat'))
+
+    def test_index_dataset(self):
+        ''' Index metadata round-trips into a value-less Dataset '''
+        with test.temp_workspace():
+            shutil.copy(test.data_item_path('cube.dat'), 'cube.dat')
+            dataset = tec_util.read_dat('cube.dat')
+            index = statindex.build_index('cube.dat', dataset)
+        skeleton = statindex.index_dataset(index)
+        self.assertEqual(skeleton.variable_names, dataset.variable_names)
+        self.assertEqual(skeleton.num_zones, dataset.num_zones)
+        for z1, z2 in zip(skeleton.zones(), dataset.zones()):
+            self.assertEqual((z1.name, z1.zone_type, z1.dimensions), (z2.name, z2.zone_type, z2.dimensions))
+            self.assertEqual(z1.ranges[0], (z2.values(0).min(), z2.values(0).max()))
@@ -0,0 +1,32 @@
+import numpy as np
+import tec_util.stats as stats
+import unittest
+
+class TestZoneStatistics(unittest.TestCase):
+    ''' Unit tests for the chunked statistics engine '''
+
+    def test_chunked(self):
+        ''' Chunked results match a direct float64 reduction '''
+        values = np.random.default_rng(0).normal(1.0e4, 3.0, 1001).astype(np.float32)
+        result = stats.zone_statistics('zone', values, chunk_size=64)
+        exact  = values.astype(np.float64)
+        self.assertEqual(result.name, 'zone')
+        self.assertEqual(result.min, exact.min())
+        self.assertEqual(result.max, exact.max())
+        self.assertAlmostEqual(result.mean, exact.mean(), places=8)
+        self.assertAlmostEqual(result.std, exact.std(), places=8)
+        self.assertEqual((result.num_nan, result.num_inf), (0, 0))
+
+    def test_non_finite(self):
+        ''' NaN/Inf are counted and excluded from the statistics '''
+        values = np.array([1.0, np.nan, 3.0, np.inf, -np.inf, np.nan])
+        result = stats.zone_statistics('zone', values, chunk_size=4)
+        self.assertEqual((result.min, result.max, result.mean), (1.0, 3.0, 2.0))
+        self.assertEqual(result.std, 1.0)
+        self.assertEqual((result.num_nan, result.num_inf), (2, 2))
+
+    def test_no_finite_values(self):
+        ''' Statistics are NaN if there are no finite values '''
+        result = stats.zone_statistics('zone', np.full(3, np.nan))
+        self.assertTrue(np.isnan([result.min, result.max, result.mean, result.std]).all())
+        self.assertEqual(result.num_nan, 3)
@@ -0,0 +1,57 @@
+import json
+import numpy as np
+import tec_util
+import tec_util.timing as timing
+import test
+import unittest
+
+class TestProfiling(unittest.TestCase):
+    ''' Unit tests for per-phase timing '''
+
+    def test_disabled(self):
+        ''' Without a profiler, phases are a shared no-op context '''
+        self.assertIs(timing.phase('load'), timing.phase('compute', zone='a'))
+        with timing.phase('load'):
+            pass
+
+    def test_report(self):
+        ''' Phases are summarized in the JSON report and Chrome trace '''
+        with test.temp_workspace():
+            with tec_util.profiling('report.json', 'trace.json') as profiler:
+                tec_util.compute_statistics(test.data_item_path('cube.dat'))
+            with open('report.json') as f:
+                report = json.load(f)
+            with open('trace.json') as f:
+                trace = json.load(f)
+        phases = report['phases']
+        self.assertEqual(phases['total']['count'], 1)
+        self.assertEqual(phases['load']['count'], 1)
+        self.assertEqual(phases['compute']['count'], 3 * 6)
+        self.assertGreaterEqual(phases['total']['wall'], phases['compute']['wall'])
+        zones = {e['args'].get('zone') for e in report['events'] if e['name'] == 'compute'}
+        self.assertEqual(len(zones), 6)
+        self.assertEqual(len(trace['traceEvents']), len(profiler.events))
+        self.assertEqual({e['ph'] for e in trace['traceEvents']}, {'X'})
+
+    def test_nested(self):
+        ''' Only one profiler can be active at a time '''
+        with tec_util.profiling():
+            with self.assertRaises(RuntimeError):
+                with tec_util.profiling():
+                    pass
+        self.assertIs(timing._active, None)
+
+    def test_rss_growth(self):
+        ''' Memory growth is charged to the phase that allocates it '''
+        if timing.peak_rss() is None:
+            self.skipTest('getrusage not available')
+        with tec_util.profiling() as profiler:
+            with timing.phase('compute'):
+                data = np.ones(timing.peak_rss() // 8 + (1<<24))   # Past the peak so far
+            del data
+            with timing.phase('write'):
+                pass
+        phases = profiler.summary()
+        self.assertGreater(phases['compute']['rss_growth'], 1<<26)
+        self.assertLess(phases['write']['rss_growth'], 1<<26)
+        self.assertGreaterEqual(phases['write']['peak_rss'], phases['compute']['peak_rss'])